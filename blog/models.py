@@ -1,9 +1,9 @@
 from django.db import models
 from django.contrib.auth.models import User
-from library.models import compress_image
+from library.images import ProcessedImagesMixin
 
 
-class Post(models.Model):
+class Post(ProcessedImagesMixin, models.Model):
     CATEGORY_CHOICES = [
         ('news', 'Network News'),
         ('review', 'Game Review'),
@@ -20,6 +20,8 @@ class Post(models.Model):
     # Hero Image for the article
     image = models.ImageField(upload_to='blog/images/', blank=True)
 
+    IMAGE_FIELDS = {'image': 1000}
+
     # The Body
     # Note: For MVP we use plain text. Later we can add a Rich Text Editor.
     content = models.TextField()
@@ -34,12 +36,3 @@ class Post(models.Model):
 
     class Meta:
         ordering = ['-published_date']
-
-    def save(self, *args, **kwargs):
-        if self.image:
-            try:
-                new_image = compress_image(self.image, max_width=1000)
-                if new_image: self.image.save(self.image.name, new_image, save=False)
-            except:
-                pass
-        super().save(*args, **kwargs)
\ No newline at end of file
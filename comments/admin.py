@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Comment
+from django.contrib.contenttypes.models import ContentType
+from .models import Comment, refresh_comment_counts
 
 
 @admin.register(Comment)
@@ -10,7 +11,16 @@ class CommentAdmin(admin.ModelAdmin):
     actions = ['approve_comments', 'remove_comments']
 
     def approve_comments(self, request, queryset):
-        queryset.update(active=True)
+        self._set_active(queryset, True)
 
     def remove_comments(self, request, queryset):
-        queryset.update(active=False)
\ No newline at end of file
+        self._set_active(queryset, False)
+
+    def _set_active(self, queryset, active):
+        # update() skips the signals: refresh the affected comment counts here
+        threads = {}
+        for content_type, object_id in queryset.values_list('content_type', 'object_id'):
+            threads.setdefault(content_type, set()).add(object_id)
+        queryset.update(active=active)
+        for content_type_id, object_ids in threads.items():
+            refresh_comment_counts(ContentType.objects.get_for_id(content_type_id), object_ids)
\ No newline at end of file
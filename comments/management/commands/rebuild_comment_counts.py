@@ -0,0 +1,23 @@
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from comments.models import refresh_comment_counts
+from hardware.models import Hardware
+from library.models import Game
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized comment_count of every game and hardware item (run once after deploying)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model in (Game, Hardware):
+            content_type = ContentType.objects.get_for_model(model)
+            pks = list(model.objects.order_by('pk').values_list('pk', flat=True))
+            for start in range(0, len(pks), batch_size):
+                refresh_comment_counts(content_type, pks[start:start + batch_size])
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {len(pks)} counted")
+
+        self.stdout.write(self.style.SUCCESS('Finished! Comment counts are up to date.'))
@@ -1,8 +1,14 @@
 from django.db import models
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 
+# Sent after refresh_comment_counts() updated a model's comment_count column (kwargs: object_ids)
+comment_counts_changed = Signal()
+
 
 class Comment(models.Model):
     # Who?
@@ -20,6 +26,39 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['created_at']  # Oldest first (Flat style)
+        indexes = [
+            # One object's thread, in display order
+            models.Index(fields=['content_type', 'object_id', 'active', 'created_at'], name='comment_thread_idx'),
+        ]
 
     def __str__(self):
-        return f"Comment by {self.user.username} on {self.content_object}"
\ No newline at end of file
+        return f"Comment by {self.user.username} on {self.content_object}"
+
+
+def comment_thread(content_type, object_id):
+    # Author and profile joined in: the section shows both for every comment
+    return (Comment.objects.filter(content_type=content_type, object_id=object_id, active=True)
+            .select_related('user__profile').order_by('created_at'))
+
+
+def refresh_comment_counts(content_type, object_ids):
+    """
+    Recomputes the denormalized `comment_count` (active comments) of the
+    given objects in one UPDATE. Models without that column are skipped.
+    """
+    model = content_type.model_class()
+    object_ids = {pk for pk in object_ids if pk is not None}
+    if not object_ids or model is None or 'comment_count' not in {f.name for f in model._meta.fields}:
+        return
+
+    active = (Comment.objects.filter(content_type=content_type, object_id=models.OuterRef('pk'), active=True)
+              .order_by().values('object_id').annotate(n=models.Count('pk')).values('n'))
+    model.objects.filter(pk__in=object_ids).update(comment_count=Coalesce(models.Subquery(active), 0))
+    comment_counts_changed.send(sender=model, object_ids=object_ids)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def refresh_count_on_comment_change(sender, instance, raw=False, **kwargs):
+    if raw: return
+    refresh_comment_counts(ContentType.objects.get_for_id(instance.content_type_id), [instance.object_id])
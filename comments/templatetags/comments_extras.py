@@ -1,27 +1,21 @@
 from django import template
 from django.contrib.contenttypes.models import ContentType
-from comments.models import Comment
-from comments.forms import CommentForm
 
 register = template.Library()
 
 
-@register.inclusion_tag('comments/partials/comment_section.html', takes_context=True)
+@register.inclusion_tag('comments/partials/comment_placeholder.html', takes_context=True)
 def render_comments(context, obj):
-    # Get ContentType ID for the object (Game, Hardware, etc)
+    """
+    Placeholder for an object's comment section: HTMX loads the real one
+    (comments:comment_section) when it scrolls into view, so the page
+    itself costs no comment queries and holds nothing user-specific.
+    """
+    # Get ContentType ID for the object (Game, Hardware, etc) - cached after the first lookup
     content_type = ContentType.objects.get_for_model(obj)
-
-    # Get existing comments
-    comments = Comment.objects.filter(
-        content_type=content_type,
-        object_id=obj.id,
-        active=True
-    )
-
+    request = context.get('request')
     return {
-        'object': obj,
-        'comments': comments,
         'content_type': content_type,
-        'user': context['user'],
-        'comment_form': CommentForm(),
-    }
\ No newline at end of file
+        'object_id': obj.pk,
+        'next_url': request.path if request else '',
+    }
@@ -4,5 +4,7 @@ from . import views
 app_name = 'comments'
 
 urlpatterns = [
+    path('<int:content_type_id>/<int:object_id>/', views.comment_section, name='comment_section'),
+    path('<int:content_type_id>/<int:object_id>/page/', views.comment_page, name='comment_page'),
     path('add/<int:content_type_id>/<int:object_id>/', views.add_comment, name='add_comment'),
 ]
\ No newline at end of file
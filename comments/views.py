@@ -1,23 +1,121 @@
-from django.shortcuts import redirect, get_object_or_404
+from django.http import Http404, HttpResponseBadRequest
+from django.shortcuts import redirect, render, get_object_or_404
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.http import require_POST
+from django.utils.cache import patch_vary_headers
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_GET, require_POST
+from core.pagination import CursorPaginator
 from .forms import CommentForm
+from .models import comment_thread
+
+COMMENTS_PER_PAGE = 20
+
+
+def get_content_type(content_type_id):
+    # get_for_id() is cached per process: no query after the first request
+    try:
+        return ContentType.objects.get_for_id(content_type_id)
+    except ContentType.DoesNotExist:
+        raise Http404("Unknown content type")
+
+
+def get_commented_object(content_type_id, object_id):
+    content_type = get_content_type(content_type_id)
+    model = content_type.model_class()
+    if model is None:
+        raise Http404("Unknown content type")
+    # We verify the object exists
+    return content_type, get_object_or_404(model, pk=object_id)
+
+
+def next_url(request):
+    # Where "BACK"/login links return to: only URLs on this site
+    url = request.GET.get('next', '')
+    return url if url_has_allowed_host_and_scheme(url, allowed_hosts={request.get_host()}) else ''
+
+
+def render_fragment(request, template, context):
+    """
+    HTMX swaps the bare partial into the page; a plain visit (the
+    <noscript> and LOAD MORE links without JavaScript) gets it inside the
+    site layout instead.
+    """
+    if request.headers.get('HX-Request'):
+        response = render(request, template, context)
+    else:
+        response = render(request, 'comments/comment_page.html', {**context, 'fragment': template})
+    patch_vary_headers(response, ['HX-Request'])  # Same URL, two bodies
+    return response
+
+
+def comment_count(obj, content_type):
+    # Denormalized on Game/Hardware; other models pay for a COUNT
+    if hasattr(obj, 'comment_count'):
+        return obj.comment_count
+    return comment_thread(content_type, obj.pk).count()
+
+
+@require_GET
+def comment_section(request, content_type_id, object_id):
+    """
+    The whole comment section of a page. Detail pages only render a
+    placeholder ({% render_comments %}) that pulls this in once it scrolls
+    into view, so their own response carries no comment queries or forms.
+    """
+    content_type, obj = get_commented_object(content_type_id, object_id)
+
+    # First page only: the rest comes in through "LOAD MORE" (comment_page)
+    paginator = CursorPaginator(comment_thread(content_type, obj.pk), COMMENTS_PER_PAGE)
+    return render_fragment(request, 'comments/partials/comment_section.html', {
+        'object': obj,
+        'object_id': obj.pk,
+        'comments': paginator.get_page(),
+        'comment_count': comment_count(obj, content_type),
+        'content_type': content_type,
+        'comment_form': CommentForm(),
+        'next_url': next_url(request),
+    })
+
+
+@require_GET
+def comment_page(request, content_type_id, object_id):
+    # "LOAD MORE": the next page of a thread, appended in place by HTMX
+    content_type = get_content_type(content_type_id)
+    paginator = CursorPaginator(comment_thread(content_type, object_id), COMMENTS_PER_PAGE)
+    return render_fragment(request, 'comments/partials/comment_list.html', {
+        'comments': paginator.get_page(request.GET.get('cursor')),
+        'content_type': content_type,
+        'object_id': object_id,
+        'next_url': next_url(request),
+    })
 
 
 @login_required
 @require_POST
 def add_comment(request, content_type_id, object_id):
-    content_type = get_object_or_404(ContentType, id=content_type_id)
-    # We verify the object exists
-    obj = get_object_or_404(content_type.model_class(), id=object_id)
+    content_type, obj = get_commented_object(content_type_id, object_id)
 
+    htmx = request.headers.get('HX-Request')
     form = CommentForm(request.POST)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.user = request.user
         comment.content_object = obj
         comment.save()
+    elif htmx:
+        return HttpResponseBadRequest("Invalid comment")
+
+    if htmx:
+        # Just the new comment (appended by the form) plus the updated header count
+        if hasattr(obj, 'comment_count'):
+            obj.refresh_from_db(fields=['comment_count'])
+        return render(request, 'comments/partials/comment_added.html', {
+            'comment': comment,
+            'object_id': obj.pk,
+            'content_type': content_type,
+            'comment_count': comment_count(obj, content_type),
+        })
 
-    # Bounce user back to the page they came from
-    return redirect(request.META.get('HTTP_REFERER', '/'))
\ No newline at end of file
+    # No JavaScript: bounce user back to the page they came from
+    return redirect(request.META.get('HTTP_REFERER', '/'))
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     'hardware',
     'membership',
     'comments',
+    'tasks',
 ]
 
 MIDDLEWARE = [
@@ -55,9 +56,22 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'allauth.account.middleware.AccountMiddleware'
+    'allauth.account.middleware.AccountMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
 ]
 
+# Max queries per URL name (see core/querybudget.py). Over budget = warning in
+# the log, or an exception with QUERY_BUDGET_ACTION = 'raise' (handy in CI).
+QUERY_BUDGETS = {
+    'core:home': 12,
+    'core:video_list': 10,
+    'library:game_list': 16,
+    'library:game_detail': 20,
+    'hardware:hardware_list': 14,
+    'hardware:hardware_detail': 20,
+}
+QUERY_BUDGET_ACTION = os.environ.get('QUERY_BUDGET_ACTION', 'log')
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -70,6 +84,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'membership.context_processors.entitlement',
             ],
         },
     },
@@ -219,6 +234,47 @@ if os.environ.get('DJANGO_ENV') == 'production':
     STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
     MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+    # F. Cache: shared by every worker (the host has no Redis/Memcached).
+    # The tables are created by migrate (core 0012 runs createcachetable).
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        },
+        # Page cache versions and rebuild locks (see core/pagecache.py): a handful of
+        # keys that must never be culled along with the content
+        'versions': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache_versions',
+            'OPTIONS': {'MAX_ENTRIES': 1_000_000},
+        },
+    }
+
+# Background tasks (see tasks/queue.py). Eager = run inline at enqueue time,
+# the default locally so no worker is needed. Production needs a worker
+# running `python manage.py runworker`: the Procfile's `worker` process, or on
+# PythonAnywhere an always-on task with that command (from the project
+# directory, with the virtualenv's python). Without one, queued image
+# processing and box-art downloads never run. Stripe webhooks are applied
+# inline and only fall back to the queue when that fails.
+TASKS_EAGER = os.environ.get('TASKS_EAGER', str(DEBUG)) == 'True'
+TASKS_CONCURRENCY = int(os.environ.get('TASKS_CONCURRENCY', 2))
+TASKS_KEEP_DAYS = 7
+
+# Art downloads during imports (see core/downloader.py). The cache keeps
+# bodies + ETag/Last-Modified so re-imports only revalidate.
+ART_CACHE_DIR = os.environ.get('ART_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'art'))
+ART_DOWNLOAD_WORKERS = 8
+ART_DOWNLOAD_PER_HOST = 2
+
+# Cached home page content (see core/pagecache.py): versions are bumped by
+# saves, the timeout is only a backstop
+PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', 'True') == 'True'
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Serve the game library list from an in-memory snapshot (see library/snapshot.py)
+LIBRARY_SNAPSHOT_ENABLED = os.environ.get('LIBRARY_SNAPSHOT_ENABLED') == 'True'
+
 STRIPE_PUBLIC_KEY = os.environ.get('STRIPE_PUBLIC_KEY')
 STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY')
 STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET')
\ No newline at end of file
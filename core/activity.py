@@ -0,0 +1,105 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from hardware.models import Hardware
+from library.models import Game, GameCard
+from library.localization import DEFAULT_REGION
+from .models import ActivityEvent
+
+# Home page rails
+RAIL_SIZE = 8
+ACQUISITION_WINDOW_DAYS = 30
+
+
+def refresh_activity(model, pks):
+    """
+    Rebuilds the activity events of the given games or hardware from their
+    current state. Items that no longer exist simply lose their events.
+    """
+    pks = {pk for pk in pks if pk is not None}
+    if not pks:
+        return
+
+    if model is Game:
+        item_type = ActivityEvent.GAME
+        events = _game_events(pks)
+    else:
+        item_type = ActivityEvent.HARDWARE
+        events = _hardware_events(pks)
+
+    with transaction.atomic():
+        ActivityEvent.objects.filter(item_type=item_type, object_id__in=pks).delete()
+        ActivityEvent.objects.bulk_create(events)
+
+
+def _game_events(pks):
+    # Titles/art come from the card projection, which the library signals rebuild first
+    regional = defaultdict(dict)
+    cards = GameCard.objects.filter(game_id__in=pks).only('game_id', 'region_code', 'title', 'box_art', 'image_meta')
+    for card in cards:
+        regional[card.game_id][card.region_code] = {
+            'title': card.title, 'image': card.box_art.name or '', 'meta': (card.image_meta or {}).get('box_art'),
+        }
+
+    events = []
+    games = Game.objects.filter(pk__in=pks).only('pk', 'slug', 'title', 'own_game', 'date_acquired', 'created_at', 'updated_at')
+    for game in games:
+        local = regional[game.pk].get(DEFAULT_REGION) or {'title': game.title, 'image': '', 'meta': None}
+        events += _events(ActivityEvent.GAME, game, game.own_game, local, regional[game.pk])
+    return events
+
+
+def _hardware_events(pks):
+    events = []
+    for item in Hardware.objects.filter(pk__in=pks):
+        local = {'title': item.name, 'image': item.image_front.name or '',
+                 'meta': (item.image_meta or {}).get('image_front')}
+        events += _events(ActivityEvent.HARDWARE, item, item.own_item, local, {})
+    return events
+
+
+def _events(item_type, obj, owned, local, regional):
+    card = {
+        'item_type': item_type, 'object_id': obj.pk, 'slug': obj.slug, 'owned': owned,
+        'title': local['title'], 'image': local['image'],
+        'image_meta': {'image': local['meta']} if local['meta'] else {},
+        'regional': regional,
+    }
+    events = [
+        ActivityEvent(verb=ActivityEvent.ADDED, occurred_at=obj.created_at or timezone.now(), **card),
+        ActivityEvent(verb=ActivityEvent.UPDATED, occurred_at=obj.updated_at or timezone.now(), **card),
+    ]
+    if owned and obj.date_acquired:
+        events.append(ActivityEvent(verb=ActivityEvent.ACQUIRED, occurred_at=_midnight(obj.date_acquired), **card))
+    return events
+
+
+def _midnight(day):
+    moment = datetime.combine(day, time.min)
+    return timezone.make_aware(moment) if settings.USE_TZ else moment
+
+
+# ---------------------------
+# Reads
+# ---------------------------
+def feed(verb=None):
+    """
+    Owned items' events, newest first (all verbs, or just one).
+    """
+    events = ActivityEvent.objects.filter(owned=True)
+    if verb:
+        events = events.filter(verb=verb)
+    return events.order_by('-occurred_at', '-id')
+
+
+def recent_acquisitions(region, limit=RAIL_SIZE):
+    # Strict 30 day window on the acquisition date
+    cutoff = _midnight(timezone.localdate() - timedelta(days=ACQUISITION_WINDOW_DAYS))
+    events = feed(ActivityEvent.ACQUIRED).filter(occurred_at__gte=cutoff)[:limit]
+    return [event.localize(region) for event in events]
+
+
+def recently_updated(region, limit=RAIL_SIZE):
+    return [event.localize(region) for event in feed(ActivityEvent.UPDATED)[:limit]]
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserProfile, NetworkVideo
+from .models import UserProfile, NetworkVideo, VideoFeed, ImportCheckpoint
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
@@ -21,4 +21,17 @@ class NetworkVideoAdmin(admin.ModelAdmin):
         ('Relations (Optional)', {
             'fields': ('platform', 'related_game', 'related_hardware')
         }),
-    )
\ No newline at end of file
+    )
+
+@admin.register(VideoFeed)
+class VideoFeedAdmin(admin.ModelAdmin):
+    # Polled by `manage.py sync_videos`
+    list_display = ('channel', 'url', 'video_type', 'is_active', 'checked_at', 'last_error')
+    list_filter = ('is_active',)
+    readonly_fields = ('etag', 'last_modified', 'checked_at', 'last_error', 'locked_until')
+
+@admin.register(ImportCheckpoint)
+class ImportCheckpointAdmin(admin.ModelAdmin):
+    # Delete a row to make the next import of that file start from the top
+    list_display = ('source', 'rows', 'finished', 'updated_at')
+    readonly_fields = ('source', 'fingerprint', 'offset', 'rows', 'finished', 'updated_at')
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+# Pretend to be a browser to avoid blocks
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'
+
+
+class DownloadStats:
+    def __init__(self):
+        self.downloaded = 0   # fetched over the network (200)
+        self.hits = 0         # served from the cache (304 Not Modified)
+        self.failed = 0
+        self.bytes = 0        # network bytes only
+        self._lock = threading.Lock()
+
+    def add(self, **counts):
+        with self._lock:
+            for name, n in counts.items():
+                setattr(self, name, getattr(self, name) + n)
+
+    def __str__(self):
+        return (f"{self.downloaded} downloaded ({self.bytes / 1024:.0f} KB), "
+                f"{self.hits} from cache, {self.failed} failed")
+
+
+class ArtDownloader:
+    """
+    Fetches many URLs with a bounded thread pool sharing one pooled HTTP
+    session, at most `per_host` requests at a time to any one host.
+
+    With a `cache_dir`, every body is kept on disk under a hash of its URL
+    together with its ETag/Last-Modified, and re-fetches are conditional
+    requests: a 304 costs a round trip but no bytes.
+
+        downloader = ArtDownloader(cache_dir=settings.ART_CACHE_DIR)
+        for key, url, content in downloader.fetch_all([(game.pk, url), ...]):
+            ...  # content is None when the download failed
+    """
+    def __init__(self, max_workers=8, per_host=2, cache_dir=None, timeout=10):
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.stats = DownloadStats()
+
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._hosts = {}
+        self._hosts_lock = threading.Lock()
+
+    def fetch_all(self, items):
+        """
+        Downloads (key, url) pairs concurrently; yields (key, url, bytes or
+        None) as they finish, on the calling thread (so callers can write to
+        the database without sharing connections across threads).
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self.fetch, url): (key, url) for key, url in items}
+            for future in as_completed(futures):
+                key, url = futures[future]
+                yield key, url, future.result()
+
+    def fetch(self, url):
+        try:
+            with self._host_slot(url):
+                return self._fetch(url)
+        except Exception:
+            self.stats.add(failed=1)
+            return None
+
+    # ---------------------------
+    # Internals
+    # ---------------------------
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._hosts_lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return self._hosts[host]
+
+    def _fetch(self, url):
+        cached = self._read_cache(url)
+        headers = {}
+        if cached:
+            if cached['etag']: headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']: headers['If-Modified-Since'] = cached['last_modified']
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and cached:
+            self.stats.add(hits=1)
+            return cached['body']
+        response.raise_for_status()
+
+        content = response.content
+        self.stats.add(downloaded=1, bytes=len(content))
+        self._write_cache(url, content, response.headers)
+        return content
+
+    def _cache_paths(self, url):
+        digest = hashlib.sha256(url.encode()).hexdigest()
+        base = os.path.join(self.cache_dir, digest[:2], digest)
+        return base + '.body', base + '.json'
+
+    def _read_cache(self, url):
+        if not self.cache_dir:
+            return None
+        body_path, meta_path = self._cache_paths(url)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        if not (meta.get('etag') or meta.get('last_modified')):
+            return None  # Nothing to revalidate with: fetch again
+        return {**meta, 'body': body}
+
+    def _write_cache(self, url, content, headers):
+        if not self.cache_dir:
+            return
+        body_path, meta_path = self._cache_paths(url)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        # Write-then-rename, so a crash never leaves a half-written entry
+        for path, data in ((body_path, content),
+                           (meta_path, json.dumps({'url': url, 'etag': headers.get('ETag'),
+                                                   'last_modified': headers.get('Last-Modified')}).encode())):
+            tmp = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
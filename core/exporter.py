@@ -0,0 +1,73 @@
+import csv
+import json
+from library.models import Game
+from .importer import (COLUMNS, FIELD_COLUMNS, CREDIT_COLUMNS, RELEASES_COLUMN, BOOLEAN_FIELDS, DATE_FIELDS,
+                       join_names)
+
+# Streamed in chunks: each chunk is one query plus one per prefetched relation
+EXPORT_CHUNK_SIZE = 500
+
+
+def export_queryset():
+    return (Game.objects.select_related('platform')
+            .prefetch_related(*CREDIT_COLUMNS.values(), 'regional_releases')
+            .order_by('pk'))
+
+
+def export_rows(base_url='', chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields one dict per game with the import_games columns. Memory stays
+    flat: iterator() fetches (and prefetches for) one chunk at a time.
+    Relative image URLs are made absolute with `base_url`.
+    """
+    for game in export_queryset().iterator(chunk_size=chunk_size):
+        yield game_row(game, base_url)
+
+
+def game_row(game, base_url=''):
+    row = {'Title': game.title, 'Platform': game.platform.name}
+    for column, name in FIELD_COLUMNS.items():
+        value = getattr(game, name)
+        if name in DATE_FIELDS:
+            value = value.isoformat() if value else ''
+        row[column] = value
+    for column, field in CREDIT_COLUMNS.items():
+        row[column] = [obj.name for obj in getattr(game, field).all()]
+    row[RELEASES_COLUMN] = [
+        {'Region': r.region_code, 'Title': r.title, 'Release Date': r.release_date.isoformat() if r.release_date else ''}
+        for r in game.regional_releases.all()
+    ]
+    url = game.box_art.url if game.box_art else ''
+    row['Image URL'] = base_url.rstrip('/') + url if url.startswith('/') and base_url else url
+    return row
+
+
+class Echo:
+    # File-like object for csv.writer that hands each line back instead of storing it
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow([csv_cell(column, row[column]) for column in COLUMNS])
+
+
+def iter_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def csv_cell(column, value):
+    if column == RELEASES_COLUMN:
+        return json.dumps(value, ensure_ascii=False) if value else ''
+    if isinstance(value, list):
+        return join_names(value)
+    if FIELD_COLUMNS.get(column) in BOOLEAN_FIELDS:
+        return 'TRUE' if value else 'FALSE'
+    return value
+
+
+EXPORTERS = {'csv': iter_csv, 'jsonl': iter_jsonl}
@@ -0,0 +1,34 @@
+from django.db.models import Count
+
+
+class FacetedFilterSet:
+    """
+    Mixin for django-filter FilterSets: counts per option for the sidebar chips.
+
+    Each facet is counted against the current filter state minus its own
+    selection (so picking "PS2" still shows how many "PS1" games there are),
+    with one GROUP BY query per facet dimension.
+    """
+    # Filter names to count, e.g. ('platform', 'genres')
+    facet_fields = ()
+
+    def facet_counts(self):
+        """
+        Returns {facet name: {option pk/value: count}}.
+        """
+        if not self.is_valid():
+            return {}
+
+        counts = {}
+        for facet in self.facet_fields:
+            queryset = self.queryset.all()
+            for name, value in self.form.cleaned_data.items():
+                if name == facet or name == 'ordering':
+                    continue
+                queryset = self.filters[name].filter(queryset, value)
+
+            field = self.filters[facet].field_name
+            rows = (queryset.order_by().values(field)
+                    .annotate(facet_count=Count('pk', distinct=True)))
+            counts[facet] = {row[field]: row['facet_count'] for row in rows if row[field] is not None}
+        return counts
@@ -0,0 +1,33 @@
+from django.contrib.syndication.views import Feed
+from django.urls import reverse_lazy
+from .activity import feed
+from .models import ActivityEvent
+
+RSS_ITEMS = 30
+
+
+class ActivityFeed(Feed):
+    title = "480pDreams | Collection Activity"
+    link = reverse_lazy('core:activity')
+    description = "Games and hardware added to, acquired for and updated in the 480pDreams collection."
+
+    def items(self):
+        return feed()[:RSS_ITEMS]
+
+    def item_title(self, item):
+        return f"{item.get_verb_display()}: {item.title}"
+
+    def item_description(self, item):
+        return f"{item.get_item_type_display()} {item.get_verb_display().lower()} on {item.occurred_at:%Y-%m-%d}."
+
+    def item_link(self, item):
+        return item.get_absolute_url()
+
+    def item_guid(self, item):
+        # One entry per (item, verb, time): a later update is a new entry
+        return f"{item.item_type}-{item.object_id}-{item.verb}-{item.occurred_at:%Y%m%d%H%M%S}"
+
+    item_guid_is_permalink = False
+
+    def item_pubdate(self, item):
+        return item.occurred_at
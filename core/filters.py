@@ -2,9 +2,10 @@ import django_filters
 from django import forms
 from .models import NetworkVideo
 from library.models import Platform
+from .facets import FacetedFilterSet
 
 
-class VideoFilter(django_filters.FilterSet):
+class VideoFilter(FacetedFilterSet, django_filters.FilterSet):
     title = django_filters.CharFilter(
         lookup_expr='icontains',
         label='Search Title',
@@ -34,4 +35,7 @@ class VideoFilter(django_filters.FilterSet):
 
     class Meta:
         model = NetworkVideo
-        fields = []
\ No newline at end of file
+        fields = []
+
+    # Sidebar chips that show counts
+    facet_fields = ('channel', 'video_type', 'platform')
\ No newline at end of file
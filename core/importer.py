@@ -0,0 +1,429 @@
+import csv
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from io import StringIO
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from library.models import (Game, Platform, Genre, Region, Developer, Publisher, RegionalRelease,
+                            _refresh_read_models)
+from .activity import refresh_activity
+from .models import ImportCheckpoint, ImportedRow
+from .pagecache import bump_version
+
+# Import/export columns (export_games writes exactly these, so files round-trip)
+# Column -> Game field; only columns present in a row are written
+FIELD_COLUMNS = {
+    'Description': 'description',
+    'Release Date': 'release_date',
+    'Format': 'game_format',
+    'Own Game': 'own_game',
+    'Own Box': 'own_box',
+    'Own Manual': 'own_manual',
+    'Date Acquired': 'date_acquired',
+    'Notes': 'condition_notes',
+}
+# Comma separated column (see split_names) -> Game m2m field
+CREDIT_COLUMNS = {
+    'Genres': 'genres',
+    'Regions': 'regions',
+    'Developers': 'developers',
+    'Publishers': 'publishers',
+    'Owned Regions': 'owned_regions',
+}
+CREDIT_MODELS = {'genres': Genre, 'regions': Region, 'developers': Developer, 'publishers': Publisher,
+                 'owned_regions': Region}
+# JSON list of {"Region", "Title", "Release Date"}
+RELEASES_COLUMN = 'Regional Releases'
+COLUMNS = ['Title', 'Platform', *FIELD_COLUMNS, *CREDIT_COLUMNS, RELEASES_COLUMN, 'Image URL']
+
+GAME_FIELDS = list(FIELD_COLUMNS.values())
+BOOLEAN_FIELDS = {'own_game', 'own_box', 'own_manual'}
+DATE_FIELDS = {'release_date', 'date_acquired'}
+
+SLUG_LENGTH = Game._meta.get_field('slug').max_length
+
+
+def parse_date(date_str):
+    if not date_str: return None
+    try:
+        # Expects YYYY-MM-DD
+        return datetime.strptime(str(date_str).strip(), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def parse_bool(val):
+    return str(val).lower() in ['true', '1', 'yes', 'y']
+
+
+def split_names(value):
+    """
+    A credit cell -> names. Comma separated; names containing a comma are
+    quoted like CSV fields ("Foo, Inc.", Sega AM2), so hand-typed lists
+    keep working. JSONL may use lists.
+    """
+    if isinstance(value, list):
+        items = value
+    else:
+        items = [item for line in csv.reader(StringIO(str(value or '')), skipinitialspace=True) for item in line]
+    return [str(x).strip() for x in items if str(x).strip()]
+
+
+def join_names(names):
+    # The reverse of split_names()
+    return ', '.join('"{}"'.format(name.replace('"', '""')) if ',' in name or '"' in name else name
+                     for name in names)
+
+
+def parse_releases(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return []
+    codes = {code for code, label in RegionalRelease.REGION_CHOICES}
+    releases = []
+    for entry in value if isinstance(value, list) else []:
+        if isinstance(entry, dict) and entry.get('Region') in codes:
+            releases.append({'region_code': entry['Region'], 'title': str(entry.get('Title') or '').strip(),
+                             'release_date': parse_date(entry.get('Release Date'))})
+    return releases
+
+
+def row_hash(row):
+    return hashlib.sha1(json.dumps(row, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def slugify_name(name):
+    return name.lower().replace(' ', '-')
+
+
+def file_fingerprint(path):
+    # Changes whenever the file is rewritten: a checkpoint only applies to the same file
+    stat = os.stat(path)
+    return f'{stat.st_size}:{stat.st_mtime_ns}'
+
+
+class ImportSource:
+    """
+    Streams row dicts out of a CSV or JSONL byte stream (a file or stdin),
+    one line at a time, so memory stays flat however big the file is.
+    `offset` is the byte position right after the last row handed out;
+    seek() to it to resume there.
+    """
+    FORMATS = ('csv', 'jsonl')
+
+    def __init__(self, stream, fmt='csv'):
+        self.stream = stream
+        self.format = fmt
+        self.offset = 0
+        self.fieldnames = None
+
+    def __iter__(self):
+        if self.format == 'jsonl':
+            for line in self._lines():
+                if line.strip():
+                    yield json.loads(line)
+            return
+
+        # csv.reader pulls lines only as it needs them, so after each row
+        # `offset` sits exactly at the end of that row (quoted newlines included)
+        reader = csv.reader(self._lines())
+        if self.fieldnames is None:
+            self.fieldnames = next(reader, [])
+        for values in reader:
+            if any(values):
+                yield dict(zip(self.fieldnames, values))
+
+    def seek(self, offset):
+        if self.format == 'csv' and self.fieldnames is None:
+            self.fieldnames = next(csv.reader(self._lines()), [])  # The header comes from the top
+        self.stream.seek(offset)
+        self.offset = offset
+
+    def _lines(self):
+        for raw in self.stream:
+            # 'utf-8-sig' handles Excel's hidden BOM characters
+            line = raw.decode('utf-8-sig' if self.offset == 0 else 'utf-8')
+            self.offset += len(raw)
+            yield line
+
+
+class NameCache:
+    """
+    Every row of a name/slug model (Platform, Genre, ...) in memory, found by
+    name (case-insensitively) or slug. Missing names are created in bulk by
+    create_missing().
+    """
+    LOOKUP_CHUNK = 200  # Names per iexact query (SQLite caps expression depth)
+
+    def __init__(self, model, defaults=None):
+        self.model = model
+        self.defaults = defaults or {}
+        self.slug_length = model._meta.get_field('slug').max_length
+        self.by_name, self.by_slug = {}, {}
+        for obj in model.objects.only('pk', 'name', 'slug'):
+            self._add(obj)
+
+    def _add(self, obj):
+        self.by_name.setdefault(obj.name.casefold(), obj)
+        self.by_slug.setdefault(obj.slug, obj)
+
+    def get(self, name):
+        return self.by_name.get(name.casefold()) or self.by_slug.get(slugify_name(name)[:self.slug_length])
+
+    def create_missing(self, names):
+        missing = {}
+        for name in names:
+            if name and self.get(name) is None:
+                missing.setdefault(name.casefold(), name)
+        if not missing:
+            return 0
+
+        # Rows created since the cache was filled (e.g. by another import) are reused, in any case
+        missing = list(missing.values())
+        for i in range(0, len(missing), self.LOOKUP_CHUNK):
+            query = Q()
+            for name in missing[i:i + self.LOOKUP_CHUNK]:
+                query |= Q(name__iexact=name)
+            for obj in self.model.objects.filter(query).only('pk', 'name', 'slug'):
+                self._add(obj)
+
+        new = {}
+        for name in missing:
+            if self.get(name) is None:
+                new.setdefault(slugify_name(name)[:self.slug_length], name)
+        if new:
+            created = self.model.objects.bulk_create(
+                [self.model(name=name, slug=slug, **self.defaults) for slug, name in new.items()])
+            for obj in created:
+                self._add(obj)
+        return len(new)
+
+
+class GameImporter:
+    """
+    Imports CSV rows (the games.csv columns) in batches: one transaction and
+    a fixed number of queries per batch instead of dozens per row.
+
+    - Platforms and taxonomy are cached in memory (by name and slug) and
+      missing ones are created with bulk_create.
+    - Games are matched on (title, platform) like update_or_create: new ones
+      are bulk_created, existing ones updated only when a value changed.
+    - Credits are inserted straight into the through tables (links are only
+      added, never removed).
+    - Card/search read models are rebuilt once per batch, for the games that
+      actually changed, since bulk writes skip the signals.
+    """
+    def __init__(self, batch_size=500, stdout=None, skip_unchanged=True):
+        self.batch_size = batch_size
+        self.stdout = stdout
+        self.skip_unchanged = skip_unchanged
+        self.platforms = NameCache(Platform)
+        caches = {model: NameCache(model) for model in set(CREDIT_MODELS.values())}  # regions/owned_regions share one
+        self.credits = {field: caches[model] for field, model in CREDIT_MODELS.items()}
+        self.slugs = set(Game.objects.values_list('slug', flat=True))
+        self.rows = self.created = self.updated = self.unchanged = self.skipped = 0
+        self.art = []  # (game id, url) for games that still need box art
+        self.started = time.monotonic()
+
+    # ---------------------------
+    # Entry points
+    # ---------------------------
+    def run(self, rows, checkpoint=None, after_batch=None):
+        """
+        Imports an iterable of row dicts. `checkpoint()` is called inside each
+        batch's transaction (to record progress atomically with the rows),
+        `after_batch()` once the batch is committed.
+        """
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch, checkpoint, after_batch)
+                batch = []
+        if batch:
+            self.import_batch(batch, checkpoint, after_batch)
+        return self
+
+    def import_batch(self, rows, checkpoint=None, after_batch=None):
+        parsed = {}
+        for row in rows:
+            self.rows += 1
+            item = self.parse_row(row)
+            if item is None:
+                self.skipped += 1
+                continue
+            parsed[(item['title'], item['platform'])] = item  # A later duplicate row wins
+
+        with transaction.atomic():
+            if parsed:
+                self.save_batch(list(parsed.values()))
+            if checkpoint:
+                checkpoint()
+        if after_batch:
+            after_batch()
+        self.report()
+
+    @property
+    def rate(self):
+        elapsed = time.monotonic() - self.started
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def report(self):
+        if self.stdout:
+            self.stdout.write(f"  {self.rows} rows ({self.created} new, {self.updated} updated, "
+                              f"{self.unchanged} unchanged) - {self.rate:.0f} rows/sec")
+
+    # ---------------------------
+    # Internals
+    # ---------------------------
+    def parse_row(self, row):
+        def text(column):
+            value = row.get(column)
+            return '' if value is None else str(value).strip()
+
+        title, platform = text('Title'), text('Platform')
+        if not title or not platform:
+            return None
+
+        fields = {}
+        for column, name in FIELD_COLUMNS.items():
+            if column not in row:
+                continue
+            if name in BOOLEAN_FIELDS:
+                # Booleans (Accepts TRUE/FALSE, YES/NO, 1/0)
+                fields[name] = parse_bool(row[column])
+            elif name in DATE_FIELDS:
+                fields[name] = parse_date(text(column))
+            elif name == 'game_format':
+                fields[name] = (text(column) or 'PHYSICAL').upper()
+            else:
+                fields[name] = text(column)
+
+        return {
+            'title': title,
+            'platform': platform,
+            'hash': row_hash(row),
+            'fields': fields,
+            'credits': {field: split_names(row.get(column)) for column, field in CREDIT_COLUMNS.items()},
+            'releases': parse_releases(row.get(RELEASES_COLUMN)),
+            'image_url': text('Image URL'),
+        }
+
+    def save_batch(self, items):
+        # 1. Platforms (only the missing ones hit the database)
+        self.platforms.create_missing(item['platform'] for item in items)
+        for item in items:
+            platform = self.platforms.get(item['platform'])
+            item['platform_id'], item['platform_slug'] = platform.pk, platform.slug
+
+        # 2. Games: one lookup for the whole batch, then bulk create/update
+        existing = {}
+        titles = {item['title'] for item in items}
+        platform_ids = {item['platform_id'] for item in items}
+        matches = (Game.objects.filter(title__in=titles, platform_id__in=platform_ids)
+                   .only('pk', 'title', 'platform_id', 'box_art', *GAME_FIELDS))
+        for game in matches:
+            existing.setdefault((game.title, game.platform_id), game)
+
+        # Rows identical to the one each game was last imported from are skipped outright
+        if self.skip_unchanged and existing:
+            hashes = dict(ImportedRow.objects.filter(game_id__in=[g.pk for g in existing.values()])
+                          .values_list('game_id', 'content_hash'))
+            before = len(items)
+            items = [item for item in items
+                     if hashes.get(getattr(existing.get((item['title'], item['platform_id'])), 'pk', None)) != item['hash']]
+            self.unchanged += before - len(items)
+            if not items:
+                return
+
+        # Taxonomy (only the missing ones hit the database)
+        for field, cache in self.credits.items():
+            cache.create_missing(name for item in items for name in item['credits'][field])
+
+        new_games, changes, games = [], defaultdict(list), []
+        for item in items:
+            values = item['fields']
+            game = existing.get((item['title'], item['platform_id']))
+            if game is None:
+                game = Game(title=item['title'], platform_id=item['platform_id'],
+                            slug=self.unique_slug(item['title'], item['platform_slug']), **values)
+                game.refresh_media_flags()
+                new_games.append(game)
+            elif any(getattr(game, name) != value for name, value in values.items()):
+                # Rows with the same new values share one UPDATE (bulk_update's CASE is slow)
+                changes[tuple(sorted(values.items()))].append(game.pk)
+            games.append((game, item))
+
+        Game.objects.bulk_create(new_games)
+        now = timezone.now()
+        for values, pks in changes.items():
+            Game.objects.filter(pk__in=pks).update(updated_at=now, **dict(values))
+        touched = {pk for pks in changes.values() for pk in pks} | {game.pk for game in new_games}
+        self.created += len(new_games)
+        self.updated += len(touched) - len(new_games)
+
+        # 3. Credits: straight into the through tables, only the links that are missing
+        game_ids = [game.pk for game, item in games]
+        for field, cache in self.credits.items():
+            through = getattr(Game, field).through
+            target = f'{CREDIT_MODELS[field]._meta.model_name}_id'
+            links = {(game.pk, cache.get(name).pk) for game, item in games for name in item['credits'][field]}
+            links -= set(through.objects.filter(game_id__in=game_ids).values_list('game_id', target))
+            through.objects.bulk_create([through(game_id=g, **{target: t}) for g, t in links])
+            touched |= {g for g, t in links}
+
+        # 4. Regional releases: matched on region code, only the listed ones are touched
+        touched |= self.save_releases(games)
+
+        # 5. Read models once for the whole batch (bulk writes skip the signals)
+        _refresh_read_models(touched)
+        refresh_activity(Game, touched)
+        bump_version('home')
+
+        # 6. Remember what each game was imported from
+        ImportedRow.objects.filter(game_id__in=game_ids).delete()
+        ImportedRow.objects.bulk_create([ImportedRow(game_id=game.pk, content_hash=item['hash']) for game, item in games])
+
+        self.art += [(game.pk, item['image_url']) for game, item in games
+                     if item['image_url'] and not game.box_art]
+
+    def save_releases(self, games):
+        wanted = {(game.pk, release['region_code']): release
+                  for game, item in games for release in item['releases']}
+        if not wanted:
+            return set()
+        current = {(r.game_id, r.region_code): r for r in RegionalRelease.objects.filter(
+            game_id__in={game_id for game_id, code in wanted}).only('pk', 'game_id', 'region_code', 'title', 'release_date')}
+
+        new, touched = [], set()
+        for (game_id, code), values in wanted.items():
+            release = current.get((game_id, code))
+            if release is None:
+                new.append(RegionalRelease(game_id=game_id, region_code=code,
+                                           title=values['title'], release_date=values['release_date']))
+            elif (release.title, release.release_date) != (values['title'], values['release_date']):
+                RegionalRelease.objects.filter(pk=release.pk).update(title=values['title'], release_date=values['release_date'])
+            else:
+                continue
+            touched.add(game_id)
+        RegionalRelease.objects.bulk_create(new)
+        return touched
+
+    def unique_slug(self, title, platform_slug):
+        base = f"{slugify_name(title)}-{platform_slug}"
+        slug, n = base[:SLUG_LENGTH], 1
+        while slug in self.slugs:
+            n += 1
+            suffix = f'-{n}'
+            slug = base[:SLUG_LENGTH - len(suffix)] + suffix
+        self.slugs.add(slug)
+        return slug
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, When, Exists, OuterRef, Q, Value, BooleanField
+from library.models import Game, GameVideo, bump_catalogue_version
+from hardware.models import Hardware
+
+
+def flag(condition):
+    return Case(When(condition, then=Value(True)), default=Value(False), output_field=BooleanField())
+
+
+class Command(BaseCommand):
+    help = 'Recompute the has_* media flags on Game and Hardware (one UPDATE per table)'
+
+    def handle(self, *args, **kwargs):
+        with transaction.atomic():
+            games = Game.objects.update(
+                has_playthrough=flag(~Q(video_playthrough='')),
+                has_review=flag(~Q(written_review='') | ~Q(video_review='')),
+                has_unboxing=flag(~Q(video_condition='')),
+                has_patron_extras=Exists(GameVideo.objects.filter(game=OuterRef('pk'), is_patron_only=True)),
+            )
+            hardware = Hardware.objects.update(
+                has_review=flag(~Q(video_review='')),
+                has_unboxing=flag(~Q(video_condition='')),
+            )
+            # update() skips the signals: the catalogue snapshot filters on these flags
+            bump_catalogue_version(Game.objects.values_list('pk', flat=True))
+
+        self.stdout.write(self.style.SUCCESS(f'Finished! Updated flags on {games} games and {hardware} hardware items.'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from core.exporter import EXPORTERS, EXPORT_CHUNK_SIZE, export_rows
+
+
+class Command(BaseCommand):
+    help = 'Export the whole game library as CSV or JSONL (the import_games columns, so it imports back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="Output file (default: stdout)")
+        parser.add_argument('--format', choices=EXPORTERS, help='Default: from the file extension (.jsonl/.ndjson, otherwise csv)')
+        parser.add_argument('--base-url', default='', help='Prefix for relative image URLs, e.g. https://480pdreams.com')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.lower().endswith(('.jsonl', '.ndjson')) else 'csv')
+        lines = EXPORTERS[fmt](export_rows(options['base_url'], options['chunk_size']))
+
+        if path == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+
+        count = -1 if fmt == 'csv' else 0  # The CSV header isn't a game
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            for line in lines:
+                f.write(line)
+                count += 1
+        self.stdout.write(self.style.SUCCESS(f'Finished! Exported {count} games to {path}.'))
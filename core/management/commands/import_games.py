@@ -1,116 +1,88 @@
-import csv
+import hashlib
+import json
 import os
-import requests
+import sys
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from django.core.files.base import ContentFile
-from library.models import Game, Platform, Genre, Region, Developer, Publisher
-from datetime import datetime
+from core.downloader import ArtDownloader
+from core.importer import GameImporter, ImportSource, file_fingerprint
+from core.models import ImportCheckpoint
+from library.tasks import download_box_art, save_box_art
+from tasks.queue import is_eager
 
 
 class Command(BaseCommand):
-    help = 'Import games from a CSV file (games.csv) in the project root'
-
-    def handle(self, *args, **kwargs):
-        file_path = os.path.join(settings.BASE_DIR, 'games.csv')
-
-        if not os.path.exists(file_path):
-            self.stdout.write(self.style.ERROR('games.csv not found in project root!'))
+    help = ('Import games from a CSV or JSONL file (default: games.csv in the project root). '
+            'Resumes an interrupted run of the same file and skips rows unchanged since the last import.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help="CSV/JSONL file, or '-' for stdin")
+        parser.add_argument('--format', choices=ImportSource.FORMATS,
+                            help='Default: from the file extension (.jsonl/.ndjson, otherwise csv)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Rows per transaction (one set of bulk queries and one checkpoint each)')
+        parser.add_argument('--restart', action='store_true',
+                            help='Start from the top even if an earlier run of this file was interrupted')
+        parser.add_argument('--all-rows', action='store_true',
+                            help='Re-apply every row, even those unchanged since the last import')
+
+    def handle(self, *args, **options):
+        path = options['path'] or os.path.join(settings.BASE_DIR, 'games.csv')
+        fmt = options['format'] or ('jsonl' if path.lower().endswith(('.jsonl', '.ndjson')) else 'csv')
+
+        if path != '-' and not os.path.exists(path):
+            self.stdout.write(self.style.ERROR(f'{path} not found!'))
             return
 
-        # encoding='utf-8-sig' handles Excel's hidden BOM characters
-        with open(file_path, 'r', encoding='utf-8-sig') as csvfile:
-            reader = csv.DictReader(csvfile)
-            count = 0
-
-            for row in reader:
-                title = row['Title'].strip()
-                if not title: continue
-
-                self.stdout.write(f"Processing: {title}...")
-
-                # 1. GET OR CREATE PLATFORM
-                plat_name = row['Platform'].strip()
-                platform, _ = Platform.objects.get_or_create(
-                    name=plat_name,
-                    defaults={'slug': plat_name.lower().replace(' ', '-')}
-                )
-
-                # 2. CREATE GAME
-                game, created = Game.objects.update_or_create(
-                    title=title,
-                    platform=platform,
-                    defaults={
-                        'description': row.get('Description', ''),
-                        'slug': f"{title.lower().replace(' ', '-')}-{platform.slug}"[:50],
-                        'release_date': self.parse_date(row.get('Release Date')),
-                        'game_format': row.get('Format', 'PHYSICAL').upper(),
-                        # Booleans (Accepts TRUE/FALSE, YES/NO, 1/0)
-                        'own_game': self.parse_bool(row.get('Own Game')),
-                        'own_box': self.parse_bool(row.get('Own Box')),
-                        'own_manual': self.parse_bool(row.get('Own Manual')),
-                        'condition_notes': row.get('Notes', ''),
-                    }
-                )
-
-                # 3. HANDLE M2M (Comma separated)
-                self.add_m2m(game.genres, Genre, row.get('Genres', ''))
-                self.add_m2m(game.regions, Region, row.get('Regions', ''))
-                self.add_m2m(game.developers, Developer, row.get('Developers', ''))
-                self.add_m2m(game.publishers, Publisher, row.get('Publishers', ''))
-
-                # 4. DOWNLOAD IMAGE (If provided and missing)
-                image_url = row.get('Image URL', '').strip()
-                if image_url and not game.box_art:
-                    self.download_image(game, image_url)
-
-                # Save to trigger compression logic
-                game.save()
-
-                if created:
-                    count += 1
-
-            self.stdout.write(self.style.SUCCESS(f'Finished! Imported {count} new games.'))
-
-    def parse_date(self, date_str):
-        if not date_str: return None
-        try:
-            # Expects YYYY-MM-DD
-            return datetime.strptime(date_str, '%Y-%m-%d').date()
-        except ValueError:
-            return None
-
-    def parse_bool(self, val):
-        return str(val).lower() in ['true', '1', 'yes', 'y']
-
-    def add_m2m(self, field, model, data_str):
-        if not data_str: return
-        # Split by comma
-        items = [x.strip() for x in data_str.split(',')]
-        for item in items:
-            if not item: continue
-            obj, _ = model.objects.get_or_create(
-                name=item,
-                defaults={'slug': item.lower().replace(' ', '-')}
-            )
-            field.add(obj)
-
-    def download_image(self, game, url):
-        try:
-            self.stdout.write(f"  - Downloading art...")
-            # Pretend to be a browser to avoid blocks
-            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
-            response = requests.get(url, headers=headers, timeout=10)
-
-            if response.status_code == 200:
-                # Guess extension
-                ext = 'jpg'
-                if '.png' in url.lower(): ext = 'png'
-
-                filename = f"{game.slug}.{ext}"
-                # save=False because we save the game object later
-                game.box_art.save(filename, ContentFile(response.content), save=False)
-            else:
-                self.stdout.write(self.style.WARNING(f"  ! Failed to download (Status {response.status_code})"))
-        except Exception as e:
-            self.stdout.write(self.style.WARNING(f"  ! Error downloading: {e}"))
\ No newline at end of file
+        self.importer = GameImporter(batch_size=options['batch_size'], stdout=self.stdout,
+                                     skip_unchanged=not options['all_rows'])
+        # One pooled downloader for the whole run when art is fetched here
+        self.downloader = ArtDownloader(max_workers=settings.ART_DOWNLOAD_WORKERS,
+                                        per_host=settings.ART_DOWNLOAD_PER_HOST,
+                                        cache_dir=settings.ART_CACHE_DIR) if is_eager() else None
+
+        if path == '-':
+            # A pipe can't be rewound: no checkpoint (unchanged rows are still skipped on a re-run)
+            self.importer.run(ImportSource(sys.stdin.buffer, fmt), after_batch=self.fetch_art)
+        else:
+            with open(path, 'rb') as stream:
+                self.import_file(os.path.abspath(path), ImportSource(stream, fmt), options['restart'])
+
+        importer = self.importer
+        if self.downloader:
+            self.stdout.write(f"  Art: {self.downloader.stats}")
+        self.stdout.write(self.style.SUCCESS(
+            f'Finished! Imported {importer.created} new games, updated {importer.updated}, '
+            f'{importer.unchanged} unchanged ({importer.rows} rows, {importer.rate:.0f} rows/sec).'))
+
+    def import_file(self, path, source, restart):
+        fingerprint = file_fingerprint(path)
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(source=path, defaults={'fingerprint': fingerprint})
+
+        if restart or checkpoint.finished or checkpoint.fingerprint != fingerprint:
+            checkpoint.fingerprint, checkpoint.offset, checkpoint.rows, checkpoint.finished = fingerprint, 0, 0, False
+            checkpoint.save()
+        elif checkpoint.offset:
+            self.stdout.write(f"Resuming after row {checkpoint.rows} (use --restart to start over)")
+            source.seek(checkpoint.offset)
+        rows_before = checkpoint.rows
+
+        def save_checkpoint():
+            # Same transaction as the batch: the offset never runs ahead of the data
+            ImportCheckpoint.objects.filter(pk=checkpoint.pk).update(
+                offset=source.offset, rows=rows_before + self.importer.rows)
+
+        self.importer.run(source, checkpoint=save_checkpoint, after_batch=self.fetch_art)
+        ImportCheckpoint.objects.filter(pk=checkpoint.pk).update(finished=True)
+
+    def fetch_art(self):
+        # Box art (If provided and missing): fetched concurrently, here or by the task worker
+        items, self.importer.art = sorted(self.importer.art), []
+        if not items:
+            return
+        if self.downloader:
+            save_box_art(items, self.downloader)
+        else:
+            key = hashlib.sha1(json.dumps(items).encode()).hexdigest()
+            download_box_art.enqueue(items, key=f'box-art:{key}')
+            self.stdout.write(f"  Queued {len(items)} box art downloads for the task worker.")
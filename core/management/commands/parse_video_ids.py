@@ -0,0 +1,43 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db.models import UniqueConstraint
+from library.videos import ParsedVideosMixin
+
+
+class Command(BaseCommand):
+    help = 'Fill in the parsed provider/video id columns for every stored video URL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        models = [m for m in apps.get_models() if issubclass(m, ParsedVideosMixin)]
+
+        for model in models:
+            columns = [c for pair in model.VIDEO_FIELDS.values() for c in pair]
+            fields = ['pk', *model.VIDEO_FIELDS, *columns]
+            # Id columns with a unique constraint (NetworkVideo): a URL stored twice keeps one parsed row
+            unique = {c.fields[0] for c in model._meta.constraints
+                      if isinstance(c, UniqueConstraint) and len(c.fields) == 1 and c.fields[0] in columns}
+            taken = {column: dict(model.objects.exclude(**{column: ''}).values_list(column, 'pk'))
+                     for column in unique}
+            changed, duplicates = [], 0
+            for obj in model.objects.only(*fields).order_by('pk').iterator(chunk_size=batch_size):
+                before = [getattr(obj, c) for c in columns]
+                if not obj.parse_videos():
+                    continue
+                for name, (provider_column, id_column) in model.VIDEO_FIELDS.items():
+                    owner = taken.get(id_column, {}).setdefault(getattr(obj, id_column), obj.pk)
+                    if getattr(obj, id_column) and owner != obj.pk:
+                        setattr(obj, provider_column, '')
+                        setattr(obj, id_column, '')
+                        duplicates += 1
+                if [getattr(obj, c) for c in columns] != before:
+                    changed.append(obj)
+            # Straight to the table: no save() (so no image work, signals or updated_at)
+            model.objects.bulk_update(changed, columns, batch_size=batch_size)
+            skipped = f" ({duplicates} duplicates left unparsed)" if duplicates else ''
+            self.stdout.write(f"{model._meta.label}: {len(changed)} updated{skipped}")
+
+        self.stdout.write(self.style.SUCCESS('Finished! Video ids are up to date.'))
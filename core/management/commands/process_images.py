@@ -0,0 +1,23 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from library.images import ProcessedImagesMixin
+
+
+class Command(BaseCommand):
+    help = 'Run every stored image through the image pipeline (only files not yet processed at the current version)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        models = [m for m in apps.get_models() if issubclass(m, ProcessedImagesMixin)]
+
+        for model in models:
+            updated = 0
+            for obj in model.objects.order_by('pk').iterator(chunk_size=batch_size):
+                if obj.process_and_save():
+                    updated += 1
+            self.stdout.write(f"{model._meta.label}: {updated} updated")
+
+        self.stdout.write(self.style.SUCCESS('Finished! Images are up to date.'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from core.activity import refresh_activity
+from hardware.models import Hardware
+from library.models import Game
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the ActivityEvent feed for every game and hardware item (run once after deploying)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        for model in (Game, Hardware):
+            pks = list(model.objects.order_by('pk').values_list('pk', flat=True))
+            for start in range(0, len(pks), batch_size):
+                refresh_activity(model, pks[start:start + batch_size])
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {len(pks)} rebuilt")
+
+        self.stdout.write(self.style.SUCCESS('Finished! The activity feed is up to date.'))
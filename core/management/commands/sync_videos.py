@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from core.models import NetworkVideo
+from core.videosync import sync_videos
+
+
+class Command(BaseCommand):
+    help = ("Add new uploads from the channels' feeds (see VideoFeed in the admin) to the video archive. "
+            "Meant for cron, e.g. */10 * * * * manage.py sync_videos")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--channel', action='append', choices=[key for key, label in NetworkVideo.CHANNEL_CHOICES],
+                            help='Only sync this channel (repeatable)')
+        parser.add_argument('--timeout', type=int, default=10, help='Seconds per feed request')
+
+    def handle(self, *args, **options):
+        stats = sync_videos(channels=options['channel'], timeout=options['timeout'])
+        self.stdout.write(self.style.SUCCESS(f'Finished! {stats}'))
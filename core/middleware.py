@@ -0,0 +1,62 @@
+from contextlib import ExitStack
+from django.conf import settings
+from .querybudget import record_queries, check_budget, stats
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts the queries each request runs (count, SQL time, repeated
+    statements), feeds the rolling per-URL summary, enforces
+    settings.QUERY_BUDGETS and reports it all in a Server-Timing header
+    (visible in the browser's network tab) for DEBUG/staff requests.
+
+    Streamed responses (e.g. the library export) run most of their
+    queries while the body is sent: those are counted until the iterator
+    is exhausted and checked then. Their headers are already out by that
+    point, so they get no Server-Timing. Async iterators aren't wrapped
+    (they run outside this thread's connections) and go unchecked.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recording = ExitStack()
+        recorder = recording.enter_context(record_queries())
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            recording.close()
+            raise
+
+        if response.streaming and not response.is_async:
+            response.streaming_content = self._stream(response.streaming_content, recording, request, recorder)
+            return response
+
+        recording.close()
+        self._report(request, recorder, response)
+        return response
+
+    def _stream(self, content, recording, request, recorder):
+        with recording:
+            yield from content
+        # Only once the whole body went out: a client hanging up mid-download isn't a budget problem
+        self._report(request, recorder)
+
+    def _report(self, request, recorder, response=None):
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.view_name if match else None
+        if url_name is None:
+            return  # 404s, static files...
+
+        request.query_recorder = recorder
+        stats.add(url_name, recorder)
+
+        if response is not None and (settings.DEBUG or getattr(getattr(request, 'user', None), 'is_staff', False)):
+            duplicates = sum(recorder.duplicates().values())
+            response['Server-Timing'] = (
+                f'db;dur={recorder.duration_ms:.1f};desc="{recorder.count} queries", '
+                f'dupes;desc="{duplicates} repeated"'
+            )
+
+        check_budget(url_name, recorder)
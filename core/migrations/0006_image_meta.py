@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_networkvideo_is_member_only_networkvideo_platform_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='networkvideo',
+            name='image_meta',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_image_meta'),
+        ('library', '0019_gamecard_image_meta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(help_text='Absolute path of the imported file', max_length=500, unique=True)),
+                ('fingerprint', models.CharField(help_text='Size and modification time of the file', max_length=100)),
+                ('offset', models.BigIntegerField(default=0, help_text='Byte offset after the last committed row')),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('finished', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ImportedRow',
+            fields=[
+                ('game', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='import_row', serialize=False, to='library.game')),
+                ('content_hash', models.CharField(max_length=40)),
+            ],
+        ),
+    ]
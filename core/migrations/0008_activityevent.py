@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_import_checkpoints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('verb', models.CharField(choices=[('added', 'Added'), ('updated', 'Updated'), ('acquired', 'Acquired')], max_length=10)),
+                ('item_type', models.CharField(choices=[('game', 'Game'), ('hardware', 'Hardware')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('occurred_at', models.DateTimeField()),
+                ('slug', models.SlugField()),
+                ('title', models.CharField(max_length=200)),
+                ('image', models.ImageField(blank=True, max_length=255, upload_to='')),
+                ('image_meta', models.JSONField(blank=True, default=dict)),
+                ('regional', models.JSONField(blank=True, default=dict)),
+                ('owned', models.BooleanField(default=False)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['verb', 'owned', '-occurred_at'], name='activity_feed_idx')],
+                'constraints': [models.UniqueConstraint(fields=('item_type', 'object_id', 'verb'), name='unique_activity_per_item')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_activityevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='networkvideo',
+            name='provider',
+            field=models.CharField(blank=True, choices=[('youtube', 'YouTube'), ('vimeo', 'Vimeo')], editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='networkvideo',
+            name='video_id',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20),
+        ),
+    ]
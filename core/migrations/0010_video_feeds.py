@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:04
+
+from django.db import migrations, models
+from library.videos import parse_video
+
+
+def parse_and_dedupe_video_ids(apps, schema_editor):
+    """
+    Parses the network videos' ids before the unique constraint goes on.
+    When several rows share a video (the same URL added twice), the oldest
+    keeps the id and the others stay unparsed, so the constraint holds and
+    the duplicates remain visible in the admin.
+    """
+    NetworkVideo = apps.get_model('core', 'NetworkVideo')
+    seen = set()
+    for video in NetworkVideo.objects.order_by('pk'):
+        provider, video_id = parse_video(video.url)
+        if video_id in seen:
+            provider, video_id = '', ''
+        seen.add(video_id)
+        if (provider, video_id) != (video.provider, video.video_id):
+            NetworkVideo.objects.filter(pk=video.pk).update(provider=provider, video_id=video_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_video_ids'),
+        ('hardware', '0009_video_ids'),
+        ('library', '0020_video_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VideoFeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('480pGames', '480pGames (Gameplay)'), ('480pReviews', '480pReviews (Reviews)'), ('480pUnbox', '480pUnbox (Unboxing)'), ('480pDreams', '480pDreams (Main)')], max_length=20, unique=True)),
+                ('url', models.URLField(help_text='e.g. https://www.youtube.com/feeds/videos.xml?channel_id=UC...')),
+                ('video_type', models.CharField(choices=[('gameplay', 'Full Gameplay'), ('gamereview', 'Game Review'), ('hardwarereview', 'Hardware Review'), ('detail', 'Detailed Look'), ('pickups', 'Collection Update'), ('setup', 'Setup Update'), ('news', 'News'), ('restoration', 'Hardware Restoration'), ('modification', 'Hardware Modification')], default='gameplay', help_text='Type given to new videos from this feed (edit per video afterwards)', max_length=20)),
+                ('is_active', models.BooleanField(default=True)),
+                ('etag', models.CharField(blank=True, editable=False, max_length=255)),
+                ('last_modified', models.CharField(blank=True, editable=False, max_length=64)),
+                ('checked_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('last_error', models.TextField(blank=True, editable=False)),
+                ('locked_until', models.DateTimeField(blank=True, editable=False, null=True)),
+            ],
+        ),
+        migrations.RunPython(parse_and_dedupe_video_ids, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='networkvideo',
+            constraint=models.UniqueConstraint(condition=models.Q(('video_id', ''), _negated=True), fields=('video_id',), name='unique_network_video_id'),
+        ),
+    ]
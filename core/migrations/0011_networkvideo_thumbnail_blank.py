@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_video_feeds'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='networkvideo',
+            name='thumbnail',
+            field=models.ImageField(blank=True, help_text='Upload the YouTube Thumbnail here', upload_to='videos/thumbnails/'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_cache_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='entitlement_version',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+    ]
@@ -1,10 +1,15 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.core.exceptions import ValidationError
+from django.db.models.signals import post_save, post_delete
+from django.urls import reverse
 from django.dispatch import receiver
 from embed_video.fields import EmbedVideoField
-from library.models import Platform, Game, compress_image
+from library.models import Platform, Game, RegionalRelease
+from library.images import ProcessedImagesMixin
+from library.videos import ParsedVideosMixin, PROVIDER_CHOICES, parse_video
 from hardware.models import Hardware
+from blog.models import Post
 
 
 # ==========================================
@@ -30,25 +35,17 @@ class UserProfile(models.Model):
     is_patron = models.BooleanField(default=False, help_text="Is this user a paying supporter?")
     avatar = models.ImageField(upload_to='avatars/', blank=True)
     bio = models.TextField(max_length=500, blank=True)
+    # Stamp of the user's entitlement: a fresh token on every change (see membership/entitlements.py)
+    entitlement_version = models.CharField(max_length=32, blank=True, editable=False)
 
     @property
     def is_member(self):
         """
-        Master check for membership access.
-        Returns True if user pays via Stripe OR has an active Admin Grant.
+        Master check for membership access: Stripe OR an active Admin Grant.
+        Uncached - in views and templates use get_entitlement(request) / {{ entitlement }}.
         """
-        # 1. Check Stripe
-        if self.is_patron:
-            return True
-
-        # 2. Check Admin Grant
-        # We access the related_name 'admin_grant' from the User model
-        if hasattr(self.user, 'admin_grant'):
-            grant = self.user.admin_grant
-            if grant.is_valid():
-                return True
-
-        return False
+        from membership.entitlements import resolve_entitlement
+        return resolve_entitlement(self.user).is_member
 
     def __str__(self):
         return f"{self.user.username}'s Profile"
@@ -68,7 +65,7 @@ def save_user_profile(sender, instance, **kwargs):
 # ==========================================
 # 2. NETWORK VIDEOS (The Archive)
 # ==========================================
-class NetworkVideo(models.Model):
+class NetworkVideo(ProcessedImagesMixin, ParsedVideosMixin, models.Model):
     CHANNEL_CHOICES = [
         ('480pGames', '480pGames (Gameplay)'),
         ('480pReviews', '480pReviews (Reviews)'),
@@ -92,7 +89,16 @@ class NetworkVideo(models.Model):
     channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES)
     video_type = models.CharField(max_length=20, choices=TYPE_CHOICES, default='gameplay')
     url = EmbedVideoField(help_text="YouTube URL (e.g. https://www.youtube.com/watch?v=...)")
-    thumbnail = models.ImageField(upload_to='videos/thumbnails/', help_text="Upload the YouTube Thumbnail here")
+    # Blank for videos added by `manage.py sync_videos` until their thumbnail is fetched
+    thumbnail = models.ImageField(upload_to='videos/thumbnails/', blank=True, help_text="Upload the YouTube Thumbnail here")
+
+    # Parsed from url on save
+    provider = models.CharField(max_length=10, choices=PROVIDER_CHOICES, blank=True, editable=False)
+    video_id = models.CharField(max_length=20, blank=True, editable=False, db_index=True)
+
+    VIDEO_FIELDS = {'url': ('provider', 'video_id')}
+
+    IMAGE_FIELDS = {'thumbnail': 800}
 
     # Filters
     platform = models.ForeignKey(Platform, on_delete=models.SET_NULL, null=True, blank=True, related_name='network_videos')
@@ -101,14 +107,173 @@ class NetworkVideo(models.Model):
     is_member_only = models.BooleanField(default=False, verbose_name="Member Only Content")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # The upsert key for `manage.py sync_videos` (manual rows may have no parsed id)
+            models.UniqueConstraint(fields=['video_id'], condition=~models.Q(video_id=''),
+                                    name='unique_network_video_id'),
+        ]
+
     def __str__(self):
         return f"[{self.channel}] {self.title}"
 
-    def save(self, *args, **kwargs):
-        if self.thumbnail:
-            try:
-                new_image = compress_image(self.thumbnail, max_width=800)
-                if new_image: self.thumbnail.save(self.thumbnail.name, new_image, save=False)
-            except:
-                pass
-        super().save(*args, **kwargs)
\ No newline at end of file
+    def clean(self):
+        # video_id is derived in save(), so forms never see the unique constraint by themselves
+        provider, video_id = parse_video(self.url)
+        if video_id and NetworkVideo.objects.filter(video_id=video_id).exclude(pk=self.pk).exists():
+            raise ValidationError({'url': "This video is already in the list."})
+
+
+class VideoFeed(models.Model):
+    """
+    A channel's Atom feed, polled by `manage.py sync_videos`. The row also
+    keeps the sync state: validators for conditional GETs and a lease so
+    overlapping cron runs never poll the same feed twice.
+    """
+    channel = models.CharField(max_length=20, choices=NetworkVideo.CHANNEL_CHOICES, unique=True)
+    url = models.URLField(help_text="e.g. https://www.youtube.com/feeds/videos.xml?channel_id=UC...")
+    video_type = models.CharField(max_length=20, choices=NetworkVideo.TYPE_CHOICES, default='gameplay',
+                                  help_text="Type given to new videos from this feed (edit per video afterwards)")
+    is_active = models.BooleanField(default=True)
+
+    # Sync state
+    etag = models.CharField(max_length=255, blank=True, editable=False)
+    last_modified = models.CharField(max_length=64, blank=True, editable=False)
+    checked_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_error = models.TextField(blank=True, editable=False)
+    locked_until = models.DateTimeField(null=True, blank=True, editable=False)
+
+    def __str__(self):
+        return self.get_channel_display()
+
+
+# ==========================================
+# 3. CATALOGUE IMPORTS (see core/importer.py)
+# ==========================================
+class ImportCheckpoint(models.Model):
+    """
+    How far `import_games` got through a file. Saved in the same
+    transaction as each batch, so a crashed run resumes right after the
+    last committed row (as long as the file hasn't changed since).
+    """
+    source = models.CharField(max_length=500, unique=True, help_text="Absolute path of the imported file")
+    fingerprint = models.CharField(max_length=100, help_text="Size and modification time of the file")
+    offset = models.BigIntegerField(default=0, help_text="Byte offset after the last committed row")
+    rows = models.PositiveIntegerField(default=0)
+    finished = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} ({'finished' if self.finished else f'{self.rows} rows'})"
+
+
+class ImportedRow(models.Model):
+    """
+    Hash of the import row a game was last written from: rows that come
+    in again unchanged are skipped without touching the game.
+    """
+    game = models.OneToOneField(Game, on_delete=models.CASCADE, primary_key=True, related_name='import_row')
+    content_hash = models.CharField(max_length=40)
+
+    def __str__(self):
+        return f"Import hash for {self.game_id}"
+
+
+# ==========================================
+# 4. ACTIVITY FEED (Read Model)
+# ==========================================
+class ActivityEvent(models.Model):
+    """
+    What happened in the collection, one row per (item, verb), with a
+    denormalized card so the home rails, the feed page and the RSS feed
+    are single-table reads. Rebuilt by the signals below from the current
+    state of each Game/Hardware (see core/activity.py); never edit by hand.
+    """
+    ADDED, UPDATED, ACQUIRED = 'added', 'updated', 'acquired'
+    VERB_CHOICES = [(ADDED, 'Added'), (UPDATED, 'Updated'), (ACQUIRED, 'Acquired')]
+    GAME, HARDWARE = 'game', 'hardware'
+    ITEM_CHOICES = [(GAME, 'Game'), (HARDWARE, 'Hardware')]
+
+    verb = models.CharField(max_length=10, choices=VERB_CHOICES)
+    item_type = models.CharField(max_length=10, choices=ITEM_CHOICES)
+    object_id = models.BigIntegerField()
+    # added: created_at, updated: updated_at, acquired: date_acquired (midnight)
+    occurred_at = models.DateTimeField()
+
+    # Card payload (default region; `regional` holds {region code: {title, image, meta}} for games)
+    slug = models.SlugField()
+    title = models.CharField(max_length=200)
+    image = models.ImageField(blank=True, max_length=255)
+    image_meta = models.JSONField(default=dict, blank=True)
+    regional = models.JSONField(default=dict, blank=True)
+    owned = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['item_type', 'object_id', 'verb'], name='unique_activity_per_item'),
+        ]
+        indexes = [
+            # The rails: WHERE verb = ? AND owned ORDER BY occurred_at DESC LIMIT 8
+            models.Index(fields=['verb', 'owned', '-occurred_at'], name='activity_feed_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} {self.verb} ({self.occurred_at:%Y-%m-%d})"
+
+    def get_absolute_url(self):
+        if self.item_type == self.GAME:
+            return reverse('library:game_detail', args=[self.slug])
+        return reverse('hardware:hardware_detail', args=[self.slug])
+
+    def localize(self, region):
+        # Swap in the regional title/art (games only)
+        local = (self.regional or {}).get(region)
+        if local:
+            self.title = local['title']
+            self.image = local['image']
+            self.image_meta = {'image': local['meta']} if local['meta'] else {}
+        return self
+
+
+@receiver(post_save, sender=Game)
+@receiver(post_save, sender=Hardware)
+def refresh_activity_on_save(sender, instance, raw=False, **kwargs):
+    if raw: return
+    from .activity import refresh_activity
+    refresh_activity(sender, [instance.pk])
+
+
+@receiver(post_save, sender=RegionalRelease)
+@receiver(post_delete, sender=RegionalRelease)
+def refresh_activity_on_release_change(sender, instance, raw=False, origin=None, **kwargs):
+    if raw: return
+    # Cascading from a Game delete: the events go with the game
+    if origin is not None and getattr(origin, 'model', type(origin)) is not RegionalRelease: return
+    from .activity import refresh_activity
+    refresh_activity(Game, [instance.game_id])
+
+
+@receiver(post_delete, sender=Game)
+@receiver(post_delete, sender=Hardware)
+def delete_activity(sender, instance, **kwargs):
+    item_type = ActivityEvent.GAME if sender is Game else ActivityEvent.HARDWARE
+    ActivityEvent.objects.filter(item_type=item_type, object_id=instance.pk).delete()
+
+
+# ==========================================
+# 5. HOME PAGE CACHE INVALIDATION (see core/pagecache.py)
+# ==========================================
+@receiver(post_save, sender=NetworkVideo)
+@receiver(post_delete, sender=NetworkVideo)
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+@receiver(post_save, sender=Hardware)
+@receiver(post_delete, sender=Hardware)
+@receiver(post_save, sender=RegionalRelease)
+@receiver(post_delete, sender=RegionalRelease)
+def bump_home_version(sender, raw=False, **kwargs):
+    if raw: return
+    from .pagecache import bump_version
+    bump_version('home')
@@ -0,0 +1,94 @@
+import logging
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.utils.safestring import mark_safe
+
+logger = logging.getLogger(__name__)
+
+# Defaults (override in settings.py)
+DEFAULT_TIMEOUT = 60 * 60      # Rebuild at least this often even without a bump
+LOCK_TIMEOUT = 30              # A rebuild that takes longer than this is presumed dead
+COLD_WAIT = 5                  # How long a request waits for another worker's first build
+
+
+def version_cache():
+    """
+    Where versions and rebuild locks live: the 'versions' cache when one is
+    configured (production: a table that is never culled, since an evicted
+    version silently drops an invalidation), else the default cache.
+    """
+    return caches['versions'] if 'versions' in settings.CACHES else cache
+
+
+def get_version(name):
+    """
+    The current content version of a cached page. Bumped (replaced by a
+    fresh random token) whenever its source data changes.
+    """
+    key = f'pagecache:{name}:version'
+    versions = version_cache()
+    version = versions.get(key)
+    if version is None:
+        # add(), not set(): workers missing the key together all end up with the first token
+        versions.add(key, uuid.uuid4().hex, None)
+        version = versions.get(key)
+    return version
+
+
+def bump_version(name):
+    # A new token rather than incr(): no lost updates, no missing-key errors
+    version = uuid.uuid4().hex
+    version_cache().set(f'pagecache:{name}:version', version, None)
+    return version
+
+
+def cached_fragment(name, variant, build):
+    """
+    Returns the HTML from build() for one variant of a page (e.g. the
+    home content for anonymous NTSC-J visitors), rebuilding it only when
+    the page's version was bumped or the copy is older than the timeout.
+
+    Dogpile protection: after an invalidation, one request takes a lock in
+    the shared cache and rebuilds; everyone else keeps serving the previous
+    copy meanwhile (or, on a cold cache, waits briefly for it).
+    """
+    if not getattr(settings, 'PAGE_CACHE_ENABLED', True):
+        return mark_safe(build())
+
+    timeout = getattr(settings, 'PAGE_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+    key = f'pagecache:{name}:{variant}'
+    version = get_version(name)
+
+    entry = cache.get(key)
+    if _is_fresh(entry, version, timeout):
+        return mark_safe(entry['html'])
+
+    lock_key, locks = f'{key}:lock', version_cache()
+    if locks.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            html = build()
+            # Long-lived: a stale copy is what everyone else serves during the next rebuild
+            cache.set(key, {'version': version, 'built': time.time(), 'html': html}, None)
+            return mark_safe(html)
+        finally:
+            locks.delete(lock_key)
+
+    if entry is not None:
+        return mark_safe(entry['html'])  # Someone else is rebuilding: the previous copy will do
+
+    # Cold cache and another request is building it: wait for that instead of piling on
+    deadline = time.monotonic() + COLD_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+        entry = cache.get(key)
+        if entry is not None:
+            return mark_safe(entry['html'])
+    logger.warning("Page cache %s: gave up waiting for a rebuild", key)
+    return mark_safe(build())
+
+
+def _is_fresh(entry, version, timeout):
+    return (entry is not None and entry['version'] == version
+            and time.time() - entry['built'] < timeout)
@@ -0,0 +1,184 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+
+
+class CursorPaginator:
+    """
+    Keyset ("seek") pagination: each page is fetched with a WHERE on the sort
+    keys of the row it continues from, instead of COUNT(*) + OFFSET n.
+
+    The queryset's own order_by() is used as the key; the primary key is
+    appended as a tie-breaker so every row has a unique position. NULLs
+    always sort last. Pages link to each other with opaque cursor tokens.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.per_page = per_page
+        self.keys = self._parse_ordering(queryset)
+        self.queryset = queryset
+
+    def get_page(self, cursor=None):
+        """
+        Returns the page for a cursor token; bad/missing tokens give page 1.
+        """
+        position = self._decode(cursor)
+        if position is None:
+            rows = list(self._ordered(self.queryset)[:self.per_page + 1])
+            return CursorPage(rows[:self.per_page], self, number=1,
+                              has_next=len(rows) > self.per_page, has_previous=False)
+
+        values, direction, number = position
+        if direction == 'next':
+            qs = self._ordered(self.queryset.filter(self._seek(values, forward=True)))
+            rows = list(qs[:self.per_page + 1])
+            return CursorPage(rows[:self.per_page], self, number=number,
+                              has_next=len(rows) > self.per_page, has_previous=True)
+
+        qs = self._ordered(self.queryset.filter(self._seek(values, forward=False)), reverse=True)
+        rows = list(qs[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        return CursorPage(list(reversed(rows[:self.per_page])), self, number=number if has_previous else 1,
+                          has_next=True, has_previous=has_previous)
+
+    # Only run when a template actually asks for totals
+    @cached_property
+    def count(self):
+        return self.queryset.count()
+
+    @cached_property
+    def num_pages(self):
+        return max(1, -(-self.count // self.per_page))
+
+    # ---------------------------
+    # Tokens
+    # ---------------------------
+    def encode(self, obj, direction, number):
+        values = [_dump_value(getattr(obj, name)) for name, desc, nullable in self.keys]
+        raw = json.dumps({'k': values, 'd': direction, 'n': number}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def _decode(self, token):
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            data = json.loads(raw)
+            values = [self._load_value(name, v) for (name, desc, nullable), v in zip(self.keys, data['k'], strict=True)]
+            direction = data['d'] if data['d'] in ('next', 'prev') else 'next'
+            return values, direction, int(data['n'])
+        except (ValueError, TypeError, KeyError, ValidationError, binascii.Error):
+            return None
+
+    def _load_value(self, name, value):
+        if value is None:
+            return None
+        try:
+            field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return value  # Annotation (e.g. a search rank): plain JSON value
+        return field.to_python(value)
+
+    # ---------------------------
+    # Query building
+    # ---------------------------
+    def _parse_ordering(self, queryset):
+        meta = queryset.model._meta
+        keys = []
+        for item in queryset.query.order_by:
+            if not isinstance(item, str):
+                raise ValueError("CursorPaginator needs plain field names in order_by()")
+            name = item.lstrip('-')
+            if name == 'pk':
+                name = meta.pk.name
+            try:
+                nullable = meta.get_field(name).null
+            except FieldDoesNotExist:
+                nullable = False  # Annotations we order by are never NULL
+            keys.append((name, item.startswith('-'), nullable))
+
+        if not keys or keys[-1][0] != meta.pk.name:
+            keys.append((meta.pk.name, False, False))
+        return keys
+
+    def _ordered(self, queryset, reverse=False):
+        # Walking backwards flips every key, so NULLs move to the front
+        order = []
+        for name, desc, nullable in self.keys:
+            if reverse:
+                order.append(F(name).asc(nulls_first=True) if desc else F(name).desc(nulls_first=True))
+            else:
+                order.append(F(name).desc(nulls_last=True) if desc else F(name).asc(nulls_last=True))
+        return queryset.order_by(*order)
+
+    def _seek(self, values, forward):
+        """
+        Rows strictly after (forward) or before the cursor position,
+        as an OR of "equal on the first i keys, then past key i+1".
+        """
+        condition = Q(pk__in=[])
+        equal_so_far = Q()
+        for (name, desc, nullable), value in zip(self.keys, values):
+            condition |= equal_so_far & self._past(name, desc, nullable, value, forward)
+            equal_so_far &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+        return condition
+
+    @staticmethod
+    def _past(name, desc, nullable, value, forward):
+        # With NULLS LAST, nothing comes after NULL and everything non-null comes before it
+        if value is None:
+            return Q(pk__in=[]) if forward else Q(**{f'{name}__isnull': False})
+        lookup = 'lt' if desc == forward else 'gt'
+        past = Q(**{f'{name}__{lookup}': value})
+        if forward and nullable:
+            past |= Q(**{f'{name}__isnull': True})
+        return past
+
+
+class CursorPage:
+    """
+    Template-facing page, shaped like django.core.paginator.Page.
+    """
+
+    def __init__(self, object_list, paginator, number, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.number = number
+        self._has_next = has_next and bool(object_list)
+        self._has_previous = has_previous and bool(object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @cached_property
+    def next_cursor(self):
+        return self.paginator.encode(self.object_list[-1], 'next', self.number + 1) if self._has_next else None
+
+    @cached_property
+    def previous_cursor(self):
+        return self.paginator.encode(self.object_list[0], 'prev', max(self.number - 1, 1)) if self._has_previous else None
+
+
+def _dump_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
@@ -0,0 +1,153 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager, ExitStack
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Defaults (override in settings.py)
+DEFAULT_WINDOW = 200        # Requests kept per URL name for the rolling summary
+DEFAULT_DUPLICATES = 3      # Same statement this many times in one request = likely N+1
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def fingerprint(sql):
+    """
+    Normalizes a statement so repeats with different parameters match:
+    collapses whitespace, IN (%s, %s, ...) lists and literal numbers/strings.
+    """
+    sql = re.sub(r'\s+', ' ', sql).strip()
+    sql = re.sub(r'\((?:%s|\?)(?:, ?(?:%s|\?))*\)', '(...)', sql)
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    return re.sub(r'\b\d+\b', '?', sql)
+
+
+class QueryRecorder:
+    """
+    Execute-wrapper that tallies every statement run on a connection:
+    count, total time and a counter of fingerprints.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0  # seconds
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duration_ms(self):
+        return self.duration * 1000
+
+    def duplicates(self, threshold=None):
+        """
+        {fingerprint: times run} for statements repeated >= threshold times.
+        """
+        threshold = threshold or getattr(settings, 'QUERY_BUDGET_DUPLICATES', DEFAULT_DUPLICATES)
+        return {sql: n for sql, n in self.fingerprints.most_common() if n >= threshold}
+
+
+@contextmanager
+def record_queries():
+    """
+    Records queries on every configured database for the duration of the block.
+    """
+    recorder = QueryRecorder()
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        yield recorder
+
+
+def get_budget(url_name):
+    """
+    Max queries allowed for a URL name ('library:game_detail'), or None.
+    """
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(url_name)
+
+
+def check_budget(url_name, recorder):
+    """
+    Logs (or raises, with QUERY_BUDGET_ACTION = 'raise') when a request went
+    over its budget. Duplicate statements are always logged.
+    """
+    duplicates = recorder.duplicates()
+    for sql, n in duplicates.items():
+        logger.warning("%s ran the same query %d times (possible N+1): %s", url_name, n, sql[:300])
+
+    budget = get_budget(url_name)
+    if budget is None or recorder.count <= budget:
+        return
+
+    message = f"{url_name} ran {recorder.count} queries (budget {budget})"
+    if getattr(settings, 'QUERY_BUDGET_ACTION', 'log') == 'raise':
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+# ---------------------------
+# Rolling per-URL summary
+# ---------------------------
+class QueryStats:
+    """
+    In-process ring buffer of the last N requests per URL name.
+    Per worker: each process reports its own traffic.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(self._new_window)
+        self._duplicates = defaultdict(Counter)
+
+    @staticmethod
+    def _new_window():
+        return deque(maxlen=getattr(settings, 'QUERY_BUDGET_WINDOW', DEFAULT_WINDOW))
+
+    def add(self, url_name, recorder):
+        with self._lock:
+            duplicates = recorder.duplicates()
+            self._samples[url_name].append((recorder.count, recorder.duration_ms, sum(duplicates.values())))
+            self._duplicates[url_name].update(duplicates.keys())
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._duplicates.clear()
+
+    def summary(self):
+        """
+        One row per URL name, worst average query count first.
+        """
+        rows = []
+        with self._lock:
+            for url_name, samples in self._samples.items():
+                counts = sorted(s[0] for s in samples)
+                rows.append({
+                    'url_name': url_name,
+                    'requests': len(samples),
+                    'avg_queries': sum(counts) / len(counts),
+                    'p95_queries': counts[min(len(counts) - 1, int(len(counts) * 0.95))],
+                    'max_queries': counts[-1],
+                    'avg_ms': sum(s[1] for s in samples) / len(samples),
+                    'duplicate_queries': sum(s[2] for s in samples),
+                    'top_duplicate': next(iter(self._duplicates[url_name].most_common(1)), (None, 0))[0],
+                    'budget': get_budget(url_name),
+                })
+        return sorted(rows, key=lambda row: row['avg_queries'], reverse=True)
+
+
+stats = QueryStats()
@@ -0,0 +1,49 @@
+from contextlib import contextmanager
+from django.urls import resolve
+from .querybudget import record_queries, get_budget
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin for keeping views inside their query budgets in CI:
+
+        class GameDetailTests(QueryBudgetMixin, TestCase):
+            def test_budget(self):
+                self.assertWithinQueryBudget('/library/some-game/')
+    """
+
+    def assertWithinQueryBudget(self, path, budget=None, max_duplicates=None, **extra):
+        """
+        GETs `path` with self.client and fails when it runs more queries than
+        `budget` (default: settings.QUERY_BUDGETS for its URL name), or
+        repeats one statement more than `max_duplicates` times.
+        Returns the response.
+        """
+        if budget is None:
+            budget = get_budget(resolve(path.split('?')[0]).view_name)
+            if budget is None:
+                self.fail(f"No QUERY_BUDGETS entry for {path}")
+
+        with record_queries() as recorder:
+            response = self.client.get(path, **extra)
+
+        self.assertLessEqual(recorder.count, budget, self._budget_report(path, recorder, budget))
+        if max_duplicates is not None:
+            worst = max(recorder.fingerprints.values(), default=0)
+            self.assertLessEqual(worst, max_duplicates, self._budget_report(path, recorder, budget))
+        return response
+
+    @contextmanager
+    def assertQueryBudget(self, budget):
+        """
+        Like assertNumQueries, but an upper bound: `with self.assertQueryBudget(5): ...`
+        """
+        with record_queries() as recorder:
+            yield recorder
+        self.assertLessEqual(recorder.count, budget, self._budget_report('block', recorder, budget))
+
+    @staticmethod
+    def _budget_report(label, recorder, budget):
+        lines = [f"{label}: {recorder.count} queries (budget {budget})"]
+        lines += [f"  {n}x {sql[:200]}" for sql, n in recorder.fingerprints.most_common(5)]
+        return '\n'.join(lines)
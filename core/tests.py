@@ -1,3 +1,753 @@
-from django.test import TestCase
+import base64
+import csv
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO, TextIOWrapper
+from unittest import mock
+from PIL import Image
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.forms import modelform_factory
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from hardware.models import Hardware
+from library.models import Game, Platform, Developer, Publisher, Region, RegionalRelease
+from . import activity, pagecache
+from .downloader import ArtDownloader
+from .exporter import export_queryset, game_row
+from .importer import GameImporter, join_names, split_names
+from .pagecache import bump_version, cached_fragment, get_version
+from .pagination import CursorPaginator
+from .models import ActivityEvent, ImportCheckpoint, NetworkVideo, VideoFeed
+from .videosync import sync_videos
+from .querybudget import fingerprint, record_queries, stats, QueryBudgetExceeded
+from .testing import QueryBudgetMixin
 
-# Create your tests here.
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        platform = Platform.objects.create(name='PlayStation', slug='ps1', manufacturer='Sony')
+        cls.developer = developer = Developer.objects.create(name='Capcom', slug='capcom')
+        region = Region.objects.create(name='NTSC-U', slug='ntsc-u')
+        for i in range(25):
+            game = Game.objects.create(title=f'Game {i}', slug=f'game-{i}', platform=platform, own_game=True)
+            game.developers.add(developer)
+            game.regions.add(region)
+
+    def setUp(self):
+        stats.clear()
+
+    def test_fingerprint_ignores_parameters(self):
+        self.assertEqual(fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+                         fingerprint('SELECT  *  FROM t WHERE id IN (%s)'))
+        self.assertEqual(fingerprint("SELECT 1 FROM t WHERE name = 'a'"),
+                         fingerprint("SELECT 2 FROM t WHERE name = 'b'"))
+
+    def test_recorder_flags_repeated_queries(self):
+        with record_queries() as recorder:
+            for game in Game.objects.all()[:5]:
+                list(game.developers.all())
+        self.assertEqual(recorder.count, 6)
+        self.assertEqual(list(recorder.duplicates().values()), [5])
+
+    @override_settings(DEBUG=True)
+    def test_server_timing_header_and_summary(self):
+        response = self.client.get('/library/')
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries"')
+
+        row = next(r for r in stats.summary() if r['url_name'] == 'library:game_list')
+        self.assertEqual(row['requests'], 1)
+        self.assertEqual(row['max_queries'], response.wsgi_request.query_recorder.count)
+
+    def test_no_server_timing_for_anonymous_in_production(self):
+        self.assertNotIn('Server-Timing', self.client.get('/library/'))
+
+    @override_settings(QUERY_BUDGETS={'library:game_list': 1}, QUERY_BUDGET_ACTION='raise')
+    def test_over_budget_raises(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get('/library/')
+
+    @override_settings(QUERY_BUDGETS={'library:game_list': 1})
+    def test_over_budget_logs_by_default(self):
+        with self.assertLogs('core.querybudget', level='WARNING'):
+            self.assertEqual(self.client.get('/library/').status_code, 200)
+
+    def test_streamed_body_is_counted(self):
+        # The export runs its queries while the body is sent, after the view returned
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+        response = self.client.get(reverse('core:export_games', args=['csv']))
+        self.assertNotIn('core:export_games', [r['url_name'] for r in stats.summary()])
+        with record_queries() as body:
+            b''.join(response.streaming_content)
+        row = next(r for r in stats.summary() if r['url_name'] == 'core:export_games')
+        self.assertGreater(row['max_queries'], body.count)  # Session/user lookups plus the whole body
+
+        with override_settings(QUERY_BUDGETS={'core:export_games': 3}, QUERY_BUDGET_ACTION='raise'):
+            response = self.client.get(reverse('core:export_games', args=['csv']))
+            with self.assertRaises(QueryBudgetExceeded):
+                b''.join(response.streaming_content)
+
+    def test_list_views_within_budget(self):
+        for path in ('/', '/videos/', '/library/', f'/library/?developers={self.developer.pk}', '/hardware/'):
+            with self.subTest(path=path):
+                self.assertWithinQueryBudget(path, max_duplicates=2)
+
+    def test_game_detail_within_budget(self):
+        self.assertWithinQueryBudget('/library/game/game-1/')
+
+    def test_query_report_is_staff_only(self):
+        self.assertEqual(self.client.get('/staff/queries/').status_code, 302)
+
+        User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.login(username='admin', password='pw')
+        self.client.get('/library/')
+        response = self.client.get('/staff/queries/')
+        self.assertContains(response, 'library:game_list')
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        platform = Platform.objects.create(name='Saturn', slug='saturn', manufacturer='Sega')
+        for i in range(13):
+            # Three titles and three dates (plus NULLs): most rows tie on the sort key
+            Game.objects.create(title=f'Game {i % 3}', slug=f'game-{i}', platform=platform,
+                                release_date=date(1995 + i % 3, 1, 1) if i % 4 else None)
+
+    def crawl(self, queryset, per_page=4):
+        """
+        Follows the next cursors from page 1, then the previous ones back.
+        Returns (pks per page going forward, pks per page coming back).
+        """
+        paginator = CursorPaginator(queryset, per_page)
+        forward, backward = [], []
+        page = paginator.get_page()
+        while True:
+            forward.append([game.pk for game in page])
+            if not page.has_next():
+                break
+            page = paginator.get_page(page.next_cursor)
+        while page.has_previous():
+            page = paginator.get_page(page.previous_cursor)
+            backward.insert(0, [game.pk for game in page])
+        self.assertEqual(page.number, 1)
+        return forward, backward + [forward[-1]]
+
+    def test_every_row_once_in_order(self):
+        for ordering, expected in (
+            (['title'], sorted(Game.objects.all(), key=lambda g: (g.title, g.pk))),
+            (['-title'], sorted(Game.objects.all(), key=lambda g: (g.title, -g.pk), reverse=True)),
+            # NULLs last in both directions, pk breaking the ties
+            (['release_date'], sorted(Game.objects.all(), key=lambda g: (g.release_date is None, g.release_date or 0, g.pk))),
+            (['-release_date', 'title'], sorted(Game.objects.all(), key=lambda g: (
+                g.release_date is None, -(g.release_date or date.min).toordinal(), g.title, g.pk))),
+        ):
+            with self.subTest(ordering=ordering):
+                forward, backward = self.crawl(Game.objects.order_by(*ordering))
+                self.assertEqual([pk for rows in forward for pk in rows], [g.pk for g in expected])
+                self.assertEqual(backward, forward)
+                self.assertEqual([len(rows) for rows in forward], [4, 4, 4, 1])
+
+    def test_token_round_trip(self):
+        paginator = CursorPaginator(Game.objects.order_by('-release_date', 'title'), 4)
+        game = Game.objects.exclude(release_date=None).first()
+        values, direction, number = paginator._decode(paginator.encode(game, 'prev', 3))
+        self.assertEqual(values, [game.release_date, game.title, game.pk])
+        self.assertEqual((direction, number), ('prev', 3))
+
+        undated = Game.objects.filter(release_date=None).first()
+        self.assertEqual(paginator._decode(paginator.encode(undated, 'next', 2))[0], [None, undated.title, undated.pk])
+
+    def test_bad_tokens_give_page_one(self):
+        paginator = CursorPaginator(Game.objects.order_by('release_date'), 4)
+        first = [game.pk for game in paginator.get_page()]
+
+        def token(data):
+            return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+
+        for cursor in ('', 'garbage!', token([1, 2]), token({'k': ['1995-01-01'], 'd': 'next', 'n': 2}),
+                       token({'k': ['not a date', 1], 'd': 'next', 'n': 2}),
+                       token({'k': ['1995-01-01', 1], 'd': 'next', 'n': 'two'}), token({'d': 'next'})):
+            with self.subTest(cursor=cursor):
+                page = paginator.get_page(cursor)
+                self.assertEqual((page.number, [game.pk for game in page]), (1, first))
+                self.assertFalse(page.has_previous())
+
+        # An unknown direction reads as "next"
+        page = paginator.get_page(token({'k': [None, 0], 'd': 'sideways', 'n': 2}))
+        self.assertEqual(page.number, 2)
+
+
+class ExportGamesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        dreamcast = Platform.objects.create(name='Dreamcast', slug='dreamcast', manufacturer='Sega')
+        saturn = Platform.objects.create(name='Saturn', slug='saturn', manufacturer='Sega')
+        ntsc_u = Region.objects.create(name='NTSC-U', slug='ntsc-u')
+        ntsc_j = Region.objects.create(name='NTSC-J', slug='ntsc-j')
+        sega = Developer.objects.create(name='Sega AM2', slug='sega-am2')
+        # Commas and quotes inside a name must survive the comma separated CSV cell
+        foo = Publisher.objects.create(name='Foo, Inc.', slug='foo-inc')
+        quoted = Publisher.objects.create(name='"Quoted" Games', slug='quoted-games')
+        cls.shenmue = Game.objects.create(
+            title='Shenmue', platform=dreamcast, slug='shenmue-dreamcast', description='Ryo "the" Hazuki,\nYokosuka',
+            release_date=date(1999, 12, 29), own_game=True, own_manual=True, date_acquired=date(2024, 5, 4),
+            condition_notes='Disc 3 scratched')
+        cls.shenmue.developers.add(sega)
+        cls.shenmue.publishers.add(foo, quoted)
+        cls.shenmue.regions.add(ntsc_u, ntsc_j)
+        cls.shenmue.owned_regions.add(ntsc_j)
+        RegionalRelease.objects.create(game=cls.shenmue, region_code='NTSC-J', title='シェンムー 一章 横須賀',
+                                       release_date=date(1999, 12, 29))
+        RegionalRelease.objects.create(game=cls.shenmue, region_code='PAL', title='Shenmue')
+        Game.objects.create(title='Virtua Fighter', platform=saturn, slug='virtua-fighter-saturn',
+                            game_format='DIGITAL')
+
+    def rows(self):
+        # Every game as game_row() sees it, with lists in a stable order
+        rows = []
+        for game in export_queryset():
+            row = game_row(game)
+            rows.append({k: sorted(v, key=str) if isinstance(v, list) else v for k, v in row.items()})
+        return rows
+
+    def test_export_then_import_round_trips(self):
+        before = self.rows()
+        self.assertEqual(before[0]['Owned Regions'], ['NTSC-J'])
+        self.assertEqual(before[0]['Date Acquired'], '2024-05-04')
+        self.assertEqual(before[0]['Publishers'], ['"Quoted" Games', 'Foo, Inc.'])
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp)
+        for name in ('games.csv', 'games.jsonl'):
+            with self.subTest(format=name):
+                path = os.path.join(tmp, name)
+                out = StringIO()
+                call_command('export_games', path, stdout=out)
+                self.assertIn('Exported 2 games', out.getvalue())
+
+                Game.objects.all().delete()
+                call_command('import_games', path, stdout=out)
+                self.assertIn('Imported 2 new games', out.getvalue())
+                self.assertEqual(self.rows(), before)
+
+    def test_credit_cells(self):
+        self.assertEqual(split_names(' Sega,"Foo, Inc.",  Capcom ,'), ['Sega', 'Foo, Inc.', 'Capcom'])
+        self.assertEqual(split_names(['Foo, Inc.']), ['Foo, Inc.'])  # JSONL lists
+        names = ['Sega', 'Foo, Inc.', '"Quoted" Games', 'Ryo "the" Hazuki']
+        self.assertEqual(join_names(names), 'Sega, "Foo, Inc.", """Quoted"" Games", "Ryo ""the"" Hazuki"')
+        self.assertEqual(split_names(join_names(names)), names)
+
+    def test_staff_download_is_streamed(self):
+        Game.objects.filter(pk=self.shenmue.pk).update(box_art='games/covers/shenmue.jpg')
+        url = reverse('core:export_games', args=['csv'])
+        self.assertEqual(self.client.get(url).status_code, 302)  # Staff only
+
+        self.client.force_login(User.objects.create_user('staff', password='x', is_staff=True))
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertRegex(response['Content-Disposition'], r'attachment; filename="games-\d{4}-\d{2}-\d{2}\.csv"')
+        rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['Title'] for row in rows], ['Shenmue', 'Virtua Fighter'])
+        self.assertEqual(rows[0]['Own Game'], 'TRUE')
+        self.assertEqual(json.loads(rows[0]['Regional Releases'])[0]['Title'], 'シェンムー 一章 横須賀')
+        self.assertEqual(rows[0]['Image URL'], 'http://testserver/media/games/covers/shenmue.jpg')
+
+        response = self.client.get(reverse('core:export_games', args=['jsonl']))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(json.loads(lines[1])['Format'], 'DIGITAL')
+        self.assertEqual(self.client.get(reverse('core:export_games', args=['xml'])).status_code, 404)
+
+
+class ActivityTests(TestCase):
+    def setUp(self):
+        self.platform = Platform.objects.create(name='Dreamcast', slug='dreamcast', manufacturer='Sega')
+        self.today = timezone.localdate()
+
+    def game(self, i, own_game=True, acquired_days_ago=None):
+        acquired = self.today - timedelta(days=acquired_days_ago) if acquired_days_ago is not None else None
+        return Game.objects.create(title=f'Game {i}', slug=f'game-{i}', platform=self.platform,
+                                   own_game=own_game, date_acquired=acquired)
+
+    def events(self, obj, item_type=ActivityEvent.GAME):
+        return {e.verb: e for e in ActivityEvent.objects.filter(item_type=item_type, object_id=obj.pk)}
+
+    def test_events_follow_the_model_signals(self):
+        game = self.game(1, acquired_days_ago=3)
+        events = self.events(game)
+        self.assertEqual(set(events), {ActivityEvent.ADDED, ActivityEvent.UPDATED, ActivityEvent.ACQUIRED})
+        self.assertEqual(events[ActivityEvent.ACQUIRED].occurred_at.date(), game.date_acquired)
+        self.assertTrue(events[ActivityEvent.ADDED].owned)
+
+        # A regional release changes the localized card
+        RegionalRelease.objects.create(game=game, region_code='NTSC-J', title='ゲーム 1')
+        event = self.events(game)[ActivityEvent.UPDATED]
+        self.assertEqual(event.localize('NTSC-J').title, 'ゲーム 1')
+
+        # Not owned any more: no acquisition, and out of the (owned only) feed
+        game.own_game, game.date_acquired = False, None
+        game.save()
+        self.assertEqual(set(self.events(game)), {ActivityEvent.ADDED, ActivityEvent.UPDATED})
+        self.assertFalse(activity.feed().exists())
+
+        hardware = Hardware.objects.create(name='Dreamcast HKT-3020', slug='dreamcast-hkt-3020', own_item=True)
+        self.assertEqual(self.events(hardware, ActivityEvent.HARDWARE)[ActivityEvent.ADDED].title, 'Dreamcast HKT-3020')
+
+        game.delete()
+        hardware.delete()
+        self.assertFalse(ActivityEvent.objects.exists())
+
+    def test_acquisitions_within_the_window(self):
+        inside = self.game(1, acquired_days_ago=activity.ACQUISITION_WINDOW_DAYS)
+        self.game(2, acquired_days_ago=activity.ACQUISITION_WINDOW_DAYS + 1)
+        self.game(3, own_game=False, acquired_days_ago=1)
+        self.assertEqual([e.object_id for e in activity.recent_acquisitions('NTSC-U')], [inside.pk])
+
+    def test_rails_are_newest_first_and_capped(self):
+        games = [self.game(i, acquired_days_ago=i) for i in range(activity.RAIL_SIZE + 2)]
+        self.game(99, own_game=False)
+        self.assertEqual([e.object_id for e in activity.recent_acquisitions('NTSC-U')],
+                         [g.pk for g in games[:activity.RAIL_SIZE]])
+
+        # Updated rail: by updated_at, newest first
+        now, hours = timezone.now(), {game.pk: i * 7 % 10 for i, game in enumerate(games)}  # Shuffled
+        for game in games:
+            Game.objects.filter(pk=game.pk).update(updated_at=now - timedelta(hours=hours[game.pk]))
+        activity.refresh_activity(Game, hours)
+        expected = sorted(games, key=lambda game: hours[game.pk])
+        self.assertEqual([e.object_id for e in activity.recently_updated('NTSC-U')],
+                         [g.pk for g in expected[:activity.RAIL_SIZE]])
+        self.assertEqual(len(activity.recently_updated('NTSC-U', limit=3)), 3)
+
+
+class PageCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.builds = []
+
+    def build(self, html='<p>home</p>', delay=0):
+        def build():
+            self.builds.append(html)
+            time.sleep(delay)
+            return html
+        return build
+
+    def test_bump_version_invalidates(self):
+        self.assertEqual(cached_fragment('home', 'anon', self.build()), '<p>home</p>')
+        self.assertEqual(cached_fragment('home', 'anon', self.build('<p>new</p>')), '<p>home</p>')
+        self.assertEqual(len(self.builds), 1)
+
+        bump_version('home')
+        self.assertEqual(cached_fragment('home', 'anon', self.build('<p>new</p>')), '<p>new</p>')
+        # Other pages keep their copies
+        cached_fragment('videos', 'anon', self.build())
+        bump_version('home')
+        cached_fragment('videos', 'anon', self.build())
+        self.assertEqual(self.builds, ['<p>home</p>', '<p>new</p>', '<p>home</p>'])
+
+    def test_missing_version_is_created_once(self):
+        # Two workers miss the key together: the one that adds second adopts the first token
+        versions = pagecache.version_cache()
+        with mock.patch.object(versions, 'get', side_effect=[None, 'first']), \
+                mock.patch.object(versions, 'add', return_value=False) as add:
+            self.assertEqual(get_version('home'), 'first')
+        add.assert_called_once()
+        self.assertEqual(get_version('home'), get_version('home'))
+
+    def test_one_request_rebuilds_while_the_others_serve_the_stale_copy(self):
+        cached_fragment('home', 'anon', self.build('<p>old</p>'))
+        bump_version('home')
+
+        barrier, results = threading.Barrier(5), []
+
+        def request():
+            barrier.wait()
+            results.append(str(cached_fragment('home', 'anon', self.build('<p>new</p>', delay=0.5))))
+        threads = [threading.Thread(target=request) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.builds, ['<p>old</p>', '<p>new</p>'])
+        self.assertEqual(sorted(results), ['<p>new</p>'] + ['<p>old</p>'] * 4)
+        self.assertEqual(cached_fragment('home', 'anon', self.build()), '<p>new</p>')
+
+    def test_cold_cache_waits_for_the_builder_then_falls_back(self):
+        pagecache.version_cache().add('pagecache:home:anon:lock', 1)  # Another request is building
+        with mock.patch.object(pagecache, 'COLD_WAIT', 0.3), self.assertLogs('core.pagecache', 'WARNING'):
+            self.assertEqual(cached_fragment('home', 'anon', self.build()), '<p>home</p>')
+        self.assertEqual(len(self.builds), 1)  # Built, but not stored: the lock holder will store its copy
+        self.assertIsNone(cache.get('pagecache:home:anon'))
+
+
+class ArtServer(BaseHTTPRequestHandler):
+    """
+    Local stand-in for an art host: /art/<n>.png is served with an ETag
+    (honouring If-None-Match), /missing/... is a 404.
+    Records the requests and the peak number served at once.
+    """
+    lock = threading.Lock()
+    active = peak = 0
+    requests = []
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+            cls.requests.append((self.path, self.headers.get('If-None-Match')))
+        try:
+            time.sleep(0.05)
+            if self.path.startswith('/missing/'):
+                self.send_response(404)
+                self.end_headers()
+                return
+            etag = f'"{self.path}"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            body = f'art for {self.path}'.encode()
+            self.send_response(200)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class ArtDownloaderTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), ArtServer)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        ArtServer.requests, ArtServer.peak = [], 0
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+
+    def fetch(self, urls, **kwargs):
+        downloader = ArtDownloader(cache_dir=self.cache_dir, **kwargs)
+        results = {key: content for key, url, content in downloader.fetch_all(enumerate(urls))}
+        return results, downloader.stats
+
+    def test_downloads_concurrently_within_the_host_limit(self):
+        urls = [f'{self.base}/art/{i}.png' for i in range(12)]
+        results, stats = self.fetch(urls, max_workers=8, per_host=3)
+
+        self.assertEqual(results[4], b'art for /art/4.png')
+        self.assertEqual((stats.downloaded, stats.hits, stats.failed), (12, 0, 0))
+        self.assertEqual(stats.bytes, sum(len(f'art for /art/{i}.png') for i in range(12)))
+        self.assertGreater(ArtServer.peak, 1)
+        self.assertLessEqual(ArtServer.peak, 3)
+
+    def test_reimport_revalidates_from_the_cache(self):
+        urls = [f'{self.base}/art/{i}.png' for i in range(4)]
+        self.fetch(urls)
+        ArtServer.requests = []
+
+        results, stats = self.fetch(urls)
+        self.assertEqual(results[2], b'art for /art/2.png')
+        self.assertEqual((stats.downloaded, stats.hits, stats.bytes), (0, 4, 0))
+        # Every request was conditional
+        self.assertTrue(all(etag for path, etag in ArtServer.requests))
+
+    def test_failures_are_counted_not_raised(self):
+        results, stats = self.fetch([f'{self.base}/missing/1.png', f'{self.base}/art/1.png',
+                                     'http://127.0.0.1:1/unreachable.png'])
+        self.assertEqual(results, {0: None, 1: b'art for /art/1.png', 2: None})
+        self.assertEqual((stats.downloaded, stats.failed), (1, 2))
+
+
+FEED_FIXTURE = os.path.join(os.path.dirname(__file__), 'testdata', 'channel_feed.xml')
+
+NEW_ENTRY = """<entry>
+  <id>yt:video:CrazyTaxi1</id>
+  <yt:videoId>CrazyTaxi01</yt:videoId>
+  <title>Crazy Taxi (Dreamcast) - Review</title>
+  <link rel="alternate" href="https://www.youtube.com/watch?v=CrazyTaxi01"/>
+  <published>2026-10-10T18:00:00+00:00</published>
+  <media:group><media:thumbnail url="{base}/thumbs/CrazyTaxi01.jpg" width="480" height="360"/></media:group>
+ </entry>"""
+
+
+class FeedServer(BaseHTTPRequestHandler):
+    """
+    Local stand-in for YouTube: /feeds/games.xml serves the channel feed
+    fixture (with an ETag, honouring If-None-Match), /thumbs/<id>.jpg a
+    small JPEG, /broken/... a 500. Set `extra` to publish another entry.
+    """
+    base = ''
+    extra = ''
+    requests = []
+
+    def do_GET(self):
+        type(self).requests.append((self.path, self.headers.get('If-None-Match')))
+        if self.path.startswith('/feeds/'):
+            with open(FEED_FIXTURE) as f:
+                body = f.read().replace('{extra}', self.extra).replace('{base}', self.base).encode()
+            etag = f'"{len(body)}"'
+            if self.headers.get('If-None-Match') == etag:
+                return self.reply(304)
+            return self.reply(200, body, ETag=etag, **{'Content-Type': 'application/atom+xml'})
+        if self.path.startswith('/thumbs/'):
+            buffer = BytesIO()
+            Image.new('RGB', (480, 360), (200, 40, 40)).save(buffer, format='JPEG')
+            return self.reply(200, buffer.getvalue(), **{'Content-Type': 'image/jpeg'})
+        self.reply(500)
+
+    def reply(self, status, body=b'', **headers):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class NetworkVideoTests(TestCase):
+    def form(self, url):
+        Form = modelform_factory(NetworkVideo, fields=['title', 'channel', 'video_type', 'url', 'thumbnail'])
+        return Form({'title': 'Shenmue', 'channel': '480pGames', 'video_type': 'gameplay', 'url': url})
+
+    def test_duplicate_video_is_a_form_error(self):
+        self.assertTrue(self.form('https://www.youtube.com/watch?v=Shenmue0001').is_valid())  # No thumbnail needed
+        NetworkVideo.objects.create(title='Shenmue', channel='480pGames', url='https://youtu.be/Shenmue0001')
+
+        form = self.form('https://www.youtube.com/watch?v=Shenmue0001&t=42')
+        self.assertFalse(form.is_valid())
+        self.assertIn('url', form.errors)
+        # Editing the row itself is fine
+        video = NetworkVideo.objects.get()
+        video.title = 'Shenmue (Dreamcast)'
+        video.full_clean()
+
+    def test_parse_video_ids_leaves_duplicates_unparsed(self):
+        # Stored twice before the ids were parsed (bulk_create skips save())
+        NetworkVideo.objects.bulk_create([
+            NetworkVideo(title=f'Copy {i}', channel='480pGames', url=url) for i, url in enumerate(
+                ['https://youtu.be/Shenmue0001', 'https://www.youtube.com/watch?v=Shenmue0001',
+                 'https://youtu.be/JetSetRadio'])])
+        out = StringIO()
+        call_command('parse_video_ids', stdout=out)
+        self.assertIn('core.NetworkVideo: 2 updated (1 duplicates left unparsed)', out.getvalue())
+        self.assertEqual(list(NetworkVideo.objects.order_by('pk').values_list('video_id', flat=True)),
+                         ['Shenmue0001', '', 'JetSetRadio'])
+
+        call_command('parse_video_ids', stdout=out)
+        self.assertIn('core.NetworkVideo: 0 updated (1 duplicates left unparsed)', out.getvalue())
+
+
+class SyncVideosTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FeedServer)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        FeedServer.base = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        FeedServer.requests, FeedServer.extra = [], ''
+        media_root, cache_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.addCleanup(shutil.rmtree, cache_dir)
+        settings = override_settings(MEDIA_ROOT=media_root, ART_CACHE_DIR=cache_dir, TASKS_EAGER=True)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.feed = VideoFeed.objects.create(channel='480pGames', url=f'{FeedServer.base}/feeds/games.xml')
+
+    def test_first_sync_adds_the_feed_videos(self):
+        stats = sync_videos()
+
+        self.assertEqual((stats.feeds, stats.created, stats.thumbnails), (1, 2, 2))
+        videos = list(NetworkVideo.objects.order_by('-created_at'))
+        self.assertEqual([v.video_id for v in videos], ['Shenmue0001', 'JetSetRadio'])
+        shenmue = videos[0]
+        self.assertEqual(shenmue.title, 'Shenmue (Dreamcast) - Full Playthrough')
+        self.assertEqual((shenmue.channel, shenmue.video_type, shenmue.provider), ('480pGames', 'gameplay', 'youtube'))
+        self.assertEqual(shenmue.url, 'https://www.youtube.com/watch?v=Shenmue0001')
+        self.assertEqual(shenmue.created_at.date().isoformat(), '2026-10-02')
+        # Thumbnails went through the image pipeline
+        self.assertTrue(shenmue.thumbnail)
+        self.assertIn('thumbnail', shenmue.image_meta)
+
+        self.feed.refresh_from_db()
+        self.assertTrue(self.feed.etag)
+        self.assertIsNone(self.feed.locked_until)
+
+    def test_unchanged_feed_is_a_conditional_request(self):
+        sync_videos()
+        FeedServer.requests = []
+
+        stats = sync_videos()
+        self.assertEqual((stats.not_modified, stats.created), (1, 0))
+        self.assertEqual(FeedServer.requests, [('/feeds/games.xml', VideoFeed.objects.get().etag)])
+        self.assertEqual(NetworkVideo.objects.count(), 2)
+
+    def test_only_new_entries_are_added(self):
+        NetworkVideo.objects.create(title='Added by hand', channel='480pGames',
+                                    url='https://youtu.be/JetSetRadio', thumbnail='videos/thumbnails/jsr.jpg')
+        sync_videos()
+        FeedServer.extra = NEW_ENTRY.replace('{base}', FeedServer.base)
+
+        stats = sync_videos()
+        self.assertEqual(stats.created, 1)
+        self.assertEqual(NetworkVideo.objects.count(), 3)
+        self.assertEqual(NetworkVideo.objects.get(video_id='JetSetRadio').title, 'Added by hand')
+        self.assertEqual(NetworkVideo.objects.get(video_id='CrazyTaxi01').created_at.date().isoformat(), '2026-10-10')
+
+    def test_feed_leased_by_another_run_is_skipped(self):
+        VideoFeed.objects.update(locked_until=timezone.now() + timedelta(minutes=5))
+        stats = sync_videos()
+        self.assertEqual(stats.feeds, 0)
+        self.assertEqual(FeedServer.requests, [])
+
+        # A lease left behind by a dead run expires
+        VideoFeed.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(sync_videos().created, 2)
+
+    def test_failing_feed_is_recorded_and_released(self):
+        VideoFeed.objects.create(channel='480pReviews', url=f'{FeedServer.base}/broken/reviews.xml')
+
+        with self.assertLogs('core.videosync', level='WARNING'):
+            stats = sync_videos()
+        self.assertEqual((stats.feeds, stats.failed, stats.created), (2, 1, 2))
+        broken = VideoFeed.objects.get(channel='480pReviews')
+        self.assertIn('500', broken.last_error)
+        self.assertIsNone(broken.locked_until)
+        self.assertEqual(broken.etag, '')
+
+    def test_command(self):
+        out = StringIO()
+        call_command('sync_videos', '--channel', '480pGames', stdout=out)
+        self.assertIn('2 new videos', out.getvalue())
+
+
+class ImportGamesTests(TestCase):
+    def setUp(self):
+        self.platform = Platform.objects.create(name='PlayStation 2', slug='ps2', manufacturer='Sony')
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, 'games.csv')
+
+    def write_csv(self, count, title='Game'):
+        with open(self.path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Title', 'Platform', 'Description', 'Own Game'])
+            for i in range(count):
+                # Quoted newlines: a row isn't a line, the checkpoint offset must still land between rows
+                writer.writerow([f'{title} {i:02d}', 'PlayStation 2', f'Line one\nline two of {i}', 'yes'])
+
+    def import_games(self, *args):
+        out = StringIO()
+        call_command('import_games', *args, '--batch-size', '3', stdout=out)
+        return out.getvalue()
+
+    def crash_on_batch(self, number):
+        # save_batch blows up on the given batch, like a process killed mid-file
+        save_batch, calls = GameImporter.save_batch, []
+
+        def crashing(importer, items):
+            calls.append(items)
+            if len(calls) == number:
+                raise RuntimeError("killed")
+            return save_batch(importer, items)
+        return mock.patch.object(GameImporter, 'save_batch', autospec=True, side_effect=crashing)
+
+    def crashed_import(self):
+        self.write_csv(10)
+        with self.crash_on_batch(3), self.assertRaises(RuntimeError):
+            self.import_games(self.path)
+        checkpoint = ImportCheckpoint.objects.get(source=os.path.abspath(self.path))
+        self.assertEqual((checkpoint.rows, checkpoint.finished), (6, False))
+        self.assertEqual(Game.objects.count(), 6)
+        return checkpoint
+
+    def test_resumes_after_a_crash(self):
+        checkpoint = self.crashed_import()
+        out = self.import_games(self.path)
+
+        self.assertIn('Resuming after row 6', out)
+        self.assertIn('Imported 4 new games, updated 0, 0 unchanged (4 rows', out)
+        titles = list(Game.objects.order_by('title').values_list('title', flat=True))
+        self.assertEqual(titles, [f'Game {i:02d}' for i in range(10)])  # None twice, none missing
+        self.assertEqual(Game.objects.get(title='Game 07').description, 'Line one\nline two of 7')
+        checkpoint.refresh_from_db()
+        self.assertEqual((checkpoint.rows, checkpoint.finished), (10, True))
+
+        # A finished file is read from the top again; nothing changed, so nothing is written
+        self.assertIn('0 new games, updated 0, 10 unchanged (10 rows', self.import_games(self.path))
+
+    def test_restart_reads_the_whole_file(self):
+        self.crashed_import()
+        out = self.import_games(self.path, '--restart')
+        self.assertNotIn('Resuming', out)
+        self.assertIn('Imported 4 new games, updated 0, 6 unchanged (10 rows', out)
+
+    def test_changed_file_starts_over(self):
+        self.crashed_import()
+        self.write_csv(10, title='Renamed')
+        out = self.import_games(self.path)
+        self.assertNotIn('Resuming', out)
+        self.assertIn('Imported 10 new games', out)
+        self.assertEqual(ImportCheckpoint.objects.get().rows, 10)
+
+    def test_stdin(self):
+        self.write_csv(5)
+        with open(self.path, 'rb') as f, mock.patch('sys.stdin', TextIOWrapper(BytesIO(f.read()))):
+            out = self.import_games('-')
+        self.assertIn('Imported 5 new games', out)
+        self.assertEqual(Game.objects.count(), 5)
+        self.assertFalse(ImportCheckpoint.objects.exists())  # A pipe can't be resumed
+
+    def test_names_match_case_insensitively(self):
+        Developer.objects.create(name='Capcom', slug='capcom-co')
+        rows = [
+            {'Title': 'Onimusha', 'Platform': 'playstation 2', 'Developers': 'CAPCOM, snk'},
+            {'Title': 'Okami', 'Platform': 'PLAYSTATION 2', 'Developers': 'capcom'},
+            {'Title': 'Metal Slug', 'Platform': 'PlayStation 2', 'Developers': 'SNK'},
+        ]
+        importer = GameImporter(batch_size=2)
+        # Created by someone else after the importer filled its cache
+        Developer.objects.create(name='Sega', slug='sega-ent')
+        importer.run(rows + [{'Title': 'Shinobi', 'Platform': 'ps2', 'Developers': 'SEGA'}])
+
+        self.assertEqual(list(Platform.objects.values_list('slug', flat=True)), ['ps2'])
+        self.assertEqual(sorted(Developer.objects.values_list('name', flat=True)), ['Capcom', 'Sega', 'snk'])
+        self.assertEqual(Game.objects.filter(platform=self.platform).count(), 4)
+        self.assertEqual(list(Game.objects.get(title='Metal Slug').developers.values_list('name', flat=True)), ['snk'])
+        self.assertEqual(list(Game.objects.get(title='Shinobi').developers.values_list('slug', flat=True)), ['sega-ent'])
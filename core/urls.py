@@ -1,5 +1,6 @@
 from django.urls import path
 from . import views
+from .feeds import ActivityFeed
 
 app_name = 'core'
 
@@ -9,4 +10,8 @@ urlpatterns = [
     path('api/update-theme/', views.update_theme, name='update_theme'),
     path('profile/', views.profile, name='profile'),
     path('videos/', views.video_list, name='video_list'),
+    path('activity/', views.activity_feed, name='activity'),
+    path('activity/rss/', ActivityFeed(), name='activity_rss'),
+    path('staff/queries/', views.query_report, name='query_report'),
+    path('staff/export/games.<str:fmt>', views.export_games, name='export_games'),
 ]
\ No newline at end of file
@@ -0,0 +1,203 @@
+import logging
+from calendar import timegm
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone as dt_timezone
+import feedparser
+import requests
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from library.videos import YOUTUBE, parse_video, poster_url
+from .downloader import USER_AGENT, ArtDownloader
+from .models import NetworkVideo, VideoFeed
+from .pagecache import bump_version
+
+logger = logging.getLogger(__name__)
+
+LEASE = timedelta(minutes=10)  # A sync holding a feed longer than this is presumed dead
+
+
+class SyncStats:
+    def __init__(self):
+        self.feeds = 0
+        self.not_modified = 0
+        self.failed = 0
+        self.created = 0
+        self.thumbnails = 0
+
+    def __str__(self):
+        return (f"{self.feeds} feeds ({self.not_modified} unchanged, {self.failed} failed), "
+                f"{self.created} new videos, {self.thumbnails} thumbnails")
+
+
+def sync_videos(channels=None, timeout=10, downloader=None):
+    """
+    Polls the active VideoFeeds concurrently and adds the videos not yet in
+    the archive. Safe to run from cron every few minutes:
+      - each feed is leased with a conditional UPDATE, so an overlapping run skips it
+      - requests are conditional (ETag / Last-Modified): an unchanged feed is a 304
+      - inserts ignore video ids that already exist
+    Returns SyncStats.
+    """
+    stats = SyncStats()
+    feeds = claim_feeds(channels)
+    thumbnails = dict(_missing_thumbnails(channels))
+
+    if feeds:
+        session = requests.Session()
+        session.headers['User-Agent'] = USER_AGENT
+        # Network on the pool, database on this thread (as results come in)
+        with ThreadPoolExecutor(max_workers=min(len(feeds), 4)) as pool:
+            futures = {pool.submit(fetch_feed, session, feed, timeout): feed for feed in feeds}
+            for future in as_completed(futures):
+                feed = futures[future]
+                stats.feeds += 1
+                thumbnails.update(_save_feed(feed, future, stats))
+
+    if thumbnails:
+        downloader = downloader or ArtDownloader(max_workers=settings.ART_DOWNLOAD_WORKERS,
+                                                 per_host=settings.ART_DOWNLOAD_PER_HOST,
+                                                 cache_dir=settings.ART_CACHE_DIR)
+        stats.thumbnails = save_thumbnails(thumbnails.items(), downloader)
+    if stats.created:
+        bump_version('home')
+    return stats
+
+
+def claim_feeds(channels=None):
+    now = timezone.now()
+    feeds = VideoFeed.objects.filter(is_active=True).order_by('pk')
+    if channels:
+        feeds = feeds.filter(channel__in=channels)
+    claimed = []
+    for feed in feeds:
+        won = (VideoFeed.objects.filter(Q(locked_until__isnull=True) | Q(locked_until__lt=now), pk=feed.pk)
+               .update(locked_until=now + LEASE))
+        if won:
+            claimed.append(feed)
+        else:
+            logger.info("Video feed %s is being synced by another run", feed)
+    return claimed
+
+
+def fetch_feed(session, feed, timeout):
+    """
+    Conditional GET of a feed. Returns (response, body), body None on 304.
+    Runs on a worker thread: no database access here.
+    """
+    headers = {}
+    if feed.etag: headers['If-None-Match'] = feed.etag
+    if feed.last_modified: headers['If-Modified-Since'] = feed.last_modified
+    response = session.get(feed.url, headers=headers, timeout=timeout)
+    if response.status_code == 304:
+        return response, None
+    response.raise_for_status()
+    return response, response.content
+
+
+def parse_entries(body):
+    """
+    Returns the feed's videos as dicts (oldest first), skipping entries
+    whose link isn't a recognisable video.
+    """
+    parsed = feedparser.parse(body)
+    if parsed.bozo and not parsed.entries:
+        raise ValueError(f"Unreadable feed: {parsed.get('bozo_exception')}")
+
+    entries = []
+    for entry in parsed.entries:
+        url = entry.get('link', '')
+        provider, video_id = parse_video(url)
+        if entry.get('yt_videoid'):
+            provider, video_id = YOUTUBE, entry.yt_videoid
+            url = f'https://www.youtube.com/watch?v={video_id}'
+        if not video_id:
+            continue
+        published = entry.get('published_parsed') or entry.get('updated_parsed')
+        thumbnails = entry.get('media_thumbnail') or [{}]
+        entries.append({
+            'provider': provider,
+            'video_id': video_id,
+            'title': entry.get('title', '')[:200],
+            'url': url,
+            'published': datetime.fromtimestamp(timegm(published), dt_timezone.utc) if published else None,
+            'thumbnail': thumbnails[0].get('url') or poster_url(provider, video_id),
+        })
+    return entries[::-1]
+
+
+def save_entries(feed, entries):
+    """
+    Inserts the entries not in the archive yet and returns them.
+    """
+    existing = set(NetworkVideo.objects.filter(video_id__in=[e['video_id'] for e in entries])
+                   .values_list('video_id', flat=True))
+    new = [e for e in entries if e['video_id'] not in existing]
+    if not new:
+        return []
+
+    with transaction.atomic():
+        NetworkVideo.objects.bulk_create([
+            NetworkVideo(title=e['title'], channel=feed.channel, video_type=feed.video_type, url=e['url'],
+                         provider=e['provider'], video_id=e['video_id'])
+            for e in new
+        ], ignore_conflicts=True)
+        # created_at is auto_now_add: backdate to the upload time so the rails stay in upload order
+        for e in new:
+            if e['published']:
+                NetworkVideo.objects.filter(video_id=e['video_id'], thumbnail='').update(created_at=e['published'])
+    return new
+
+
+def save_thumbnails(items, downloader):
+    """
+    Downloads [(video id, url), ...] concurrently and saves each one as the
+    video's thumbnail (through save(), so the image pipeline picks it up).
+    Returns how many were saved.
+    """
+    items = list(items)
+    videos = {v.video_id: v for v in NetworkVideo.objects.filter(video_id__in=[vid for vid, url in items], thumbnail='')}
+    saved = 0
+    for video_id, url, content in downloader.fetch_all((vid, url) for vid, url in items if vid in videos):
+        if content is None:
+            logger.warning("Thumbnail download failed: %s", url)
+            continue
+        video = videos[video_id]
+        video.thumbnail.save(f'{video_id}.jpg', ContentFile(content), save=False)
+        video.save(update_fields=['thumbnail'])
+        saved += 1
+    return saved
+
+
+# ---------------------------
+# Internals
+# ---------------------------
+def _save_feed(feed, future, stats):
+    state = {'checked_at': timezone.now(), 'last_error': '', 'locked_until': None}
+    try:
+        response, body = future.result()
+        if body is None:
+            stats.not_modified += 1
+            return []
+        new = save_entries(feed, parse_entries(body))
+        stats.created += len(new)
+        # Only remember the validators once the entries are safely stored
+        state.update(etag=response.headers.get('ETag', ''), last_modified=response.headers.get('Last-Modified', ''))
+        return [(e['video_id'], e['thumbnail']) for e in new if e['thumbnail']]
+    except Exception as exc:
+        stats.failed += 1
+        state['last_error'] = f"{type(exc).__name__}: {exc}"
+        logger.warning("Video feed %s failed: %s", feed, exc)
+        return []
+    finally:
+        VideoFeed.objects.filter(pk=feed.pk).update(**state)
+
+
+def _missing_thumbnails(channels):
+    # Earlier downloads that failed: retry from the provider's standard poster
+    missing = NetworkVideo.objects.filter(thumbnail='', provider=YOUTUBE).exclude(video_id='')
+    if channels:
+        missing = missing.filter(channel__in=channels)
+    return [(video_id, poster_url(YOUTUBE, video_id)) for video_id in missing.values_list('video_id', flat=True)]
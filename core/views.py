@@ -1,65 +1,49 @@
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.http import JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from . import activity
+from .pagecache import cached_fragment
+from .pagination import CursorPaginator
+from .exporter import EXPORTERS, export_rows
+from .querybudget import stats as query_stats
+from django.http import JsonResponse, StreamingHttpResponse, Http404
 from django.contrib import messages
 from django.utils import timezone
-from datetime import timedelta
-from operator import attrgetter
 import json
 
 # Model Imports
-from library.models import Game, Platform
-from hardware.models import Hardware
-from .models import NetworkVideo, UserProfile
+from library.models import Platform
+from library.localization import get_preferred_region
+from .models import NetworkVideo, UserProfile, ActivityEvent
 from blog.models import Post
+from membership.entitlements import get_entitlement
 
 # Form & Filter Imports
 from .forms import UserUpdateForm, ProfileUpdateForm
 from .filters import VideoFilter
 
 def home(request):
+    # The content below the nav is cached per variant and rebuilt only after
+    # a video/post/game/hardware save bumps the version (see core/pagecache.py).
+    # The nav (username, CSRF token) is rendered fresh around it.
+    region = get_preferred_region(request.user)
+    variant = f'{home_auth_state(request)}:{region}:{home_theme(request.user)}'
+    content = cached_fragment('home', variant, lambda: render_home_content(request, region))
+    return render(request, 'core/home.html', {'content': content})
+
+
+def render_home_content(request, region):
     # 1. New Videos (Top Row)
     new_videos = NetworkVideo.objects.order_by('-created_at')[:8]
 
     # 2. Latest Articles (Newsstand)
     latest_news = Post.objects.filter(is_published=True)[:3]
 
-    # 3. Recent Acquisitions (Strict 30 Day Window)
-    # Only show items acquired in the last 30 days
-    cutoff_date = timezone.now().date() - timedelta(days=30)
-
-    # Games: Must own game AND be acquired recently
-    recent_games = list(
-        Game.objects.filter(own_game=True, date_acquired__gte=cutoff_date).order_by('-date_acquired')[:8])
-    # Hardware: Must own item AND be acquired recently
-    recent_hardware = list(
-        Hardware.objects.filter(own_item=True, date_acquired__gte=cutoff_date).order_by('-date_acquired')[:8])
-
-    # Tag them so template knows which card style to use
-    for g in recent_games: g.kind = 'game'
-    for h in recent_hardware: h.kind = 'hardware'
-
-    # Merge and sort by ACQUISITION date
-    recent_acquisitions = sorted(
-        recent_games + recent_hardware,
-        key=attrgetter('date_acquired'),
-        reverse=True
-    )[:8]
-
-    # 4. Recently Updated (Any edits to database)
-    # Filter out ghosts (unowned items) so we only see collection updates
-    updated_games = list(Game.objects.filter(own_game=True).order_by('-updated_at')[:8])
-    updated_hardware = list(Hardware.objects.filter(own_item=True).order_by('-updated_at')[:8])
-
-    for g in updated_games: g.kind = 'game'
-    for h in updated_hardware: h.kind = 'hardware'
-
-    recently_updated = sorted(
-        updated_games + updated_hardware,
-        key=attrgetter('updated_at'),
-        reverse=True
-    )[:8]
+    # 3. Recent Acquisitions (Strict 30 Day Window) and 4. Recently Updated (owned items only)
+    # Both rails are one indexed read on the activity feed, with the card data already on the row
+    recent_acquisitions = activity.recent_acquisitions(region)
+    recently_updated = activity.recently_updated(region)
 
     context = {
         'new_videos': new_videos,
@@ -67,7 +51,38 @@ def home(request):
         'recent_acquisitions': recent_acquisitions,
         'recently_updated': recently_updated,
     }
-    return render(request, 'core/home.html', context)
+    return render_to_string('core/partials/home_content.html', context, request=request)
+
+
+def home_auth_state(request):
+    if not request.user.is_authenticated:
+        return 'anon'
+    return 'member' if get_entitlement(request).is_member else 'user'
+
+
+def home_theme(user):
+    profile = getattr(user, 'profile', None) if user.is_authenticated else None
+    return profile.theme if profile else 'default'
+
+
+def activity_feed(request):
+    # Everything that happened in the collection, newest first (the home rails, in full)
+    verb = request.GET.get('verb')
+    if verb not in dict(ActivityEvent.VERB_CHOICES):
+        verb = None
+    paginator = CursorPaginator(activity.feed(verb), 24)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+
+    region = get_preferred_region(request.user)
+    for event in page_obj:
+        event.localize(region)
+
+    context = {
+        'events': page_obj,
+        'verb': verb,
+        'verb_choices': ActivityEvent.VERB_CHOICES,
+    }
+    return render(request, 'core/activity.html', context)
 
 
 def about(request):
@@ -133,20 +148,39 @@ def video_list(request):
     else:
         qs = all_videos
 
-    # PAGINATION: 20 items
-    paginator = Paginator(qs, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # PAGINATION: 20 items (keyset cursors: no COUNT/OFFSET)
+    paginator = CursorPaginator(qs, 20)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
 
     platforms = Platform.objects.all().order_by('name')
 
     context = {
         'videos': page_obj,  # Pass the Page Object
         'filter': my_filter,
+        'facets': my_filter.facet_counts(),  # Sidebar option counts
         'platforms': platforms,
     }
 
     if request.headers.get('HX-Request'):
+        context['facets_oob'] = True  # Refresh the sidebar counts out-of-band
         return render(request, 'core/partials/video_grid.html', context)
 
-    return render(request, 'core/video_list.html', context)
\ No newline at end of file
+    return render(request, 'core/video_list.html', context)
+
+
+@staff_member_required
+def query_report(request):
+    # Rolling per-URL query summary from QueryBudgetMiddleware (this worker only)
+    return render(request, 'core/query_report.html', {'rows': query_stats.summary()})
+
+
+@staff_member_required
+def export_games(request, fmt):
+    # Whole library as a download, streamed chunk by chunk (same columns as import_games)
+    if fmt not in EXPORTERS:
+        raise Http404
+    rows = export_rows(base_url=f'{request.scheme}://{request.get_host()}')
+    content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(EXPORTERS[fmt](rows), content_type=f'{content_type}; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="games-{timezone.now():%Y-%m-%d}.{fmt}"'
+    return response
@@ -2,9 +2,10 @@ import django_filters
 from django import forms
 from .models import Hardware, HardwareType, Company
 from library.models import Platform, Region
+from core.facets import FacetedFilterSet
 
 
-class HardwareFilter(django_filters.FilterSet):
+class HardwareFilter(FacetedFilterSet, django_filters.FilterSet):
     # 1. SEARCH
     name = django_filters.CharFilter(
         lookup_expr='icontains',
@@ -67,6 +68,9 @@ class HardwareFilter(django_filters.FilterSet):
         model = Hardware
         fields = []
 
+    # Sidebar chips that show counts
+    facet_fields = ('type', 'platform', 'regions', 'company')
+
     # LOGIC
     def filter_own_item(self, queryset, name, value):
         # If Checked (True), show ONLY owned.
@@ -77,7 +81,7 @@ class HardwareFilter(django_filters.FilterSet):
         return queryset.filter(own_box=False) if value else queryset
 
     def filter_has_review(self, queryset, name, value):
-        return queryset.filter(video_review__gt='') if value else queryset
+        return queryset.filter(has_review=True) if value else queryset
 
     def filter_has_unboxing(self, queryset, name, value):
-        return queryset.filter(video_condition__gt='') if value else queryset
\ No newline at end of file
+        return queryset.filter(has_unboxing=True) if value else queryset
\ No newline at end of file
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hardware', '0006_company_remove_hardware_manufacturer_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hardware',
+            name='has_review',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='hardware',
+            name='has_unboxing',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hardware', '0008_image_meta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hardware',
+            name='condition_provider',
+            field=models.CharField(blank=True, choices=[('youtube', 'YouTube'), ('vimeo', 'Vimeo')], editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='hardware',
+            name='condition_video_id',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='hardware',
+            name='review_provider',
+            field=models.CharField(blank=True, choices=[('youtube', 'YouTube'), ('vimeo', 'Vimeo')], editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='hardware',
+            name='review_video_id',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hardware', '0009_video_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hardware',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from embed_video.fields import EmbedVideoField
-from library.models import Platform, Region, compress_image
+from library.models import Platform, Region
+from library.images import ProcessedImagesMixin
+from library.videos import ParsedVideosMixin, PROVIDER_CHOICES
 from django.core.files.base import ContentFile
 from django.core.exceptions import ValidationError  # <--- NEW
 
@@ -16,7 +18,7 @@ class Company(models.Model):
     def __str__(self): return self.name
 
 
-class Hardware(models.Model):
+class Hardware(ProcessedImagesMixin, ParsedVideosMixin, models.Model):
     name = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     company = models.ForeignKey(Company, on_delete=models.SET_NULL, null=True, blank=True, related_name='hardware')
@@ -47,15 +49,40 @@ class Hardware(models.Model):
     image_bottom = models.ImageField(upload_to='hardware/images/', blank=True)
     image_side = models.ImageField(upload_to='hardware/images/', blank=True)
 
+    IMAGE_FIELDS = {name: 1000 for name in ('image_front', 'image_back', 'image_top', 'image_bottom', 'image_side')}
+
     description = models.TextField(blank=True)
     video_review = EmbedVideoField(blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Media flags (Derived in save(), for the list filters)
+    has_review = models.BooleanField(default=False, editable=False, db_index=True)
+    has_unboxing = models.BooleanField(default=False, editable=False, db_index=True)
+    # Active comments, kept by comments.refresh_comment_counts
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    MEDIA_FLAGS = ['has_review', 'has_unboxing']
+
+    # Parsed video ids (Derived in save(), rendered by the video_facade tag)
+    condition_provider = models.CharField(max_length=10, choices=PROVIDER_CHOICES, blank=True, editable=False)
+    condition_video_id = models.CharField(max_length=20, blank=True, editable=False)
+    review_provider = models.CharField(max_length=10, choices=PROVIDER_CHOICES, blank=True, editable=False)
+    review_video_id = models.CharField(max_length=20, blank=True, editable=False)
+
+    VIDEO_FIELDS = {
+        'video_condition': ('condition_provider', 'condition_video_id'),
+        'video_review': ('review_provider', 'review_video_id'),
+    }
+
     def __str__(self):
         return self.name
 
+    def refresh_media_flags(self):
+        self.has_review = bool(self.video_review)
+        self.has_unboxing = bool(self.video_condition)
+
     # VALIDATION LOGIC
     def clean(self):
         if self.date_acquired and not self.own_item:
@@ -63,12 +90,7 @@ class Hardware(models.Model):
                 {'date_acquired': "You cannot set an Acquisition Date if you don't own the hardware yet."})
 
     def save(self, *args, **kwargs):
-        images = [self.image_front, self.image_back, self.image_top, self.image_bottom, self.image_side]
-        for img in images:
-            if img:
-                try:
-                    new_img = compress_image(img, max_width=1000)
-                    if new_img: img.save(img.name, new_img, save=False)
-                except:
-                    pass
+        self.refresh_media_flags()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | set(self.MEDIA_FLAGS)
         super().save(*args, **kwargs)
\ No newline at end of file
@@ -1,12 +1,12 @@
 from django.shortcuts import render, get_object_or_404
-from django.core.paginator import Paginator
+from core.pagination import CursorPaginator
 from .models import Hardware, HardwareType
 from .filters import HardwareFilter
 from library.models import Platform, Region
 
 
 def hardware_list(request):
-    all_items = Hardware.objects.all().order_by('name')
+    all_items = Hardware.objects.select_related('type', 'platform').order_by('name')
     my_filter = HardwareFilter(request.GET, queryset=all_items)
 
     if my_filter.is_valid():
@@ -14,10 +14,9 @@ def hardware_list(request):
     else:
         qs = all_items
 
-    # PAGINATION: 20 items
-    paginator = Paginator(qs, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # PAGINATION: 20 items (keyset cursors: no COUNT/OFFSET)
+    paginator = CursorPaginator(qs, 20)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
 
     types = HardwareType.objects.all().order_by('name')
     platforms = Platform.objects.all().order_by('name')
@@ -26,17 +25,22 @@ def hardware_list(request):
     context = {
         'items': page_obj,  # Pass the Page Object
         'filter': my_filter,
+        'facets': my_filter.facet_counts(),  # Sidebar option counts
         'types': types,
         'platforms': platforms,
         'regions': regions,
     }
 
     if request.headers.get('HX-Request'):
+        context['facets_oob'] = True  # Refresh the sidebar counts out-of-band
         return render(request, 'hardware/partials/hardware_grid.html', context)
 
     return render(request, 'hardware/hardware_list.html', context)
 
 
 def hardware_detail(request, slug):
-    item = get_object_or_404(Hardware, slug=slug)
+    item = get_object_or_404(
+        Hardware.objects.select_related('type', 'platform').prefetch_related('regions', 'other_variants'),
+        slug=slug,
+    )
     return render(request, 'hardware/hardware_detail.html', {'item': item})
\ No newline at end of file
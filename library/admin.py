@@ -1,6 +1,7 @@
 from django.contrib import admin
 from .models import Platform, Genre, Region, Series, Developer, Publisher, Game, GameVideo, GameComponent, \
     RegionalRelease, GameImage
+from .search import search_games
 
 
 # Standard Admins
@@ -92,4 +93,15 @@ class GameAdmin(admin.ModelAdmin):
     )
 
     # Added GameImageInline to the list
-    inlines = [RegionalReleaseInline, GameImageInline, GameComponentInline, GameVideoInline]
\ No newline at end of file
+    inlines = [RegionalReleaseInline, GameImageInline, GameComponentInline, GameVideoInline]
+
+    def get_queryset(self, request):
+        # __str__ shows the platform (changelist + autocomplete results)
+        return super().get_queryset(request).select_related('platform')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Changelist search + other_versions autocomplete both come through here.
+        # search_fields stays declared because the admin requires it for autocomplete.
+        if not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        return search_games(queryset, search_term), False
\ No newline at end of file
@@ -0,0 +1,150 @@
+from bisect import bisect_left, bisect_right
+from django.db import transaction
+from django.utils.functional import cached_property
+from core.pagination import CursorPage, CursorPaginator
+from .models import Game, GameCard, RegionalRelease
+from .localization import resolve_localized_data
+
+REGION_CODES = [code for code, label in RegionalRelease.REGION_CHOICES]
+
+
+def build_game_cards(game):
+    """
+    Returns unsaved GameCard rows (one per region code) for a game that was
+    loaded with platform, regional_releases, developers and regions prefetched.
+    """
+    releases = {}
+    for r in game.regional_releases.all():
+        releases.setdefault(r.region_code, r)
+
+    developers = list(game.developers.all())
+    region_names = ', '.join(reg.name for reg in game.regions.all())
+
+    cards = []
+    for code in REGION_CODES:
+        release = releases.get(code)
+        local = resolve_localized_data(game, code, release)
+        cards.append(GameCard(
+            game=game,
+            region_code=code,
+            slug=game.slug,
+            title=local['title'],
+            release_date=local['release_date'],
+            box_art=local['box_art'].name or '',
+            back_art=local['back_art'].name or '',
+            spine_art=local['spine_art'].name or '',
+            image_meta=_art_meta(local, game, release),
+            platform_name=game.platform.name,
+            developer_name=developers[0].name if developers else '',
+            region_names=region_names[:255],
+            own_game=game.own_game,
+            own_box=game.own_box,
+            own_manual=game.own_manual,
+            created_at=game.created_at,
+            comment_count=game.comment_count,
+        ))
+    return cards
+
+
+def _art_meta(local, game, release):
+    # The image_meta entry of whichever row each piece of art came from
+    meta = {}
+    for name in ('box_art', 'back_art', 'spine_art'):
+        source = release if release is not None and local[name] == getattr(release, name) else game
+        entry = (source.image_meta or {}).get(name)
+        if local[name] and entry:
+            meta[name] = entry
+    return meta
+
+
+def refresh_game_cards(game_ids):
+    """
+    Rebuilds the card projection for the given games.
+    Games that no longer exist simply lose their cards.
+    """
+    game_ids = {pk for pk in game_ids if pk is not None}
+    if not game_ids:
+        return
+
+    games = (Game.objects.filter(pk__in=game_ids)
+             .select_related('platform')
+             .prefetch_related('regional_releases', 'developers', 'regions'))
+
+    with transaction.atomic():
+        GameCard.objects.filter(game_id__in=game_ids).delete()
+        GameCard.objects.bulk_create([card for game in games for card in build_game_cards(game)])
+
+
+def card_queryset(games, region, filtered=True):
+    """
+    Serves a (filtered, ordered) Game queryset from the projection instead:
+    a single-table read on GameCard for the given region, in the same order.
+    With filtered=False the Game subquery is skipped entirely.
+    """
+    cards = GameCard.objects.filter(region_code=region)
+    if filtered:
+        cards = cards.filter(game__in=games.values('pk'))
+
+    # Ties break on game id, like the snapshot's orderings, so their cursors are interchangeable
+    ordering = [f for f in games.query.order_by if f.lstrip('-') in ('title', 'release_date', 'created_at')]
+    return cards.order_by(*(ordering or ['title']), 'game_id')
+
+
+class SearchPaginator(CursorPaginator):
+    """
+    CursorPaginator for cards in search relevance order. The ranking (game
+    ids, best first) is walked in Python: one query for the ids that pass
+    the filters, one for the page's cards, instead of ordering the whole
+    result by a CASE with a WHEN per hit. Each card gets a `search_rank`
+    (its game's index in the ranking); tokens are the usual
+    (search_rank, game_id, id) ones, as the snapshot writes them.
+    """
+
+    def __init__(self, cards, ranking, per_page):
+        self.per_page = per_page
+        self.keys = [('search_rank', False, False), ('game_id', False, False), ('id', False, False)]
+        self.queryset = cards.order_by()
+        self.rank_of = {pk: i for i, pk in enumerate(ranking)}
+
+    def get_page(self, cursor=None):
+        position = self._decode(cursor)
+        ids, rank = self.ranked_ids, self.rank_of.__getitem__
+        if position is None:
+            ids = ids[:self.per_page + 1]
+            return CursorPage(self._cards(ids[:self.per_page]), self, number=1,
+                              has_next=len(ids) > self.per_page, has_previous=False)
+
+        (value, game_id, card_id), direction, number = position
+        if direction == 'next':
+            start = bisect_right(ids, value, key=rank)
+            ids = ids[start:start + self.per_page + 1]
+            return CursorPage(self._cards(ids[:self.per_page]), self, number=number,
+                              has_next=len(ids) > self.per_page, has_previous=True)
+
+        end = bisect_left(ids, value, key=rank)
+        ids = ids[max(end - self.per_page - 1, 0):end]
+        has_previous = len(ids) > self.per_page
+        return CursorPage(self._cards(ids[-self.per_page:]), self, number=number if has_previous else 1,
+                          has_next=True, has_previous=has_previous)
+
+    @cached_property
+    def ranked_ids(self):
+        # The ranked games that pass the filters, best first
+        matched = set(self.queryset.filter(game_id__in=self.rank_of).values_list('game_id', flat=True))
+        return sorted(matched, key=self.rank_of.__getitem__)
+
+    @cached_property
+    def count(self):
+        return len(self.ranked_ids)
+
+    def _decode(self, token):
+        position = super()._decode(token)
+        if position is None or not isinstance(position[0][0], int):
+            return None  # e.g. a cursor from another ordering
+        return position
+
+    def _cards(self, ids):
+        cards = list(self.queryset.filter(game_id__in=ids))
+        for card in cards:
+            card.search_rank = self.rank_of[card.game_id]
+        return sorted(cards, key=lambda card: card.search_rank)
@@ -1,12 +1,13 @@
 import django_filters
 from django import forms
-from django.db.models import Q
 from .models import Game, Platform, Genre, Region, Developer, Publisher
+from .search import search_game_ids
+from core.facets import FacetedFilterSet
 
 
-class GameFilter(django_filters.FilterSet):
-    # 1. SEARCH
-    title = django_filters.CharFilter(lookup_expr='icontains', label='Search Title')
+class GameFilter(FacetedFilterSet, django_filters.FilterSet):
+    # 1. SEARCH (Titles, Japanese/Regional titles, Series & Credits - see library.search)
+    title = django_filters.CharFilter(method='filter_search', label='Search Title')
 
     # 2. PLATFORM
     platform = django_filters.ModelMultipleChoiceFilter(
@@ -70,7 +71,21 @@ class GameFilter(django_filters.FilterSet):
         model = Game
         fields = []
 
+    # Sidebar chips that show "PS2 (412)" style counts
+    facet_fields = ('platform', 'genres', 'regions', 'developers', 'publishers')
+
+    # Game ids of the last search, best match first (None = no search)
+    search_ranking = None
+    _search_term = None
+
     # LOGIC METHODS (Simplified)
+    def filter_search(self, queryset, name, value):
+        if not value: return queryset
+        # Facet counts re-apply this filter, so only hit the index once per term
+        if value != self._search_term:
+            self._search_term, self.search_ranking = value, search_game_ids(value)
+        return queryset.filter(pk__in=self.search_ranking)
+
     def filter_own_game(self, queryset, name, value):
         return queryset.filter(own_game=True) if value else queryset
 
@@ -81,13 +96,13 @@ class GameFilter(django_filters.FilterSet):
         return queryset.filter(own_manual=False) if value else queryset
 
     def filter_has_playthrough(self, queryset, name, value):
-        return queryset.filter(video_playthrough__gt='') if value else queryset
+        return queryset.filter(has_playthrough=True) if value else queryset
 
     def filter_has_unboxing(self, queryset, name, value):
-        return queryset.filter(video_condition__gt='') if value else queryset
+        return queryset.filter(has_unboxing=True) if value else queryset
 
     def filter_has_review(self, queryset, name, value):
-        return queryset.filter(Q(written_review__gt='') | Q(video_review__gt='')) if value else queryset
+        return queryset.filter(has_review=True) if value else queryset
 
     def filter_has_extras(self, queryset, name, value):
-        return queryset.filter(extra_videos__is_patron_only=True).distinct() if value else queryset
\ No newline at end of file
+        return queryset.filter(has_patron_extras=True) if value else queryset
@@ -0,0 +1,206 @@
+import hashlib
+import os
+from io import BytesIO
+from PIL import Image, features
+from django.core.files.base import ContentFile
+from django.db import models
+
+# Bump when the pipeline's output changes; stored images get redone once
+# (1: compressed original, 2: + responsive derivatives)
+IMAGE_PIPELINE_VERSION = 2
+
+JPEG_QUALITY = 70
+
+# Responsive copies for grids/cards: widths ladder x modern formats (originals stay for detail pages)
+DERIVATIVE_WIDTHS = (160, 320, 480, 640)
+DERIVATIVE_FORMATS = [
+    # (srcset key / extension, Pillow format, quality)
+    ('avif', 'AVIF', 50),
+    ('webp', 'WEBP', 75),
+]
+DERIVATIVE_FOLDER = 'derivatives'
+
+
+def process_image(data, max_width):
+    """
+    Downsizes image bytes to max_width. Returns (bytes, extension) or None
+    when the source can be kept as-is (already small enough and in its
+    final format) or isn't an image at all.
+    Images with transparency stay PNG; everything else becomes JPEG.
+    """
+    try:
+        img = Image.open(BytesIO(data))
+        img.load()
+    except Exception:
+        return None
+
+    has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+    if img.width <= max_width and (img.format == 'JPEG' or (img.format == 'PNG' and has_alpha)):
+        return None  # Already in its final format: re-encoding would only cost quality/bytes
+
+    if img.width > max_width:
+        output_size = (max_width, int((max_width / img.width) * img.height))
+        img = img.resize(output_size, Image.Resampling.LANCZOS)
+
+    buffer = BytesIO()
+    if has_alpha:
+        img.convert('RGBA').save(buffer, format='PNG', optimize=True)
+        return buffer.getvalue(), '.png'
+    if img.mode != 'RGB': img = img.convert('RGB')
+    img.save(buffer, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+    return buffer.getvalue(), '.jpg'
+
+
+def make_derivatives(data, digest, storage):
+    """
+    Writes the responsive copies of an (already processed) image.
+    Names come from the content hash, so identical images share files and
+    re-runs find them already in storage.
+    Returns (width, height, {format: [[width, name], ...]}).
+    """
+    img = Image.open(BytesIO(data))
+    img.load()
+    width, height = img.size
+    img = img.convert('RGBA' if img.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+    widths = [w for w in DERIVATIVE_WIDTHS if w < width] + [width]
+    derivatives = {}
+    for extension, pil_format, quality in DERIVATIVE_FORMATS:
+        if not features.check(extension):
+            continue  # Pillow built without this encoder
+        derivatives[extension] = []
+        for w in widths:
+            name = f'{DERIVATIVE_FOLDER}/{digest[:2]}/{digest[:24]}-{w}.{extension}'
+            if not storage.exists(name):
+                resized = img if w == width else img.resize((w, max(1, round(height * w / width))), Image.Resampling.LANCZOS)
+                buffer = BytesIO()
+                resized.save(buffer, format=pil_format, quality=quality)
+                name = storage.save(name, ContentFile(buffer.getvalue()))
+            derivatives[extension].append([w, name])
+    return width, height, derivatives
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class ProcessedImagesMixin(models.Model):
+    """
+    Runs every ImageField listed in IMAGE_FIELDS ({field: max width})
+    through process_image() on save - but only when the file changed.
+
+    `image_meta` remembers, per field, the stored name, the hash of the
+    source and of the stored result, the pipeline version and the
+    responsive derivatives (read by the `responsive_image` tag), so a save
+    that only flips a checkbox never touches storage, and re-uploading
+    an already processed file is recognised by its hash.
+    """
+    IMAGE_FIELDS = {}
+
+    image_meta = models.JSONField(default=dict, blank=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        from tasks.queue import is_eager
+
+        update_fields = kwargs.get('update_fields')
+        names = [n for n in self.IMAGE_FIELDS if update_fields is None or n in update_fields]
+        # New files are stored as uploaded and processed by the task worker (inline in eager mode)
+        deferred = [] if is_eager() else [n for n in names if self._needs_processing(n)]
+        inline = [n for n in names if n not in deferred]
+        if self.process_images(inline) and update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'image_meta'}
+        super().save(*args, **kwargs)
+
+        if deferred:
+            from .tasks import process_stored_images
+            files = '|'.join(getattr(self, n).name for n in deferred)
+            process_stored_images.enqueue(self._meta.label, self.pk, deferred,
+                                          key=f'images:{self._meta.label}:{self.pk}:{_sha256(files.encode())[:16]}')
+
+    def process_and_save(self, names=None):
+        """
+        Processes the image fields and saves only what changed. Saved
+        normally, so signal-maintained copies (e.g. GameCard art) follow
+        renamed files. Returns True when anything was saved.
+        """
+        names = list(self.IMAGE_FIELDS if names is None else names)
+        before = {name: getattr(self, name).name for name in names}
+        if not self.process_images(names):
+            return False
+        changed = [name for name in names if getattr(self, name).name != before[name]]
+        self.save(update_fields=changed + ['image_meta'])
+        return True
+
+    def _needs_processing(self, name):
+        file = getattr(self, name)
+        entry = (self.image_meta or {}).get(name)
+        if not file:
+            return False
+        return not (entry and entry.get('v') == IMAGE_PIPELINE_VERSION
+                    and file._committed and file.name == entry['name'])
+
+    def process_images(self, names=None):
+        """
+        Processes the given (default: all) image fields that need it.
+        Returns True when image_meta changed.
+        """
+        meta = dict(self.image_meta or {})
+        for name in (self.IMAGE_FIELDS if names is None else names):
+            try:
+                entry = self._process_image_field(name, meta.get(name))
+            except Exception:
+                continue  # Storage/decoder trouble: leave the file as uploaded
+            if entry is None:
+                meta.pop(name, None)
+            else:
+                meta[name] = entry
+
+        changed = meta != (self.image_meta or {})
+        self.image_meta = meta
+        return changed
+
+    def _process_image_field(self, name, entry):
+        file = getattr(self, name)
+        if not file:
+            return None
+
+        current = entry is not None and entry.get('v') == IMAGE_PIPELINE_VERSION
+        # 1. Same stored file as last time: nothing to read, nothing to do
+        if not self._needs_processing(name):
+            return entry
+
+        file.open('rb')
+        file.seek(0)
+        data = file.read()
+        if file._committed:
+            file.close()
+        digest = _sha256(data)
+
+        if current and digest in (entry['source'], entry['hash']):
+            # 2. Already processed bytes stored elsewhere (e.g. a path set by an import)
+            if file._committed:
+                return {**entry, 'name': file.name}
+            # 3. Same file uploaded again: point back at the stored result
+            if file.storage.exists(entry['name']):
+                setattr(self, name, entry['name'])
+                return entry
+
+        result = process_image(data, self.IMAGE_FIELDS[name])
+        if result is None:
+            if not file._committed:
+                file.save(os.path.basename(file.name), ContentFile(data), save=False)
+            output = data
+        else:
+            output, extension = result
+            stem = os.path.splitext(os.path.basename(file.name))[0]
+            file.save(stem + extension, ContentFile(output), save=False)
+
+        entry = {'name': file.name, 'source': digest, 'hash': _sha256(output), 'v': IMAGE_PIPELINE_VERSION}
+        try:
+            entry['width'], entry['height'], entry['derivatives'] = make_derivatives(output, entry['hash'], file.storage)
+        except Exception:
+            pass  # Not an image Pillow can read: templates fall back to the original
+        return entry
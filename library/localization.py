@@ -0,0 +1,72 @@
+from .models import RegionalRelease
+
+DEFAULT_REGION = 'NTSC-U'
+
+
+def get_preferred_region(user):
+    """
+    Returns the region code the user wants to browse in (defaults to NTSC-U).
+    """
+    if user is not None and user.is_authenticated:
+        try:
+            profile = getattr(user, 'profile', None)
+            if profile:
+                return profile.preferred_region
+        except Exception:
+            pass
+    return DEFAULT_REGION
+
+
+def resolve_localized_data(game, region, release=None):
+    """
+    Builds the localized title/art/date dict for one game.
+    `release` is the game's RegionalRelease for `region` (or None).
+    """
+    # 1. Start with Defaults
+    data = {
+        'title': game.title,
+        'release_date': game.release_date,
+        'box_art': game.box_art,
+        'back_art': game.back_art,
+        'spine_art': game.spine_art,
+    }
+
+    # 2. LOGIC A: Simple Title Swap
+    if region == 'NTSC-J' and game.title_japanese:
+        data['title'] = game.title_japanese
+
+    # 3. LOGIC B: Regional Release Override
+    if release:
+        if release.title:
+            data['title'] = release.title
+        if release.release_date:
+            data['release_date'] = release.release_date
+        if release.box_art:
+            data['box_art'] = release.box_art
+        if release.back_art:
+            data['back_art'] = release.back_art
+        if release.spine_art:
+            data['spine_art'] = release.spine_art
+
+    return data
+
+
+def localize_games(games, region):
+    """
+    Resolves localized data for a whole page of games with ONE query.
+    The result is stored on each game as `game.localized`, which the
+    `get_localized_data` template tag picks up instead of querying again.
+    """
+    games = [g for g in games if g is not None]
+    if not games:
+        return games
+
+    releases = {}
+    qs = RegionalRelease.objects.filter(game__in=[g.pk for g in games], region_code=region).order_by('pk')
+    for release in qs:
+        # Keep the first match per game (same as the old loop)
+        releases.setdefault(release.game_id, release)
+
+    for game in games:
+        game.localized = resolve_localized_data(game, region, releases.get(game.pk))
+    return games
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from library.models import Game, bump_catalogue_version
+from library.cards import refresh_game_cards
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the GameCard list projection for every game (run once after deploying)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        game_ids = list(Game.objects.order_by('pk').values_list('pk', flat=True))
+
+        for start in range(0, len(game_ids), batch_size):
+            refresh_game_cards(game_ids[start:start + batch_size])
+            bump_catalogue_version(game_ids[start:start + batch_size])  # The snapshot copies the cards
+            self.stdout.write(f"Rebuilt {min(start + batch_size, len(game_ids))}/{len(game_ids)} games...")
+
+        self.stdout.write(self.style.SUCCESS(f'Finished! Rebuilt cards for {len(game_ids)} games.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from library.models import Game
+from library.search import refresh_search_documents
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the game search index (titles, regional titles, series & credits)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        game_ids = list(Game.objects.order_by('pk').values_list('pk', flat=True))
+
+        for start in range(0, len(game_ids), batch_size):
+            refresh_search_documents(game_ids[start:start + batch_size])
+            self.stdout.write(f"Indexed {min(start + batch_size, len(game_ids))}/{len(game_ids)} games...")
+
+        self.stdout.write(self.style.SUCCESS(f'Finished! Indexed {len(game_ids)} games.'))
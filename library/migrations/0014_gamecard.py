@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0013_game_review_score_game_review_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameCard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region_code', models.CharField(choices=[('NTSC-U', 'NTSC-U'), ('NTSC-J', 'NTSC-J'), ('PAL', 'PAL')], max_length=10)),
+                ('slug', models.SlugField()),
+                ('title', models.CharField(max_length=200)),
+                ('release_date', models.DateField(blank=True, null=True)),
+                ('box_art', models.ImageField(blank=True, upload_to='')),
+                ('back_art', models.ImageField(blank=True, upload_to='')),
+                ('spine_art', models.ImageField(blank=True, upload_to='')),
+                ('platform_name', models.CharField(blank=True, max_length=100)),
+                ('developer_name', models.CharField(blank=True, max_length=200)),
+                ('region_names', models.CharField(blank=True, max_length=255)),
+                ('own_game', models.BooleanField(default=False)),
+                ('own_box', models.BooleanField(default=False)),
+                ('own_manual', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(blank=True, null=True)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cards', to='library.game')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['region_code', 'title', 'id'], name='library_gam_region__66d866_idx'), models.Index(fields=['region_code', 'release_date', 'id'], name='library_gam_region__0323e7_idx'), models.Index(fields=['region_code', 'created_at', 'id'], name='library_gam_region__eb7b45_idx')],
+                'constraints': [models.UniqueConstraint(fields=('game', 'region_code'), name='unique_card_per_region')],
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SQLITE_FORWARD = [
+    # Trigram tokenizer = substring matches (incl. Japanese, which has no spaces)
+    """CREATE VIRTUAL TABLE library_gamesearch_fts USING fts5(
+        titles, credits,
+        content='library_gamesearchdocument', content_rowid='game_id', tokenize='trigram')""",
+    """CREATE TRIGGER library_gamesearch_ai AFTER INSERT ON library_gamesearchdocument BEGIN
+        INSERT INTO library_gamesearch_fts(rowid, titles, credits) VALUES (new.game_id, new.titles, new.credits);
+    END""",
+    """CREATE TRIGGER library_gamesearch_ad AFTER DELETE ON library_gamesearchdocument BEGIN
+        INSERT INTO library_gamesearch_fts(library_gamesearch_fts, rowid, titles, credits)
+        VALUES ('delete', old.game_id, old.titles, old.credits);
+    END""",
+    """CREATE TRIGGER library_gamesearch_au AFTER UPDATE ON library_gamesearchdocument BEGIN
+        INSERT INTO library_gamesearch_fts(library_gamesearch_fts, rowid, titles, credits)
+        VALUES ('delete', old.game_id, old.titles, old.credits);
+        INSERT INTO library_gamesearch_fts(rowid, titles, credits) VALUES (new.game_id, new.titles, new.credits);
+    END""",
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS library_gamesearch_au",
+    "DROP TRIGGER IF EXISTS library_gamesearch_ad",
+    "DROP TRIGGER IF EXISTS library_gamesearch_ai",
+    "DROP TABLE IF EXISTS library_gamesearch_fts",
+]
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """ALTER TABLE library_gamesearchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', titles), 'A') || setweight(to_tsvector('simple', credits), 'B')) STORED""",
+    "CREATE INDEX library_gamesearch_vector_idx ON library_gamesearchdocument USING GIN (search_vector)",
+    "CREATE INDEX library_gamesearch_titles_trgm ON library_gamesearchdocument USING GIN (titles gin_trgm_ops)",
+    "CREATE INDEX library_gamesearch_credits_trgm ON library_gamesearchdocument USING GIN (credits gin_trgm_ops)",
+]
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS library_gamesearch_credits_trgm",
+    "DROP INDEX IF EXISTS library_gamesearch_titles_trgm",
+    "DROP INDEX IF EXISTS library_gamesearch_vector_idx",
+    "ALTER TABLE library_gamesearchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def run_backend_sql(statements):
+    """
+    The text index is backend specific; other databases fall back to
+    substring matching in library.search.
+    """
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        for sql in statements.get(vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0014_gamecard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameSearchDocument',
+            fields=[
+                ('game', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='library.game')),
+                ('titles', models.TextField(blank=True)),
+                ('credits', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.RunPython(
+            run_backend_sql({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            run_backend_sql({'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0015_gamesearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='has_patron_extras',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='has_playthrough',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='has_review',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='has_unboxing',
+            field=models.BooleanField(db_index=True, default=False, editable=False),
+        ),
+    ]
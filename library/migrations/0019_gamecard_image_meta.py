@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0018_image_meta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamecard',
+            name='image_meta',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0019_gamecard_image_meta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='condition_provider',
+            field=models.CharField(blank=True, choices=[('youtube', 'YouTube'), ('vimeo', 'Vimeo')], editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='condition_video_id',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='playthrough_provider',
+            field=models.CharField(blank=True, choices=[('youtube', 'YouTube'), ('vimeo', 'Vimeo')], editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='playthrough_video_id',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='review_provider',
+            field=models.CharField(blank=True, choices=[('youtube', 'YouTube'), ('vimeo', 'Vimeo')], editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='review_video_id',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='gamevideo',
+            name='provider',
+            field=models.CharField(blank=True, choices=[('youtube', 'YouTube'), ('vimeo', 'Vimeo')], editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='gamevideo',
+            name='video_id',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0020_video_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='gamecard',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:25
+
+from django.db import migrations, models
+
+
+def number_existing_changes(apps, schema_editor):
+    # Until now the change id was the version: keep it, and continue the counter from there
+    CatalogueChange = apps.get_model('library', 'CatalogueChange')
+    CatalogueVersion = apps.get_model('library', 'CatalogueVersion')
+    CatalogueChange.objects.update(version=models.F('id'))
+    latest = CatalogueChange.objects.aggregate(latest=models.Max('id'))['latest'] or 0
+    CatalogueVersion.objects.create(pk=1, value=latest)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0021_comment_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogueVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='cataloguechange',
+            name='version',
+            field=models.BigIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(number_existing_changes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db import migrations
+
+# In dependency order: the read models copy the flags, ids and counts
+COMMANDS = [
+    'backfill_media_flags',
+    'parse_video_ids',
+    'rebuild_comment_counts',
+    'rebuild_game_cards',
+    'rebuild_search_index',
+    'rebuild_activity',
+]
+
+
+def build_read_models(apps, schema_editor):
+    """
+    Fills in what the earlier migrations added empty for rows that predate
+    them: media flags, parsed video ids, comment counts, then the GameCard,
+    search and activity read models. Rows saved from now on keep all of
+    these up to date themselves.
+
+    The rebuild commands run the current app code (not historical models),
+    which is why this comes after every migration they read. A new, empty
+    database has nothing to build.
+    """
+    Game = apps.get_model('library', 'Game')
+    Hardware = apps.get_model('hardware', 'Hardware')
+    NetworkVideo = apps.get_model('core', 'NetworkVideo')
+    if not (Game.objects.exists() or Hardware.objects.exists() or NetworkVideo.objects.exists()):
+        return
+
+    out = StringIO()
+    for command in COMMANDS:
+        call_command(command, stdout=out)
+
+    # Image processing is slow: the task worker does it (inline in eager mode)
+    from library.tasks import queue_unprocessed_images
+    queue_unprocessed_images()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0022_catalogue_version'),
+        ('core', '0010_video_feeds'),
+        ('hardware', '0010_comment_count'),
+        ('comments', '0002_comment_thread_idx'),
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_read_models, migrations.RunPython.noop),
+    ]
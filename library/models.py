@@ -1,25 +1,11 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
 from embed_video.fields import EmbedVideoField
-from PIL import Image
-from io import BytesIO
-from django.core.files.base import ContentFile
 from django.core.exceptions import ValidationError
-
-
-def compress_image(image_field, max_width=800):
-    if not image_field: return
-    try:
-        img = Image.open(image_field)
-        if img.width > max_width:
-            output_size = (max_width, int((max_width / img.width) * img.height))
-            img = img.resize(output_size, Image.Resampling.LANCZOS)
-        if img.mode != 'RGB': img = img.convert('RGB')
-        buffer = BytesIO()
-        img.save(buffer, format='JPEG', quality=70)
-        buffer.seek(0)
-        return ContentFile(buffer.read())
-    except:
-        return None
+from comments.models import comment_counts_changed
+from .images import ProcessedImagesMixin
+from .videos import ParsedVideosMixin, PROVIDER_CHOICES
 
 
 # ===========================
@@ -73,7 +59,7 @@ class Publisher(models.Model):
 # ===========================
 # MAIN GAME MODEL
 # ===========================
-class Game(models.Model):
+class Game(ProcessedImagesMixin, ParsedVideosMixin, models.Model):
     FORMAT_CHOICES = [('PHYSICAL', 'Physical Copy'), ('DIGITAL', 'Digital / Steam')]
 
     # --- META DATA ---
@@ -119,6 +105,9 @@ class Game(models.Model):
     media_art = models.ImageField(upload_to='games/media/', blank=True)
     screenshot = models.ImageField(upload_to='games/screenshots/', blank=True)
 
+    # Max width per art field (see library.images)
+    IMAGE_FIELDS = {'box_art': 800, 'back_art': 800, 'spine_art': 800, 'media_art': 800, 'screenshot': 1000}
+
     # --- CONTENT FIELDS ---
     description = models.TextField(blank=True)
     review_summary = models.CharField(max_length=255, blank=True,
@@ -133,21 +122,48 @@ class Game(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # --- MEDIA FLAGS (Derived, for the list filters) ---
+    # Kept in sync by save() and the GameVideo signals below; backfill with `manage.py backfill_media_flags`
+    has_playthrough = models.BooleanField(default=False, editable=False, db_index=True)
+    has_review = models.BooleanField(default=False, editable=False, db_index=True)
+    has_unboxing = models.BooleanField(default=False, editable=False, db_index=True)
+    has_patron_extras = models.BooleanField(default=False, editable=False, db_index=True)
+    # Active comments, kept by comments.refresh_comment_counts
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    MEDIA_FLAGS = ['has_playthrough', 'has_review', 'has_unboxing']
+
+    # --- PARSED VIDEO IDS (Derived in save(), rendered by the video_facade tag) ---
+    condition_provider = models.CharField(max_length=10, choices=PROVIDER_CHOICES, blank=True, editable=False)
+    condition_video_id = models.CharField(max_length=20, blank=True, editable=False)
+    playthrough_provider = models.CharField(max_length=10, choices=PROVIDER_CHOICES, blank=True, editable=False)
+    playthrough_video_id = models.CharField(max_length=20, blank=True, editable=False)
+    review_provider = models.CharField(max_length=10, choices=PROVIDER_CHOICES, blank=True, editable=False)
+    review_video_id = models.CharField(max_length=20, blank=True, editable=False)
+
+    VIDEO_FIELDS = {
+        'video_condition': ('condition_provider', 'condition_video_id'),
+        'video_playthrough': ('playthrough_provider', 'playthrough_video_id'),
+        'video_review': ('review_provider', 'review_video_id'),
+    }
+
     def __str__(self):
         return f"{self.title} ({self.platform.name})"
 
+    def refresh_media_flags(self):
+        self.has_playthrough = bool(self.video_playthrough)
+        self.has_review = bool(self.written_review or self.video_review)
+        self.has_unboxing = bool(self.video_condition)
+
     def clean(self):
         if self.date_acquired and not self.own_game:
             raise ValidationError(
                 {'date_acquired': "You cannot set an Acquisition Date if you don't own the game yet."})
 
     def save(self, *args, **kwargs):
-        if self.box_art:
-            try:
-                new_image = compress_image(self.box_art, max_width=800)
-                if new_image: self.box_art.save(self.box_art.name, new_image, save=False)
-            except:
-                pass
+        self.refresh_media_flags()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | set(self.MEDIA_FLAGS)
         super().save(*args, **kwargs)
 
 
@@ -156,7 +172,7 @@ class Game(models.Model):
 # ===========================
 
 # 1. REGIONAL VARIANTS (Title, Art, Date)
-class RegionalRelease(models.Model):
+class RegionalRelease(ProcessedImagesMixin, models.Model):
     REGION_CHOICES = [('NTSC-U', 'NTSC-U'), ('NTSC-J', 'NTSC-J'), ('PAL', 'PAL')]
 
     game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='regional_releases')
@@ -170,36 +186,24 @@ class RegionalRelease(models.Model):
     back_art = models.ImageField(upload_to='games/covers/regional/', blank=True)
     spine_art = models.ImageField(upload_to='games/spines/regional/', blank=True)
 
+    IMAGE_FIELDS = {'box_art': 800, 'back_art': 800, 'spine_art': 800}
+
     def __str__(self):
         return f"{self.game.title} - {self.region_code}"
 
-    def save(self, *args, **kwargs):
-        if self.box_art:
-            try:
-                new_image = compress_image(self.box_art, max_width=800)
-                if new_image: self.box_art.save(self.box_art.name, new_image, save=False)
-            except:
-                pass
-        super().save(*args, **kwargs)
 
 
 # 2. EXTRA GALLERY IMAGES (Adverts, Flyers)
-class GameImage(models.Model):
+class GameImage(ProcessedImagesMixin, models.Model):
     game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='gallery_images')
     image = models.ImageField(upload_to='games/gallery/')
     caption = models.CharField(max_length=100, blank=True, help_text="e.g. Magazine Ad, E3 Flyer")
 
+    IMAGE_FIELDS = {'image': 1000}
+
     def __str__(self):
         return f"Image for {self.game.title}"
 
-    def save(self, *args, **kwargs):
-        if self.image:
-            try:
-                new_image = compress_image(self.image, max_width=1000)
-                if new_image: self.image.save(self.image.name, new_image, save=False)
-            except:
-                pass
-        super().save(*args, **kwargs)
 
 
 # 3. COMPONENTS & VIDEOS
@@ -211,10 +215,239 @@ class GameComponent(models.Model):
     def __str__(self): return self.name
 
 
-class GameVideo(models.Model):
+class GameVideo(ParsedVideosMixin, models.Model):
     game = models.ForeignKey('Game', on_delete=models.CASCADE, related_name='extra_videos')
     title = models.CharField(max_length=100)
     url = EmbedVideoField()
     is_patron_only = models.BooleanField(default=False)
 
-    def __str__(self): return self.title
\ No newline at end of file
+    provider = models.CharField(max_length=10, choices=PROVIDER_CHOICES, blank=True, editable=False)
+    video_id = models.CharField(max_length=20, blank=True, editable=False)
+
+    VIDEO_FIELDS = {'url': ('provider', 'video_id')}
+
+    def __str__(self): return self.title
+
+
+def refresh_patron_extras_flag(game_id):
+    """
+    Recomputes Game.has_patron_extras in one UPDATE (no Game.save(), so no
+    image work and updated_at stays put).
+    """
+    extras = GameVideo.objects.filter(game=models.OuterRef('pk'), is_patron_only=True)
+    Game.objects.filter(pk=game_id).update(has_patron_extras=models.Exists(extras))
+    bump_catalogue_version([game_id])
+
+
+@receiver(post_save, sender=GameVideo)
+@receiver(post_delete, sender=GameVideo)
+def refresh_flags_on_video_change(sender, instance, raw=False, origin=None, **kwargs):
+    if raw: return
+    # Cascading from a Game delete: nothing left to flag
+    if origin is not None and getattr(origin, 'model', type(origin)) is not GameVideo: return
+    refresh_patron_extras_flag(instance.game_id)
+
+
+# ===========================
+# LIST PROJECTION (Read Model)
+# ===========================
+class GameCard(models.Model):
+    """
+    Denormalized card row for list pages: one per (game, region code).
+    Rebuilt by the signals below; never edit by hand.
+    """
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='cards')
+    region_code = models.CharField(max_length=10, choices=RegionalRelease.REGION_CHOICES)
+    slug = models.SlugField()
+
+    # Resolved (localized) display data
+    title = models.CharField(max_length=200)
+    release_date = models.DateField(null=True, blank=True)
+    box_art = models.ImageField(blank=True)
+    back_art = models.ImageField(blank=True)
+    spine_art = models.ImageField(blank=True)
+    # image_meta entries of the art above (responsive derivatives), copied from Game/RegionalRelease
+    image_meta = models.JSONField(default=dict, blank=True)
+
+    platform_name = models.CharField(max_length=100, blank=True)
+    developer_name = models.CharField(max_length=200, blank=True)
+    region_names = models.CharField(max_length=255, blank=True)
+
+    own_game = models.BooleanField(default=False)
+    own_box = models.BooleanField(default=False)
+    own_manual = models.BooleanField(default=False)
+
+    created_at = models.DateTimeField(null=True, blank=True)
+    comment_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['game', 'region_code'], name='unique_card_per_region'),
+        ]
+        indexes = [
+            models.Index(fields=['region_code', 'title', 'id']),
+            models.Index(fields=['region_code', 'release_date', 'id']),
+            models.Index(fields=['region_code', 'created_at', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.title} [{self.region_code}]"
+
+
+class GameSearchDocument(models.Model):
+    """
+    Normalized search text per game (see library.search).
+    SQLite mirrors it into an FTS5 table; Postgres adds a tsvector column
+    and trigram indexes. Both are created in migration 0015.
+    """
+    game = models.OneToOneField(Game, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    titles = models.TextField(blank=True)
+    credits = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"Search document for {self.game_id}"
+
+
+class CatalogueChange(models.Model):
+    """
+    Append-only change log: one row per game touched by a write, stamped
+    with the catalogue version that write got (see CatalogueVersion).
+    In-memory snapshots (library.snapshot) replay the rows after their
+    own version.
+    """
+    game_id = models.BigIntegerField()
+    version = models.BigIntegerField(default=0, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    # Older versions are pruned; a snapshot that falls further behind rebuilds from scratch
+    KEEP_VERSIONS = 1000
+
+    def __str__(self):
+        return f"Change #{self.pk} (game {self.game_id}, version {self.version})"
+
+
+class CatalogueVersion(models.Model):
+    """
+    Single-row counter (pk=1): the catalogue "version". Bumped by an UPDATE
+    in the same transaction as the write's CatalogueChange rows, so the row
+    lock hands versions out in commit order. (Ids don't: a transaction can
+    get a lower id and commit after a higher one was already read.)
+    """
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Catalogue version {self.value}"
+
+
+def current_catalogue_version():
+    return CatalogueVersion.objects.filter(pk=1).values_list('value', flat=True).first() or 0
+
+
+def bump_catalogue_version(game_ids):
+    game_ids = {pk for pk in game_ids if pk is not None}
+    if not game_ids:
+        return
+    with transaction.atomic():
+        if not CatalogueVersion.objects.filter(pk=1).update(value=models.F('value') + 1):
+            CatalogueVersion.objects.get_or_create(pk=1)
+            CatalogueVersion.objects.filter(pk=1).update(value=models.F('value') + 1)
+        version = current_catalogue_version()
+        CatalogueChange.objects.bulk_create([CatalogueChange(game_id=pk, version=version) for pk in sorted(game_ids)])
+    if version % 100 == 0:
+        CatalogueChange.objects.filter(version__lte=version - CatalogueChange.KEEP_VERSIONS).delete()
+
+
+# --- Read model maintenance (GameCard + GameSearchDocument + snapshot version) ---
+def _refresh_read_models(game_ids):
+    from .cards import refresh_game_cards
+    from .search import refresh_search_documents
+    game_ids = list(game_ids)
+    refresh_game_cards(game_ids)
+    refresh_search_documents(game_ids)
+    bump_catalogue_version(game_ids)
+
+
+@receiver(post_save, sender=Game)
+def refresh_on_game_save(sender, instance, raw=False, **kwargs):
+    if raw: return
+    _refresh_read_models([instance.pk])
+
+
+@receiver(post_delete, sender=Game)
+def bump_on_game_delete(sender, instance, **kwargs):
+    bump_catalogue_version([instance.pk])
+
+
+@receiver(post_save, sender=RegionalRelease)
+@receiver(post_delete, sender=RegionalRelease)
+def refresh_on_release_change(sender, instance, raw=False, origin=None, **kwargs):
+    if raw: return
+    # Cascading from a Game/Platform delete: the read models go with the game
+    if origin is not None and getattr(origin, 'model', type(origin)) is not RegionalRelease: return
+    _refresh_read_models([instance.game_id])
+
+
+@receiver(m2m_changed, sender=Game.regions.through)
+@receiver(m2m_changed, sender=Game.genres.through)
+@receiver(m2m_changed, sender=Game.developers.through)
+@receiver(m2m_changed, sender=Game.publishers.through)
+def refresh_on_credits_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _refresh_read_models([instance.pk])
+        return
+
+    # Reverse side (e.g. region.games.add(...)): the affected games are in pk_set,
+    # except for clear() where we have to remember them before they are unlinked.
+    if action == 'pre_clear':
+        instance._linked_game_ids = _linked_game_ids(instance)
+    elif action == 'post_clear':
+        _refresh_read_models(getattr(instance, '_linked_game_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        _refresh_read_models(pk_set)
+
+
+@receiver(post_save, sender=Platform)
+def refresh_on_platform_rename(sender, instance, created, raw=False, **kwargs):
+    if raw or created: return
+    GameCard.objects.filter(game__platform=instance).update(platform_name=instance.name)
+    bump_catalogue_version(instance.games.values_list('pk', flat=True))
+
+
+@receiver(comment_counts_changed, sender=Game)
+def copy_comment_counts_to_cards(sender, object_ids, **kwargs):
+    counts = Game.objects.filter(pk=models.OuterRef('game_id')).values('comment_count')
+    GameCard.objects.filter(game_id__in=object_ids).update(comment_count=models.Subquery(counts))
+    bump_catalogue_version(object_ids)
+
+
+@receiver(post_save, sender=Region)
+@receiver(post_save, sender=Developer)
+@receiver(post_save, sender=Publisher)
+@receiver(post_save, sender=Series)
+def refresh_on_taxonomy_rename(sender, instance, created, raw=False, **kwargs):
+    if raw or created: return
+    _refresh_read_models(_linked_game_ids(instance))
+
+
+@receiver(pre_delete, sender=Region)
+@receiver(pre_delete, sender=Developer)
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Publisher)
+@receiver(pre_delete, sender=Series)
+def remember_games_on_taxonomy_delete(sender, instance, **kwargs):
+    instance._linked_game_ids = _linked_game_ids(instance)
+
+
+@receiver(post_delete, sender=Region)
+@receiver(post_delete, sender=Developer)
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Publisher)
+@receiver(post_delete, sender=Series)
+def refresh_on_taxonomy_delete(sender, instance, **kwargs):
+    _refresh_read_models(getattr(instance, '_linked_game_ids', []))
+
+
+def _linked_game_ids(instance):
+    games = instance.games if isinstance(instance, (Region, Series)) else instance.game_set
+    return list(games.values_list('pk', flat=True))
@@ -0,0 +1,161 @@
+import unicodedata
+from django.db import connection, transaction, DatabaseError
+from django.db.models import Case, When, Q, IntegerField
+from .models import Game, GameSearchDocument
+
+# Max hits returned for one search (ranked best first)
+SEARCH_LIMIT = 1000
+
+# Trigram-based indexes need at least 3 characters per term
+MIN_INDEXED_TERM = 3
+
+# Column weights: titles count far more than credits
+TITLE_WEIGHT = 10.0
+CREDIT_WEIGHT = 2.0
+
+FTS_TABLE = 'library_gamesearch_fts'
+
+
+def normalize_search_text(text):
+    """
+    Folds text so different spellings of the same thing compare equal:
+    full/half-width (NFKC), katakana -> hiragana, case, latin accents,
+    and punctuation/symbols -> spaces.
+    """
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', text).casefold()
+
+    out = []
+    for ch in text:
+        code = ord(ch)
+        if 0x30A1 <= code <= 0x30F6:
+            # Katakana -> Hiragana (same block offset)
+            ch = chr(code - 0x60)
+        elif code < 0x250 and ch.isalpha():
+            # Latin accents (é -> e); kana are left alone so dakuten survive
+            ch = unicodedata.normalize('NFKD', ch)[0]
+        elif unicodedata.category(ch)[0] in ('P', 'S') or ch.isspace():
+            ch = ' '
+        out.append(ch)
+    return ' '.join(''.join(out).split())
+
+
+def build_search_document(game):
+    """
+    Returns an unsaved GameSearchDocument for a game loaded with series,
+    regional_releases, developers and publishers prefetched.
+    """
+    titles = [game.title, game.title_japanese] + [r.title for r in game.regional_releases.all()]
+    credits = [game.series.name if game.series else '']
+    credits += [d.name for d in game.developers.all()]
+    credits += [p.name for p in game.publishers.all()]
+
+    return GameSearchDocument(
+        game=game,
+        titles=' | '.join(normalize_search_text(t) for t in titles if t),
+        credits=' | '.join(normalize_search_text(c) for c in credits if c),
+    )
+
+
+def refresh_search_documents(game_ids):
+    """
+    Rebuilds the search documents for the given games. The backend index
+    (FTS5 table or tsvector column) follows the document table by itself.
+    """
+    game_ids = {pk for pk in game_ids if pk is not None}
+    if not game_ids:
+        return
+
+    games = (Game.objects.filter(pk__in=game_ids)
+             .select_related('series')
+             .prefetch_related('regional_releases', 'developers', 'publishers'))
+
+    with transaction.atomic():
+        GameSearchDocument.objects.filter(game_id__in=game_ids).delete()
+        GameSearchDocument.objects.bulk_create([build_search_document(game) for game in games])
+
+
+def search_game_ids(term, limit=SEARCH_LIMIT):
+    """
+    Returns matching game ids, best match first.
+    Long terms go through the database's text index; short ones (1-2 chars)
+    are matched as substrings on the already-narrowed document table.
+    """
+    terms = normalize_search_text(term).split()
+    if not terms:
+        return []
+
+    indexed = [t for t in terms if len(t) >= MIN_INDEXED_TERM]
+    short = [t for t in terms if len(t) < MIN_INDEXED_TERM]
+
+    ranked = _indexed_search(indexed, limit) if indexed else None
+    if ranked is None:
+        # No usable index: everything becomes a substring match
+        short, ranked = terms, None
+
+    docs = GameSearchDocument.objects.all()
+    for t in short:
+        docs = docs.filter(Q(titles__contains=t) | Q(credits__contains=t))
+
+    if ranked is not None:
+        if not short:
+            return ranked
+        allowed = set(docs.filter(game_id__in=ranked).values_list('game_id', flat=True))
+        return [pk for pk in ranked if pk in allowed]
+
+    # Substring-only: title hits before credit-only hits
+    title_hit = Q()
+    for t in short:
+        title_hit &= Q(titles__contains=t)
+    docs = docs.annotate(title_hit=Case(When(title_hit, then=0), default=1, output_field=IntegerField()))
+    return list(docs.order_by('title_hit', 'game_id').values_list('game_id', flat=True)[:limit])
+
+
+def search_games(queryset, term):
+    """
+    Filters a Game queryset down to search hits, ordered by relevance.
+    """
+    ids = search_game_ids(term)
+    return queryset.filter(pk__in=ids).order_by(rank_ordering(ids))
+
+
+def rank_ordering(ids, field='pk'):
+    """
+    An order_by() expression that keeps rows in the given id order.
+    """
+    if not ids:
+        return field
+    return Case(*[When(**{field: pk}, then=pos) for pos, pk in enumerate(ids)], output_field=IntegerField())
+
+
+# ---------------------------
+# Backend specific lookups
+# ---------------------------
+def _indexed_search(terms, limit):
+    """
+    Returns ranked ids from the backend index, or None when there is none.
+    """
+    if connection.vendor == 'sqlite':
+        sql = (f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+               f"ORDER BY bm25({FTS_TABLE}, {TITLE_WEIGHT}, {CREDIT_WEIGHT}) LIMIT %s")
+        # Quote every term as a phrase so user input can't inject FTS syntax
+        params = [' '.join('"%s"' % t.replace('"', '""') for t in terms), limit]
+    elif connection.vendor == 'postgresql':
+        query = ' '.join(terms)
+        like = [f'%{t}%' for t in terms]
+        substring = ' AND '.join(['(titles ILIKE %s OR credits ILIKE %s)'] * len(terms))
+        sql = ("SELECT game_id FROM library_gamesearchdocument, plainto_tsquery('simple', %s) q "
+               f"WHERE search_vector @@ q OR titles %% %s OR ({substring}) "
+               "ORDER BY ts_rank(search_vector, q) + similarity(titles, %s) DESC, game_id LIMIT %s")
+        params = [query, query] + [p for pat in like for p in (pat, pat)] + [query, limit]
+    else:
+        return None
+
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+    except DatabaseError:
+        # Index missing or unusable: fall back to substring matching
+        return None
@@ -0,0 +1,421 @@
+import base64
+import binascii
+import json
+import threading
+from array import array
+from django.conf import settings
+from django.db.models import Min
+from django.utils.functional import cached_property
+from core.pagination import CursorPage
+from .models import Game, GameCard, CatalogueChange, current_catalogue_version
+from .cards import REGION_CODES
+from .search import search_game_ids
+
+# Above this many changed games a full reload is cheaper than patching
+MAX_INCREMENTAL_CHANGES = 500
+
+# Facet name -> (Game m2m/fk attribute, column on the through table)
+M2M_FACETS = {
+    'genres': 'genre_id',
+    'regions': 'region_id',
+    'developers': 'developer_id',
+    'publishers': 'publisher_id',
+}
+FLAGS = ('own_game', 'own_box', 'own_manual', 'has_playthrough', 'has_review', 'has_unboxing', 'has_patron_extras')
+
+# GameFilter boolean -> (flag bitset, wanted value)
+BOOLEAN_FILTERS = {
+    'own_game': ('own_game', True),
+    'missing_box': ('own_box', False),
+    'missing_manual': ('own_manual', False),
+    'has_playthrough': ('has_playthrough', True),
+    'has_review': ('has_review', True),
+    'has_unboxing': ('has_unboxing', True),
+    'has_extras': ('has_patron_extras', True),
+}
+
+# GameCard columns kept per region (the rest are the same for every region)
+REGIONAL_COLUMNS = ('title', 'release_date', 'box_art', 'back_art', 'spine_art', 'image_meta', 'id')
+SHARED_COLUMNS = ('slug', 'platform_name', 'developer_name', 'region_names', 'created_at', 'comment_count')
+
+
+def _json_ready(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+class CatalogueSnapshot:
+    """
+    Read-only, in-memory copy of the game library for serving `game_list`.
+
+    Every game gets a "slot" (a small int). Filters become Python int
+    bitsets (bit n = slot n), so a GameFilter combination is a handful of
+    AND/OR operations and facet counts are popcounts. Sort orders are kept
+    as precomputed slot permutations per region.
+
+    `version` is the catalogue version (CatalogueVersion) the snapshot has applied;
+    `refreshed()` replays only the games changed since then, on a copy.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.slot_of = {}                 # game id -> slot
+        self.game_ids = array('q')        # slot -> game id
+        self.release_ordinals = array('l')  # slot -> Game.release_date ordinal (0 = none)
+        self.alive = 0
+        self.flags = {name: 0 for name in FLAGS}
+        self.facets = {name: {} for name in ('platform', *M2M_FACETS)}
+        self.memberships = []             # slot -> [(facet, value), ...] for clearing
+        self.shared = {name: [] for name in SHARED_COLUMNS}
+        self.regional = {code: [] for code in REGION_CODES}  # region -> slot -> column tuple
+        self.orderings = {}               # (region, field, desc) -> [slot, ...]
+        self.positions = {}               # same key -> {slot: index}
+
+    # ---------------------------
+    # Loading
+    # ---------------------------
+    def refreshed(self):
+        """
+        Returns a snapshot at the current catalogue version: this one when
+        nothing changed, otherwise a new instance (a patched copy, or a full
+        reload). The snapshot itself is never modified once built, so
+        readers still paging through it are unaffected.
+        """
+        latest = current_catalogue_version()
+        if self.version is not None and latest == self.version:
+            return self
+
+        snapshot = None
+        if self.version is not None and latest > self.version:
+            changes = CatalogueChange.objects.filter(version__gt=self.version, version__lte=latest)
+            oldest = CatalogueChange.objects.aggregate(oldest=Min('version'))['oldest']
+            game_ids = set(changes.values_list('game_id', flat=True)[:MAX_INCREMENTAL_CHANGES + 1])
+            # Unless the log was pruned past us (or too much changed): then start over
+            if oldest is not None and oldest <= self.version + 1 and len(game_ids) <= MAX_INCREMENTAL_CHANGES:
+                snapshot = self._copy()
+                snapshot._load(game_ids)
+        if snapshot is None:
+            snapshot = CatalogueSnapshot()
+            snapshot._load(None)
+
+        snapshot.version = latest
+        snapshot._sort()
+        return snapshot
+
+    def _copy(self):
+        # Containers _load() and _sort() write to are copied; values are immutable
+        copy = CatalogueSnapshot()
+        copy.version = self.version
+        copy.slot_of = dict(self.slot_of)
+        copy.game_ids = array('q', self.game_ids)
+        copy.release_ordinals = array('l', self.release_ordinals)
+        copy.alive = self.alive
+        copy.flags = dict(self.flags)
+        copy.facets = {name: dict(values) for name, values in self.facets.items()}
+        copy.memberships = list(self.memberships)  # _clear() replaces an entry, never edits it
+        copy.shared = {name: list(column) for name, column in self.shared.items()}
+        copy.regional = {code: list(rows) for code, rows in self.regional.items()}
+        return copy
+
+    def _load(self, game_ids):
+        """
+        Loads every game (game_ids=None) or re-loads just the given ones.
+        """
+        games = Game.objects.all()
+        cards = GameCard.objects.all()
+        if game_ids is not None:
+            games = games.filter(pk__in=game_ids)
+            cards = cards.filter(game_id__in=game_ids)
+            for pk in game_ids:
+                if pk in self.slot_of:
+                    self._clear(self.slot_of[pk])
+
+        for pk, platform_id, release_date, *flags in games.values_list('pk', 'platform_id', 'release_date', *FLAGS):
+            slot = self._slot(pk)
+            bit = 1 << slot
+            self.alive |= bit
+            self.release_ordinals[slot] = release_date.toordinal() if release_date else 0
+            for name, value in zip(FLAGS, flags):
+                if value:
+                    self.flags[name] |= bit
+            self._add(slot, 'platform', platform_id)
+
+        for facet, column in M2M_FACETS.items():
+            through = getattr(Game, facet).through.objects.all()
+            if game_ids is not None:
+                through = through.filter(game_id__in=game_ids)
+            for pk, value in through.values_list('game_id', column):
+                if pk in self.slot_of:
+                    self._add(self.slot_of[pk], facet, value)
+
+        for row in cards.values_list('game_id', 'region_code', *REGIONAL_COLUMNS, *SHARED_COLUMNS):
+            slot = self.slot_of.get(row[0])
+            if slot is None or row[1] not in self.regional:
+                continue
+            self.regional[row[1]][slot] = row[2:2 + len(REGIONAL_COLUMNS)]
+            for name, value in zip(SHARED_COLUMNS, row[2 + len(REGIONAL_COLUMNS):]):
+                self.shared[name][slot] = value
+
+    def _slot(self, pk):
+        if pk in self.slot_of:
+            return self.slot_of[pk]
+        slot = len(self.game_ids)
+        self.slot_of[pk] = slot
+        self.game_ids.append(pk)
+        self.release_ordinals.append(0)
+        self.memberships.append([])
+        for column in self.shared.values():
+            column.append(None)
+        for column in self.regional.values():
+            column.append(None)
+        return slot
+
+    def _add(self, slot, facet, value):
+        if value is None:
+            return
+        values = self.facets[facet]
+        values[value] = values.get(value, 0) | (1 << slot)
+        self.memberships[slot].append((facet, value))
+
+    def _clear(self, slot):
+        # Deleted games keep their (now dead) slot; it is never reused
+        mask = ~(1 << slot)
+        self.alive &= mask
+        for name in FLAGS:
+            self.flags[name] &= mask
+        for facet, value in self.memberships[slot]:
+            self.facets[facet][value] &= mask
+        self.memberships[slot] = []
+
+    def _sort(self):
+        """
+        Rebuilds the sort permutations. Same order as the ORM path: the key,
+        NULLs last in both directions, then game id. (Python's sort is
+        stable and already near-sorted after an incremental refresh.)
+        """
+        live = [slot for slot in sorted(range(len(self.game_ids)), key=self.game_ids.__getitem__)
+                if self.alive >> slot & 1]
+
+        def permutations(region, field, value):
+            present = [slot for slot in live if value(slot) is not None]
+            missing = [slot for slot in live if value(slot) is None]
+            for desc in (False, True):
+                order = sorted(present, key=value, reverse=desc) + missing
+                self.orderings[(region, field, desc)] = order
+                self.positions[(region, field, desc)] = {slot: i for i, slot in enumerate(order)}
+
+        for region, rows in self.regional.items():
+            permutations(region, 'title', lambda slot, rows=rows: rows[slot][0] if rows[slot] else None)
+            permutations(region, 'release_date', lambda slot, rows=rows: rows[slot][1] if rows[slot] else None)
+        permutations(None, 'created_at', self.shared['created_at'].__getitem__)
+
+    # ---------------------------
+    # Querying
+    # ---------------------------
+    def match(self, cleaned_data, ranking=None, skip=None):
+        """
+        Bitset of the games matching a GameFilter's cleaned_data,
+        optionally ignoring one filter (for facet counts). A title search
+        is answered from `ranking`, its search_game_ids() result.
+        """
+        mask = self.alive
+        for name, value in cleaned_data.items():
+            if name == skip or name == 'ordering' or value in (None, '', False):
+                continue
+            if name == 'title':
+                mask &= self.bits_for(ranking or ())
+            elif name in self.facets:
+                if not value:
+                    continue  # Empty multi-select = no filter
+                values = self.facets[name]
+                selected = 0
+                for option in value:
+                    selected |= values.get(option.pk, 0)
+                mask &= selected
+            elif name in ('release_date_min', 'release_date_max'):
+                mask &= self._date_bits(name, value.toordinal())
+            elif name in BOOLEAN_FILTERS:
+                flag, wanted = BOOLEAN_FILTERS[name]
+                mask &= self.flags[flag] if wanted else ~self.flags[flag]
+        return mask
+
+    def bits_for(self, game_ids):
+        bits = 0
+        for pk in game_ids:
+            slot = self.slot_of.get(pk)
+            if slot is not None:
+                bits |= 1 << slot
+        return bits
+
+    def _date_bits(self, name, ordinal):
+        bits = 0
+        for slot, value in enumerate(self.release_ordinals):
+            if value and (value >= ordinal if name == 'release_date_min' else value <= ordinal):
+                bits |= 1 << slot
+        return bits & self.alive
+
+    def facet_counts(self, cleaned_data, facet_fields, ranking=None):
+        """
+        Same shape as FacetedFilterSet.facet_counts(), answered with popcounts.
+        """
+        counts = {}
+        for facet in facet_fields:
+            mask = self.match(cleaned_data, ranking, skip=facet)
+            counts[facet] = {value: n for value, bits in self.facets[facet].items()
+                             if (n := (mask & bits).bit_count())}
+        return counts
+
+    def ordered_slots(self, region, field, desc):
+        key = (None if field == 'created_at' else region, field, desc)
+        return self.orderings[key], self.positions[key]
+
+    def sort_value(self, region, field):
+        """
+        slot -> the value of a sort field, JSON-ready (as cursor tokens carry it).
+        """
+        if field == 'created_at':
+            values = self.shared['created_at']  # GameCard.created_at is nullable
+            return lambda slot: _json_ready(values[slot])
+        column, rows = REGIONAL_COLUMNS.index(field), self.regional[region]
+        return lambda slot: _json_ready(rows[slot][column] if rows[slot] else None)
+
+    def card(self, slot, region):
+        """
+        An unsaved GameCard carrying the projection row, for the grid templates.
+        """
+        card = GameCard(game_id=self.game_ids[slot], region_code=region)
+        for name, value in zip(REGIONAL_COLUMNS, self.regional[region][slot] or ()):
+            setattr(card, name, value)
+        for name, column in self.shared.items():
+            setattr(card, name, column[slot])
+        for name in ('own_game', 'own_box', 'own_manual'):
+            setattr(card, name, bool(self.flags[name] >> slot & 1))
+        return card
+
+
+class SnapshotPaginator:
+    """
+    CursorPaginator look-alike over a snapshot bitset. Its tokens are the
+    ones CursorPaginator writes for the same GameCard ordering (sort value,
+    game id, card id), so a cursor keeps working when a request falls back
+    to the ORM path, and the other way round.
+    """
+
+    def __init__(self, snapshot, mask, order, positions, region, per_page, sort_value):
+        self.snapshot = snapshot
+        self.mask = mask
+        self.order = order
+        self.positions = positions
+        self.region = region
+        self.per_page = per_page
+        self.sort_value = sort_value  # slot -> the ordering key's value, as CursorPaginator stores it
+        # Byte view of the mask: O(1) membership tests while walking
+        self._mask_bytes = mask.to_bytes((max(mask.bit_length(), 1) + 7) // 8, 'little') if mask > 0 else b''
+
+    def get_page(self, cursor=None):
+        position = self._decode(cursor)
+        if position is None:
+            slots = self._walk(0, 1)
+            return self._page(slots, 1, has_next=len(slots) > self.per_page, has_previous=False)
+
+        index, direction, number = position
+        if direction == 'next':
+            slots = self._walk(index + 1, 1)
+            return self._page(slots, number, has_next=len(slots) > self.per_page, has_previous=True)
+
+        slots = self._walk(index - 1, -1)
+        has_previous = len(slots) > self.per_page
+        return self._page(list(reversed(slots[:self.per_page])), number if has_previous else 1,
+                          has_next=True, has_previous=has_previous)
+
+    @cached_property
+    def count(self):
+        return self.mask.bit_count() if self.mask > 0 else 0
+
+    @cached_property
+    def num_pages(self):
+        return max(1, -(-self.count // self.per_page))
+
+    def encode(self, obj, direction, number):
+        values = [self.sort_value(self.snapshot.slot_of[obj.game_id]), obj.game_id, obj.id]
+        raw = json.dumps({'k': values, 'd': direction, 'n': number}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def _decode(self, token):
+        if not token:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            data = json.loads(raw)
+            value, game_id, card_id = data['k']
+            index = self.positions[self.snapshot.slot_of[int(game_id)]]
+            direction = data['d'] if data['d'] in ('next', 'prev') else 'next'
+            return index, direction, int(data['n'])
+        except (ValueError, TypeError, KeyError, binascii.Error):
+            return None
+
+    def _walk(self, start, step):
+        slots, mask_bytes, index = [], self._mask_bytes, start
+        while 0 <= index < len(self.order) and len(slots) <= self.per_page:
+            slot = self.order[index]
+            if slot >> 3 < len(mask_bytes) and mask_bytes[slot >> 3] >> (slot & 7) & 1:
+                slots.append(slot)
+            index += step
+        return slots
+
+    def _page(self, slots, number, has_next, has_previous):
+        cards = [self.snapshot.card(slot, self.region) for slot in slots[:self.per_page]]
+        return CursorPage(cards, self, number=number, has_next=has_next, has_previous=has_previous)
+
+
+# ---------------------------
+# Per-worker instance
+# ---------------------------
+_snapshot = None
+_lock = threading.Lock()
+
+
+def get_snapshot():
+    """
+    Returns the up-to-date snapshot, or None when it is disabled or another
+    thread is busy (re)loading it - callers then use the ORM instead.
+    """
+    global _snapshot
+    if not getattr(settings, 'LIBRARY_SNAPSHOT_ENABLED', False):
+        return None
+    if not _lock.acquire(blocking=False):
+        return None
+    try:
+        # Swapped in one assignment: a reader has either the old snapshot or the new one
+        _snapshot = (_snapshot or CatalogueSnapshot()).refreshed()
+        return _snapshot
+    finally:
+        _lock.release()
+
+
+def snapshot_page(snapshot, my_filter, region, cursor, per_page):
+    """
+    Serves a game_list page (and its facet counts) from the snapshot.
+    Returns None for filter states the snapshot does not model.
+    """
+    data = my_filter.form.cleaned_data
+    ordering = data.get('ordering') or []
+    if len(ordering) > 1:
+        return None
+
+    # One index lookup per request: match() and every facet count reuse it
+    ranking = search_game_ids(data['title']) if data.get('title') else None
+    mask = snapshot.match(data, ranking)
+    if ranking is not None and not ordering:
+        # Searches come back by relevance unless a sort was picked
+        order = [snapshot.slot_of[pk] for pk in ranking if pk in snapshot.slot_of]
+        positions = {slot: i for i, slot in enumerate(order)}
+        rank_of = {pk: i for i, pk in enumerate(ranking)}  # The ORM path's search_rank
+        sort_value = lambda slot: rank_of[snapshot.game_ids[slot]]
+    else:
+        param = ordering[0] if ordering else 'title'
+        field = my_filter.filters['ordering'].get_ordering_value(param)
+        order, positions = snapshot.ordered_slots(region, field.lstrip('-'), field.startswith('-'))
+        sort_value = snapshot.sort_value(region, field.lstrip('-'))
+
+    page = SnapshotPaginator(snapshot, mask, order, positions, region, per_page, sort_value).get_page(cursor)
+    return page, snapshot.facet_counts(data, my_filter.facet_fields, ranking)
@@ -0,0 +1,67 @@
+import logging
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from core.downloader import ArtDownloader
+from tasks.queue import task
+
+logger = logging.getLogger(__name__)
+
+
+@task(max_attempts=3)
+def process_stored_images(model_label, pk, names):
+    # Runs the image pipeline for files that were saved as uploaded (see ProcessedImagesMixin.save)
+    obj = apps.get_model(model_label).objects.filter(pk=pk).first()
+    if obj is None:
+        return  # Deleted before the worker got to it
+    names = [name for name in names if name in obj.IMAGE_FIELDS]
+    obj.process_and_save(names)
+
+
+def queue_unprocessed_images(batch_size=200):
+    """
+    Queues process_stored_images for every object with files not yet
+    processed at the current pipeline version (what `manage.py
+    process_images` does inline). Returns the number of objects queued.
+    """
+    from .images import ProcessedImagesMixin
+
+    queued = 0
+    for model in [m for m in apps.get_models() if issubclass(m, ProcessedImagesMixin)]:
+        for obj in model.objects.order_by('pk').iterator(chunk_size=batch_size):
+            names = [name for name in obj.IMAGE_FIELDS if obj._needs_processing(name)]
+            if names:
+                process_stored_images.enqueue(model._meta.label, obj.pk, names,
+                                              key=f'images:{model._meta.label}:{obj.pk}:backfill')
+                queued += 1
+    return queued
+
+
+def save_box_art(items, downloader=None):
+    """
+    Downloads box art for [(game id, url), ...] concurrently and attaches it
+    to games that still have none. Returns the downloader's stats.
+    """
+    Game = apps.get_model('library', 'Game')
+    downloader = downloader or ArtDownloader(max_workers=settings.ART_DOWNLOAD_WORKERS,
+                                             per_host=settings.ART_DOWNLOAD_PER_HOST,
+                                             cache_dir=settings.ART_CACHE_DIR)
+    games = Game.objects.in_bulk([game_id for game_id, url in items])
+    wanted = [(game_id, url) for game_id, url in items if game_id in games and not games[game_id].box_art]
+
+    for game_id, url, content in downloader.fetch_all(wanted):
+        if content is None:
+            logger.warning("Box art download failed: %s", url)
+            continue
+        game = games[game_id]
+        ext = 'png' if '.png' in url.lower() else 'jpg'
+        game.box_art.save(f"{game.slug}.{ext}", ContentFile(content), save=False)
+        game.save(update_fields=['box_art'])
+    return downloader.stats
+
+
+@task(max_attempts=2)
+def download_box_art(items):
+    # Failed URLs are logged, not retried: the rest of the batch is already saved
+    stats = save_box_art(items)
+    logger.info("Box art: %s", stats)
@@ -1,4 +1,7 @@
 from django import template
+from django.utils.html import format_html, format_html_join
+from library.localization import get_preferred_region, resolve_localized_data
+from library.videos import embed_url, parse_video, poster_url
 
 register = template.Library()
 
@@ -7,50 +10,21 @@ register = template.Library()
 def get_localized_data(game, user):
     """
     Returns localized title/art/date with smart fallbacks.
+    Views batch this up front with `localize_games`; the per-game lookup
+    below only runs for games that were not pre-resolved.
     """
-    # 1. Start with Defaults
-    data = {
-        'title': game.title,
-        'release_date': game.release_date,  # Default Date
-        'box_art': game.box_art,
-        'back_art': game.back_art,
-        'spine_art': game.spine_art,
-    }
+    localized = getattr(game, 'localized', None)
+    if localized is not None:
+        return localized
 
-    # 2. Determine Preference
-    target_region = 'NTSC-U'
-    if user.is_authenticated:
-        try:
-            profile = getattr(user, 'profile', None)
-            if profile:
-                target_region = profile.preferred_region
-        except Exception:
-            pass
-
-    # 3. LOGIC A: Simple Title Swap
-    if target_region == 'NTSC-J' and game.title_japanese:
-        data['title'] = game.title_japanese
-
-    # 4. LOGIC B: Regional Release Override
+    target_region = get_preferred_region(user)
     found_release = None
     for r in game.regional_releases.all():
         if r.region_code == target_region:
             found_release = r
             break
 
-    if found_release:
-        if found_release.title:
-            data['title'] = found_release.title
-        if found_release.release_date:
-            data['release_date'] = found_release.release_date  # Override Date
-        if found_release.box_art:
-            data['box_art'] = found_release.box_art
-        if found_release.back_art:
-            data['back_art'] = found_release.back_art
-        if found_release.spine_art:
-            data['spine_art'] = found_release.spine_art
-
-    return data
+    return resolve_localized_data(game, target_region, found_release)
 
 
 @register.simple_tag(takes_context=True)
@@ -78,4 +52,61 @@ def render_stars(score):
         'has_half': has_half,
         'empty_stars': range(empty_stars),
         'score': score
-    }
\ No newline at end of file
+    }
+
+
+@register.simple_tag
+def responsive_image(file, sizes='100vw', alt='', **attrs):
+    """
+    Renders an image field as <picture>: AVIF/WebP srcsets from the image
+    pipeline's derivatives, the original as the <img> fallback, and
+    width/height so the layout doesn't jump while loading.
+    Usage: {% responsive_image card.box_art sizes="(max-width: 600px) 50vw, 200px" alt=card.title %}
+    """
+    if not file:
+        return ''
+    instance = getattr(file, 'instance', None)
+    entry = (getattr(instance, 'image_meta', None) or {}).get(file.field.name)
+    if not entry or entry.get('name') != file.name:
+        entry = {}  # Not processed yet (or stale): plain original
+
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    if entry.get('width'):
+        attrs.setdefault('width', entry['width'])
+        attrs.setdefault('height', entry['height'])
+    img = format_html('<img src="{}" alt="{}"{}>', file.url, alt,
+                      format_html_join('', ' {}="{}"', attrs.items()))
+
+    derivatives = entry.get('derivatives')
+    if not derivatives:
+        return img
+    sources = format_html_join('', '<source type="image/{}" srcset="{}" sizes="{}">', (
+        (extension, ', '.join(f'{file.storage.url(name)} {w}w' for w, name in variants), sizes)
+        for extension, variants in derivatives.items() if variants
+    ))
+    return format_html('<picture style="display: contents;">{}{}</picture>', sources, img)
+
+
+@register.simple_tag
+def video_facade(obj, field, title=''):
+    """
+    Renders a video field as a static poster with a play button; the
+    player iframe is only created when it's clicked (see base.html).
+    Usage: {% video_facade game 'video_review' title=game.title %}
+    """
+    url = getattr(obj, field)
+    if not url:
+        return ''
+    provider, video_id = obj.parsed_video(field)
+    if not video_id:
+        provider, video_id = parse_video(url)  # Saved before the columns existed
+    if not video_id:
+        return format_html('<a class="video-facade" href="{}" target="_blank" rel="noopener">'
+                           '<span class="video-facade-play" aria-hidden="true">&#9654;</span></a>', url)
+
+    poster = poster_url(provider, video_id)
+    image = format_html('<img src="{}" alt="" loading="lazy" decoding="async">', poster) if poster else ''
+    return format_html('<button type="button" class="video-facade" data-embed="{}" aria-label="Play video{}">'
+                       '{}<span class="video-facade-play" aria-hidden="true">&#9654;</span></button>',
+                       embed_url(provider, video_id), f': {title}' if title else '', image)
@@ -1,3 +1,458 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import date
+from io import BytesIO, StringIO
+from unittest import mock
+from PIL import Image, features
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .models import (Game, Platform, Series, Genre, Region, Developer, Publisher,
+                     GameCard, GameComponent, GameVideo, RegionalRelease)
+from .search import FTS_TABLE, normalize_search_text, search_game_ids
+from .snapshot import CatalogueSnapshot
+from .views import SERIES_SIBLINGS_LIMIT
+from . import images, snapshot
+from comments.models import Comment
 
-# Create your tests here.
+
+class GameDetailQueryTests(TestCase):
+    """
+    game_detail must cost the same number of queries however many credits,
+    versions or series siblings a game has.
+    """
+    # game + 8 prefetches + other_versions + localized release + series siblings
+    # (comments load separately, see test_comment_section)
+    EXPECTED_QUERIES = 12
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.platforms = [Platform.objects.create(name=f'Platform {i}', slug=f'platform-{i}', manufacturer='Sony')
+                         for i in range(3)]
+        cls.series = Series.objects.create(name='Biohazard', slug='biohazard')
+        cls.sparse = cls.make_game('sparse', size=1)
+        cls.rich = cls.make_game('rich', size=6)
+
+    @classmethod
+    def make_game(cls, prefix, size):
+        game = Game.objects.create(title=f'{prefix} game', slug=prefix, platform=cls.platforms[0], series=cls.series)
+        for i in range(size):
+            game.developers.add(Developer.objects.create(name=f'{prefix} dev {i}', slug=f'{prefix}-dev-{i}'))
+            game.publishers.add(Publisher.objects.create(name=f'{prefix} pub {i}', slug=f'{prefix}-pub-{i}'))
+            game.genres.add(Genre.objects.create(name=f'{prefix} genre {i}', slug=f'{prefix}-genre-{i}'))
+            region = Region.objects.create(name=f'{prefix} region {i}', slug=f'{prefix}-region-{i}')
+            game.regions.add(region)
+            game.owned_regions.add(region)
+            GameComponent.objects.create(game=game, name=f'Insert {i}')
+            GameVideo.objects.create(game=game, title=f'Extra {i}', url='https://www.youtube.com/watch?v=dQw4w9WgXcQ')
+            version = Game.objects.create(title=f'{prefix} port {i}', slug=f'{prefix}-port-{i}',
+                                          platform=cls.platforms[i % 3])
+            game.other_versions.add(version)
+            user = User.objects.create_user(f'{prefix}-user-{i}')
+            Comment.objects.create(user=user, content_object=game, body=f'Comment {i}')
+        for i in range(size * 3):
+            Game.objects.create(title=f'{prefix} sequel {i}', slug=f'{prefix}-sequel-{i}',
+                                platform=cls.platforms[i % 3], series=cls.series)
+        RegionalRelease.objects.create(game=game, region_code='NTSC-U', title=f'{prefix} (US)')
+        return game
+
+    def get_detail(self, game):
+        return self.client.get(reverse('library:game_detail', args=[game.slug]))
+
+    def test_query_count_is_fixed(self):
+        self.get_detail(self.sparse)  # Warm the ContentType cache used by the comments placeholder
+
+        for game in (self.sparse, self.rich):
+            with self.subTest(game=game.slug), self.assertNumQueries(self.EXPECTED_QUERIES):
+                response = self.get_detail(game)
+            self.assertContains(response, f'{game.slug} (US)')
+            self.assertContains(response, 'hx-trigger="revealed"')
+
+    def test_comment_section(self):
+        content_type = ContentType.objects.get_for_model(Game)
+        for game, comments in ((self.sparse, 1), (self.rich, 6)):
+            url = reverse('comments:comment_section', args=[content_type.pk, game.pk])
+            # game + one page of comments with their authors (the count is denormalized on Game)
+            with self.subTest(game=game.slug), self.assertNumQueries(2):
+                response = self.client.get(url, {'next': f'/library/game/{game.slug}/'}, HTTP_HX_REQUEST='true')
+            self.assertContains(response, f'>{comments}</span>)')
+            self.assertNotContains(response, '<html')
+            self.assertContains(response, f'{game.slug}-user-0'.upper())
+            # Element ids let a LOAD MORE page replace the copy of a comment posted in place
+            first = Comment.objects.filter(content_type=content_type, object_id=game.pk).first()
+            self.assertContains(response, f'id="comment-{first.pk}"')
+
+    def test_comment_section_without_javascript(self):
+        # The placeholder's <noscript> link: the same section, inside the site layout
+        content_type = ContentType.objects.get_for_model(Game)
+        detail = self.get_detail(self.rich)
+        url = reverse('comments:comment_section', args=[content_type.pk, self.rich.pk])
+        self.assertContains(detail, f'<a href="{url}?next=')
+
+        response = self.client.get(url, {'next': '/library/game/rich/'})
+        self.assertContains(response, '<html')
+        self.assertContains(response, 'href="/library/game/rich/"')
+        self.assertContains(response, '>6</span>)')
+        self.assertIn('HX-Request', response['Vary'])
+
+        with mock.patch('comments.views.COMMENTS_PER_PAGE', 4):
+            response = self.client.get(url, {'next': '/library/game/rich/'})
+            more = reverse('comments:comment_page', args=[content_type.pk, self.rich.pk])
+            self.assertContains(response, f'{more}?cursor=')
+            cursor = response.context['comments'].next_cursor
+            response = self.client.get(more, {'cursor': cursor, 'next': '/library/game/rich/'})
+        self.assertContains(response, '<html')
+        self.assertContains(response, 'RICH-USER-5')
+        self.assertContains(response, 'href="/library/game/rich/"')
+
+    def test_series_siblings_are_capped(self):
+        response = self.get_detail(self.rich)
+        siblings = list(response.context['series_siblings'])
+        self.assertEqual(len(siblings), SERIES_SIBLINGS_LIMIT)
+        self.assertNotIn(self.rich, siblings)
+
+
+class MediaFlagTests(TestCase):
+    def setUp(self):
+        self.platform = Platform.objects.create(name='Dreamcast', slug='dreamcast', manufacturer='Sega')
+        self.game = Game.objects.create(title='Shenmue', slug='shenmue', platform=self.platform)
+
+    def flags(self):
+        self.game.refresh_from_db()
+        return [getattr(self.game, name) for name in (*Game.MEDIA_FLAGS, 'has_patron_extras')]
+
+    def test_flags_are_derived_on_save(self):
+        self.assertEqual(self.flags(), [False, False, False, False])
+        self.game.video_playthrough = 'https://youtu.be/Shenmue0001'
+        self.game.written_review = 'Still holds up.'
+        self.game.save()
+        self.assertEqual(self.flags(), [True, True, False, False])
+
+        self.game.written_review = ''
+        self.game.video_condition = 'https://youtu.be/Shenmue0002'
+        self.game.save()
+        self.assertEqual(self.flags(), [True, False, True, False])
+
+    def test_update_fields_saves_the_flags_too(self):
+        self.game.video_review = 'https://youtu.be/Shenmue0003'
+        self.game.save(update_fields=['video_review'])
+        self.assertEqual(self.flags(), [False, True, False, False])
+
+    def test_patron_only_videos_flip_the_extras_flag(self):
+        GameVideo.objects.create(game=self.game, title='Trailer', url='https://youtu.be/Shenmue0004')
+        self.assertFalse(self.flags()[3])
+        extra = GameVideo.objects.create(game=self.game, title='Bonus', url='https://youtu.be/Shenmue0005',
+                                         is_patron_only=True)
+        self.assertTrue(self.flags()[3])
+        self.assertTrue(Game.objects.filter(has_patron_extras=True).exists())
+
+        extra.delete()
+        self.assertFalse(self.flags()[3])
+
+
+def image_upload(name, color, size=(1200, 900), fmt='PNG'):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, format=fmt)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class TempMediaMixin:
+    # Files land in a throwaway MEDIA_ROOT and are processed inline (no worker)
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root, TASKS_EAGER=True)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.platform = Platform.objects.create(name='Dreamcast', slug='dreamcast', manufacturer='Sega')
+        self.game = Game.objects.create(title='Shenmue', slug='shenmue', platform=self.platform)
+
+
+class ImagePipelineTests(TempMediaMixin, TestCase):
+    def upload(self, color):
+        self.game.box_art = image_upload('shenmue.png', color)
+        with mock.patch('library.images.process_image', wraps=images.process_image) as process:
+            self.game.save()
+        self.game.refresh_from_db()
+        return process.call_count
+
+    def test_upload_is_processed_once(self):
+        self.assertEqual(self.upload('red'), 1)
+        entry = self.game.image_meta['box_art']
+        self.assertEqual(entry['name'], self.game.box_art.name)
+        self.assertTrue(entry['name'].endswith('.jpg'))  # Opaque PNG -> JPEG
+        self.assertEqual((entry['v'], entry['width'], entry['height']), (images.IMAGE_PIPELINE_VERSION, 800, 600))
+
+        # Saving for anything else doesn't read the file again
+        self.game.own_game = True
+        with mock.patch('library.images.process_image') as process:
+            self.game.save()
+        process.assert_not_called()
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.image_meta['box_art'], entry)
+
+    def test_same_file_uploaded_again_is_skipped_by_hash(self):
+        self.upload('red')
+        entry = self.game.image_meta['box_art']
+        stored = sorted(os.listdir(os.path.dirname(self.game.box_art.path)))
+
+        self.assertEqual(self.upload('red'), 0)
+        self.assertEqual(self.game.box_art.name, entry['name'])  # Points back at the processed file
+        self.assertEqual(self.game.image_meta['box_art'], entry)
+        self.assertEqual(sorted(os.listdir(os.path.dirname(self.game.box_art.path))), stored)
+
+    def test_replaced_file_is_reprocessed(self):
+        self.upload('red')
+        entry = self.game.image_meta['box_art']
+        self.assertEqual(self.upload('blue'), 1)
+        new = self.game.image_meta['box_art']
+        self.assertNotEqual(new['source'], entry['source'])
+        self.assertNotEqual(new['name'], entry['name'])
+        self.assertTrue(self.game.box_art.storage.exists(new['name']))
+
+
+class ResponsiveImageTests(TempMediaMixin, TestCase):
+    def render(self, game):
+        template = Template('{% load library_extras %}'
+                            '{% responsive_image game.box_art sizes="200px" alt=game.title %}')
+        return template.render(Context({'game': game}))
+
+    def test_derivatives_per_format_and_width(self):
+        self.game.box_art = image_upload('shenmue.png', 'red')
+        self.game.save()
+        derivatives = self.game.image_meta['box_art']['derivatives']
+        formats = [extension for extension, pil_format, quality in images.DERIVATIVE_FORMATS
+                   if features.check(extension)]
+        self.assertEqual(list(derivatives), formats)
+        for extension, variants in derivatives.items():
+            self.assertEqual([w for w, name in variants], [160, 320, 480, 640, 800])
+            for w, name in variants:
+                self.assertTrue(name.endswith(f'-{w}.{extension}'))
+                with self.game.box_art.storage.open(name) as f:
+                    self.assertEqual(Image.open(f).size, (w, w * 3 // 4))
+
+        # Small images only get their own width
+        self.game.back_art = image_upload('back.png', 'blue', size=(200, 100))
+        self.game.save()
+        widths = [w for w, name in self.game.image_meta['back_art']['derivatives']['webp']]
+        self.assertEqual(widths, [160, 200])
+
+    def test_picture_with_srcsets(self):
+        self.game.box_art = image_upload('shenmue.png', 'red')
+        self.game.save()
+        html = self.render(self.game)
+        self.assertTrue(html.startswith('<picture'))
+        self.assertIn('<source type="image/webp" srcset="/media/derivatives/', html)
+        self.assertIn('-160.webp 160w, ', html)
+        self.assertIn('-800.webp 800w" sizes="200px">', html)
+        self.assertIn(f'<img src="/media/{self.game.box_art.name}" alt="Shenmue"', html)
+        self.assertIn('width="800" height="600"', html)
+        self.assertIn('loading="lazy"', html)
+
+    def test_plain_img_without_derivatives(self):
+        # Set straight in the table: never processed
+        Game.objects.filter(pk=self.game.pk).update(box_art='games/covers/raw.jpg')
+        self.game.refresh_from_db()
+        self.assertEqual(self.render(self.game),
+                         '<img src="/media/games/covers/raw.jpg" alt="Shenmue" loading="lazy" decoding="async">')
+
+        # A stale entry (the file was swapped behind the pipeline's back) is ignored too
+        self.game.image_meta = {'box_art': {'name': 'games/covers/old.jpg', 'width': 800, 'height': 600,
+                                            'derivatives': {'webp': [[160, 'derivatives/aa/old-160.webp']]}}}
+        self.assertNotIn('<picture', self.render(self.game))
+        self.assertEqual(self.render(Game(title='No art', box_art='')), '')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        platform = Platform.objects.create(name='Dreamcast', slug='dreamcast', manufacturer='Sega')
+        cls.sonic = Game.objects.create(title='Sonic Adventure', title_japanese='ソニックアドベンチャー',
+                                        slug='sonic-adventure', platform=platform)
+        cls.chuchu = Game.objects.create(title='ChuChu Rocket!', slug='chuchu-rocket', platform=platform)
+        cls.chuchu.developers.add(Developer.objects.create(name='Sonic Team', slug='sonic-team'))
+        cls.pokemon = Game.objects.create(title='Pokémon Snap', slug='pokemon-snap', platform=platform)
+        cls.ghosts = Game.objects.create(title="Ghosts'n Goblins: Resurrection", slug='ghosts-n-goblins',
+                                         platform=platform)
+
+    def test_normalize_search_text(self):
+        self.assertEqual(normalize_search_text('ソニック'), 'そにっく')
+        self.assertEqual(normalize_search_text('ｿﾆｯｸ'), 'そにっく')  # Half-width katakana
+        self.assertEqual(normalize_search_text('ガンダム'), 'がんだむ')  # Dakuten survive
+        self.assertEqual(normalize_search_text('ＳＯＮＩＣ'), 'sonic')
+        self.assertEqual(normalize_search_text('Pokémon'), 'pokemon')
+        self.assertEqual(normalize_search_text("Ghosts'n  Goblins: Resurrection!"), 'ghosts n goblins resurrection')
+        self.assertEqual(normalize_search_text(None), '')
+
+    def test_spellings_find_the_same_game(self):
+        for term, game in (('ｿﾆｯｸ', self.sonic), ('そにっく', self.sonic), ('POKEMON', self.pokemon),
+                           ('Pokémon snap', self.pokemon), ('ghosts-n-goblins', self.ghosts),
+                           ('Ghosts’n Goblins', self.ghosts)):
+            with self.subTest(term=term):
+                self.assertEqual(search_game_ids(term), [game.pk])
+
+    def test_index_ranks_titles_above_credits(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(search_game_ids('sonic'), [self.sonic.pk, self.chuchu.pk])
+        self.assertEqual(sum(FTS_TABLE in q['sql'] for q in queries), 1)
+
+    def test_short_terms_narrow_indexed_hits(self):
+        self.assertEqual(search_game_ids('sonic ch'), [self.chuchu.pk])
+        self.assertEqual(search_game_ids('sn'), [self.pokemon.pk])
+
+    def test_substring_fallback_without_the_index(self):
+        # The index query fails (e.g. no FTS5): every term becomes a substring match
+        with mock.patch('library.search.FTS_TABLE', 'library_missing_fts'):
+            self.assertEqual(search_game_ids('sonic'), [self.sonic.pk, self.chuchu.pk])
+            self.assertEqual(search_game_ids('ソニック'), [self.sonic.pk])
+            self.assertEqual(search_game_ids('nothing like it'), [])
+        # The failed query was rolled back to its savepoint: the connection is still usable
+        self.assertEqual(search_game_ids('sonic'), [self.sonic.pk, self.chuchu.pk])
+
+
+class CatalogueSnapshotTests(TestCase):
+    """
+    The snapshot must answer game_list exactly like the ORM path: same
+    games in the same order on every page, same facet counts, and cursors
+    that work on either path.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.platforms = [Platform.objects.create(name=f'Platform {i}', slug=f'platform-{i}', manufacturer='Sega')
+                         for i in range(3)]
+        cls.genres = [Genre.objects.create(name=f'Genre {i}', slug=f'genre-{i}') for i in range(3)]
+        cls.regions = [Region.objects.create(name=f'Region {i}', slug=f'region-{i}') for i in range(2)]
+        cls.developer = Developer.objects.create(name='Sonic Team', slug='sonic-team')
+        cls.games = []
+        for i in range(45):
+            game = Game.objects.create(
+                # Repeated titles and missing dates: ties and NULLs have to order the same way
+                title=f'{"Sonic" if i % 4 == 0 else "Game"} {i % 15:02d}', slug=f'game-{i}',
+                platform=cls.platforms[i % 3], own_game=i % 2 == 0, own_box=i % 5 == 0,
+                release_date=date(1990 + i % 12, 1 + i % 12, 1) if i % 7 else None,
+            )
+            game.genres.add(cls.genres[i % 3])
+            game.regions.add(cls.regions[i % 2])
+            if i % 3 == 0:
+                game.developers.add(cls.developer)
+            if i % 6 == 0:
+                RegionalRelease.objects.create(game=game, region_code='NTSC-U', title=f'Aaa US {i}')
+            cls.games.append(game)
+
+    def setUp(self):
+        snapshot._snapshot = None
+        self.addCleanup(setattr, snapshot, '_snapshot', None)
+
+    def crawl(self, params, enabled):
+        """
+        Follows the next cursors from page 1. Returns (game ids per page, page 1 facets).
+        """
+        pages, facets, cursor = [], None, None
+        with override_settings(LIBRARY_SNAPSHOT_ENABLED=enabled):
+            while True:
+                response = self.client.get(reverse('library:game_list'), {**params, **({'cursor': cursor} if cursor else {})})
+                page = response.context['games']
+                pages.append([card.game_id for card in page])
+                facets = facets or response.context['facets']
+                if not page.has_next():
+                    return pages, facets
+                cursor = page.next_cursor
+
+    def test_pages_and_facets_match_the_orm(self):
+        for params in ({}, {'ordering': '-release_date'}, {'ordering': 'release_date'}, {'ordering': '-date_added'},
+                       {'platform': self.platforms[1].pk}, {'genres': [self.genres[0].pk, self.genres[2].pk]},
+                       {'own_game': 'on', 'missing_box': 'on'}, {'release_date_min': '1995-01-01'},
+                       {'title': 'sonic'}, {'title': 'game'}, {'title': 'sonic', 'ordering': '-title'},
+                       {'developers': self.developer.pk, 'regions': self.regions[0].pk}):
+            with self.subTest(params=params):
+                orm_pages, orm_facets = self.crawl(params, enabled=False)
+                snapshot_pages, snapshot_facets = self.crawl(params, enabled=True)
+                self.assertEqual(snapshot_pages, orm_pages)
+                self.assertEqual(snapshot_facets, orm_facets)
+                self.assertTrue(orm_pages[0])
+
+    def test_cursors_work_on_either_path(self):
+        url = reverse('library:game_list')
+        for params in ({'ordering': '-release_date'}, {'title': 'game'}):
+            orm_pages, _ = self.crawl(params, enabled=False)
+            for first, second in ((True, False), (False, True)):
+                with self.subTest(params=params, snapshot_then_orm=first):
+                    with override_settings(LIBRARY_SNAPSHOT_ENABLED=first):
+                        page = self.client.get(url, params).context['games']
+                    with override_settings(LIBRARY_SNAPSHOT_ENABLED=second):
+                        page = self.client.get(url, {**params, 'cursor': page.next_cursor}).context['games']
+                    self.assertEqual(page.number, 2)
+                    self.assertEqual([card.game_id for card in page], orm_pages[1])
+                    with override_settings(LIBRARY_SNAPSHOT_ENABLED=first):
+                        page = self.client.get(url, {**params, 'cursor': page.previous_cursor}).context['games']
+                    self.assertEqual([card.game_id for card in page], orm_pages[0])
+
+    def test_search_pages_are_fetched_by_id(self):
+        # No CASE with a WHEN per hit: the ranking is paged in Python
+        with override_settings(LIBRARY_SNAPSHOT_ENABLED=False), CaptureQueriesContext(connection) as queries:
+            page = self.client.get(reverse('library:game_list'), {'title': 'game'}).context['games']
+        self.assertEqual(len(page), 20)
+        self.assertEqual([q['sql'] for q in queries if 'library_gamecard' in q['sql'] and ' WHEN ' in q['sql']], [])
+
+    def test_title_search_hits_the_index_once(self):
+        with override_settings(LIBRARY_SNAPSHOT_ENABLED=True):
+            self.client.get(reverse('library:game_list'))  # Load the snapshot
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('library:game_list'), {'title': 'sonic', 'platform': self.platforms[0].pk})
+        self.assertEqual(sum(FTS_TABLE in q['sql'] for q in queries), 1)
+
+    def test_cards_without_created_at(self):
+        GameCard.objects.filter(game__in=self.games[:5]).update(created_at=None)
+        orm_pages, _ = self.crawl({'ordering': '-date_added'}, enabled=False)
+        snapshot_pages, _ = self.crawl({'ordering': '-date_added'}, enabled=True)
+        self.assertEqual(snapshot_pages, orm_pages)
+
+    def test_bulk_commands_refresh_the_snapshot(self):
+        old = CatalogueSnapshot().refreshed()
+        game = self.games[2]
+        Game.objects.filter(pk=game.pk).update(video_playthrough='https://www.youtube.com/watch?v=dQw4w9WgXcQ')
+        call_command('backfill_media_flags', stdout=StringIO())
+        new = old.refreshed()
+        self.assertGreater(new.version, old.version)
+        self.assertTrue(new.flags['has_playthrough'] >> new.slot_of[game.pk] & 1)
+
+        GameCard.objects.filter(game=game).update(slug='stale')
+        call_command('rebuild_game_cards', stdout=StringIO())
+        self.assertEqual(new.refreshed().shared['slug'][new.slot_of[game.pk]], game.slug)
+
+    def test_incremental_refresh(self):
+        old = CatalogueSnapshot().refreshed()
+        deleted, changed = self.games[0].pk, self.games[1]
+        self.games[0].delete()
+        changed.genres.set([self.genres[2]])
+        changed.title = 'Zzz'
+        changed.save()
+
+        new = old.refreshed()
+        self.assertIsNot(new, old)
+        self.assertGreater(new.version, old.version)
+        self.assertIs(new.refreshed(), new)  # Nothing changed since
+
+        # The old snapshot is untouched (readers may still be paging through it)
+        self.assertTrue(old.alive >> old.slot_of[deleted] & 1)
+        self.assertTrue(old.facets['genres'][self.genres[1].pk] >> old.slot_of[changed.pk] & 1)
+
+        # The patched copy answers like a full reload
+        full = CatalogueSnapshot().refreshed()
+        data = {'genres': [], 'platform': []}
+        for facet in ('platform', 'genres', 'regions', 'developers'):
+            self.assertEqual(new.facet_counts(data, [facet]), full.facet_counts(data, [facet]))
+        self.assertFalse(new.alive >> new.slot_of[deleted] & 1)
+        self.assertEqual(new.match(data).bit_count(), 44)
+        for key in (('NTSC-U', 'title', False), (None, 'created_at', True)):
+            self.assertEqual([new.game_ids[slot] for slot in new.orderings[key]],
+                             [full.game_ids[slot] for slot in full.orderings[key]])
+        self.assertEqual(new.orderings[('NTSC-U', 'title', True)][0], new.slot_of[changed.pk])
@@ -1,37 +1,85 @@
 from django.shortcuts import render, get_object_or_404
-from django.core.paginator import Paginator
+from django.db.models import F, Prefetch
+from core.pagination import CursorPaginator
 from .models import Game, Platform
 from .filters import GameFilter
+from .localization import get_preferred_region, localize_games
+from .cards import card_queryset, SearchPaginator
+from .snapshot import get_snapshot, snapshot_page
+
+# Max other games shown in a detail page's "Series Collection"
+SERIES_SIBLINGS_LIMIT = 12
 
 
 def game_list(request):
     all_games = Game.objects.all().order_by('title')
     my_filter = GameFilter(request.GET, queryset=all_games)
+    region = get_preferred_region(request.user)
 
+    # Fast path: answer filters/facets from the in-memory snapshot (when enabled)
+    served = None
     if my_filter.is_valid():
-        qs = my_filter.qs
-    else:
-        qs = all_games
+        snapshot = get_snapshot()
+        if snapshot is not None:
+            served = snapshot_page(snapshot, my_filter, region, request.GET.get('cursor'), 20)
 
-    # PAGINATION: 20 items
-    paginator = Paginator(qs, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    if served is not None:
+        page_obj, facets = served
+    else:
+        page_obj, facets = _orm_page(request, my_filter, all_games, region)
 
     platforms = Platform.objects.all().order_by('name')
 
     context = {
         'games': page_obj,  # Pass the Page Object, not the raw list
         'filter': my_filter,
+        'facets': facets,  # Sidebar option counts
         'platforms': platforms,
     }
 
     if request.headers.get('HX-Request'):
+        context['facets_oob'] = True  # Refresh the sidebar counts out-of-band
         return render(request, 'library/partials/game_grid.html', context)
 
     return render(request, 'library/game_list.html', context)
 
 
+def _orm_page(request, my_filter, all_games, region):
+    if my_filter.is_valid():
+        qs = my_filter.qs
+    else:
+        qs = all_games
+
+    # Serve the page from the GameCard projection (single-table read).
+    # Only go through the Game subquery when a filter is actually set.
+    is_filtered = any(v for k, values in request.GET.lists() if k not in ('ordering', 'page', 'cursor') for v in values)
+    # Searches come back by relevance unless a sort was picked
+    ranking = my_filter.search_ranking if not request.GET.get('ordering') else None
+    cards = card_queryset(qs, region, filtered=is_filtered)
+
+    # PAGINATION: 20 items (keyset cursors: no COUNT/OFFSET)
+    paginator = SearchPaginator(cards, ranking, 20) if ranking else CursorPaginator(cards, 20)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    return page_obj, my_filter.facet_counts()
+
+
 def game_detail(request, slug):
-    game = get_object_or_404(Game.objects.prefetch_related('regional_releases'), slug=slug)
-    return render(request, 'library/game_detail.html', {'game': game})
\ No newline at end of file
+    # One query per relation the template walks, no matter how many rows each has
+    game = get_object_or_404(
+        Game.objects.select_related('platform', 'series').prefetch_related(
+            'developers', 'publishers', 'regions', 'owned_regions', 'genres',
+            'gallery_images', 'components', 'extra_videos',
+            Prefetch('other_versions', queryset=Game.objects.select_related('platform').order_by('title')),
+        ),
+        slug=slug,
+    )
+    localize_games([game], get_preferred_region(request.user))
+
+    # Capped, oldest first (undated last)
+    series_siblings = []
+    if game.series_id:
+        series_siblings = (Game.objects.filter(series_id=game.series_id).exclude(pk=game.pk)
+                           .select_related('platform')
+                           .order_by(F('release_date').asc(nulls_last=True), 'title')[:SERIES_SIBLINGS_LIMIT])
+
+    return render(request, 'library/game_detail.html', {'game': game, 'series_siblings': series_siblings})
\ No newline at end of file
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import StripeCustomer, AdminGrant
+from .models import StripeCustomer, AdminGrant, StripeEvent
 
 
 @admin.register(StripeCustomer)
@@ -18,4 +18,23 @@ class AdminGrantAdmin(admin.ModelAdmin):
         return obj.is_valid()
 
     is_valid_status.boolean = True
-    is_valid_status.short_description = "Access Valid?"
\ No newline at end of file
+    is_valid_status.short_description = "Access Valid?"
+
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'type', 'customer_id', 'created', 'status', 'processed_at')
+    list_filter = ('status', 'type')
+    search_fields = ('event_id', 'customer_id')
+    readonly_fields = [f.name for f in StripeEvent._meta.fields]
+    actions = ['replay']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Replay selected events")
+    def replay(self, request, queryset):
+        from .events import apply_pending_events
+        customers = set(queryset.values_list('customer_id', flat=True))
+        queryset.update(status=StripeEvent.PENDING, error='', processed_at=None)
+        outcome = apply_pending_events(customers)
+        self.message_user(request, f"Replayed: {outcome or 'nothing to apply'}")
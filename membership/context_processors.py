@@ -0,0 +1,7 @@
+from django.utils.functional import SimpleLazyObject
+from .entitlements import get_entitlement
+
+
+def entitlement(request):
+    # Lazy: pages that never ask for it don't resolve it
+    return {'entitlement': SimpleLazyObject(lambda: get_entitlement(request))}
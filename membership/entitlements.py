@@ -0,0 +1,103 @@
+import time
+from uuid import uuid4
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from core.models import UserProfile
+
+SESSION_KEY = '_entitlement'
+
+# Defaults (override in settings.py)
+SESSION_MAX_AGE = 15 * 60   # Re-resolve at least this often, even without an invalidation
+
+
+class Entitlement:
+    """
+    What the current visitor may access: Stripe status plus AdminGrant
+    validity, resolved once per request (see get_entitlement) instead of
+    per `user.profile.is_member` access. Templates get it as {{ entitlement }}.
+    """
+    def __init__(self, is_patron=False, grant_active=False, grant_expires=None):
+        self.is_patron = is_patron          # Paying through Stripe
+        self.grant_active = grant_active
+        self.grant_expires = grant_expires  # None = lifetime
+
+    @property
+    def has_grant(self):
+        # Checked at read time, so a cached entitlement still expires on the right day
+        return self.grant_active and (self.grant_expires is None or self.grant_expires >= timezone.now().date())
+
+    @property
+    def is_member(self):
+        return self.is_patron or self.has_grant
+
+    def to_session(self):
+        return {'patron': self.is_patron, 'grant': self.grant_active,
+                'expires': self.grant_expires.isoformat() if self.grant_expires else None}
+
+    @classmethod
+    def from_session(cls, data):
+        return cls(data['patron'], data['grant'], parse_date(data['expires']) if data['expires'] else None)
+
+
+def resolve_entitlement(user):
+    """
+    Reads a user's entitlement from the database (one query).
+    """
+    if not user.is_authenticated:
+        return Entitlement()
+    row = (User.objects.filter(pk=user.pk)
+           .values('profile__is_patron', 'stripe_customer__status', 'admin_grant__active', 'admin_grant__expires_at')
+           .first())
+    if row is None:
+        return Entitlement()
+    return Entitlement(
+        is_patron=bool(row['profile__is_patron']) or row['stripe_customer__status'] in ('active', 'trialing'),
+        grant_active=bool(row['admin_grant__active']),
+        grant_expires=row['admin_grant__expires_at'],
+    )
+
+
+def get_entitlement(request):
+    """
+    The request's Entitlement, resolved once and kept in the session
+    stamped with the user's entitlement version: webhooks and grant edits
+    bump the version (invalidate_entitlement), which makes every session
+    of that user re-resolve on its next request.
+    The version lives on the profile row every page loads anyway (base.html
+    reads the theme from it), so checking it costs no extra query.
+    """
+    cached = getattr(request, '_entitlement', None)
+    if cached is not None:
+        return cached
+
+    user = request.user
+    if not user.is_authenticated:
+        request._entitlement = Entitlement()
+        return request._entitlement
+
+    session = getattr(request, 'session', None)
+    try:
+        version = user.profile.entitlement_version
+    except UserProfile.DoesNotExist:
+        version = None
+    max_age = getattr(settings, 'ENTITLEMENT_SESSION_MAX_AGE', SESSION_MAX_AGE)
+    entry = session.get(SESSION_KEY) if session is not None else None
+    if entry and entry['user'] == user.pk and entry['version'] == version and time.time() - entry['at'] < max_age:
+        request._entitlement = Entitlement.from_session(entry['data'])
+        return request._entitlement
+
+    entitlement = resolve_entitlement(user)
+    if session is not None:
+        session[SESSION_KEY] = {'user': user.pk, 'version': version, 'at': time.time(),
+                                'data': entitlement.to_session()}
+    request._entitlement = entitlement
+    return entitlement
+
+
+def invalidate_entitlement(*user_ids):
+    # A new random token rather than a counter: a stale profile instance saved later
+    # writes back an old value, which must not match a token a session still holds
+    if user_ids:
+        UserProfile.objects.filter(user_id__in=user_ids).update(entitlement_version=uuid4().hex)
@@ -0,0 +1,144 @@
+import logging
+from datetime import datetime, timezone as dt_timezone
+from django.db import transaction
+from django.utils import timezone
+from core.models import UserProfile
+from .entitlements import invalidate_entitlement
+from .models import StripeCustomer, StripeEvent
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('active', 'trialing')
+HANDLED_TYPES = (
+    'checkout.session.completed',
+    'customer.subscription.created',
+    'customer.subscription.updated',
+    'customer.subscription.deleted',
+)
+
+
+def record_event(event):
+    """
+    Stores a verified webhook event (a plain dict) in the log. Returns
+    (StripeEvent, created); created is False when this event id was
+    already recorded, i.e. a retried delivery.
+    """
+    data_object = event['data']['object']
+    return StripeEvent.objects.get_or_create(event_id=event['id'], defaults={
+        'type': event['type'],
+        'customer_id': data_object.get('customer') or '',
+        'created': _timestamp(event['created']),
+        'data': data_object,
+        'status': StripeEvent.PENDING if event['type'] in HANDLED_TYPES else StripeEvent.IGNORED,
+    })
+
+
+def apply_pending_events(customer_ids=None):
+    """
+    Applies pending events to StripeCustomer/UserProfile, per customer in
+    the order Stripe created them. An event older than the newest one
+    already applied to that customer is skipped, so late or repeated
+    deliveries can't roll a subscription back.
+
+    Everything is applied in one transaction with bulk updates: one query
+    for the events, one for the customers, one for the profiles, then one
+    UPDATE per outcome. Returns {status: count}.
+    """
+    with transaction.atomic():
+        events = StripeEvent.objects.select_for_update().filter(status=StripeEvent.PENDING)
+        if customer_ids is not None:
+            events = events.filter(customer_id__in=customer_ids)
+        events = list(events.order_by('customer_id', 'created', 'pk'))
+        if not events:
+            return {}
+
+        customers = {c.stripe_customer_id: c for c in StripeCustomer.objects.select_for_update()
+                     .filter(stripe_customer_id__in={e.customer_id for e in events})}
+        outcomes = {}
+        changed = {}
+        for event in events:
+            customer = customers.get(event.customer_id)
+            try:
+                status = _apply(event, customer)
+            except Exception as exc:
+                logger.exception("Stripe event %s could not be applied", event.event_id)
+                status, event.error = StripeEvent.FAILED, f"{type(exc).__name__}: {exc}"
+            event.status = status
+            outcomes.setdefault(status, []).append(event)
+            if status == StripeEvent.APPLIED:
+                changed[customer.pk] = customer
+
+        if changed:
+            StripeCustomer.objects.bulk_update(changed.values(), ['stripe_subscription_id', 'status',
+                                                                  'current_period_end', 'last_event_at'])
+            sync_patron_flags(changed.values())
+
+        now = timezone.now()
+        for status, rows in outcomes.items():
+            if status == StripeEvent.FAILED:
+                for row in rows:
+                    StripeEvent.objects.filter(pk=row.pk).update(status=status, error=row.error, processed_at=now)
+            else:
+                StripeEvent.objects.filter(pk__in=[row.pk for row in rows]).update(status=status, error='',
+                                                                                   processed_at=now)
+
+    invalidate_entitlement(*(customer.user_id for customer in changed.values()))
+    return {status: len(rows) for status, rows in outcomes.items()}
+
+
+def sync_patron_flags(customers):
+    """
+    Sets UserProfile.is_patron from the customers' statuses (one query plus
+    a bulk update). Returns the ids of the users whose flag changed.
+    """
+    wanted = {c.user_id: c.status in ACTIVE_STATUSES for c in customers}
+    profiles = [p for p in UserProfile.objects.filter(user_id__in=wanted) if p.is_patron != wanted[p.user_id]]
+    for profile in profiles:
+        profile.is_patron = wanted[profile.user_id]
+    UserProfile.objects.bulk_update(profiles, ['is_patron'])
+    return [p.user_id for p in profiles]
+
+
+def period_end(subscription):
+    # Top level on older API versions; per subscription item since 2025-03
+    value = subscription.get('current_period_end')
+    if value is None:
+        items = (subscription.get('items') or {}).get('data') or []
+        value = max((item.get('current_period_end') or 0 for item in items), default=0) or None
+    return _timestamp(value) if value else None
+
+
+# ---------------------------
+# Internals
+# ---------------------------
+def _apply(event, customer):
+    """
+    Applies one event to an in-memory StripeCustomer. Returns the event's new status.
+    """
+    if customer is None:
+        return StripeEvent.IGNORED  # Not one of ours (or a customer deleted since)
+    if customer.last_event_at and event.created < customer.last_event_at:
+        return StripeEvent.SKIPPED
+
+    obj = event.data
+    if event.type == 'checkout.session.completed':
+        # Only activate membership if it was a SUBSCRIPTION mode (one-time donations aren't)
+        if obj.get('mode') != 'subscription':
+            return StripeEvent.IGNORED
+        customer.stripe_subscription_id = obj.get('subscription')
+        customer.status = 'active'
+    elif event.type == 'customer.subscription.deleted':
+        customer.stripe_subscription_id = obj.get('id')
+        customer.status = 'canceled'
+        customer.current_period_end = period_end(obj) or customer.current_period_end
+    else:
+        customer.stripe_subscription_id = obj.get('id')
+        customer.status = obj['status']
+        customer.current_period_end = period_end(obj) or customer.current_period_end
+
+    customer.last_event_at = event.created
+    return StripeEvent.APPLIED
+
+
+def _timestamp(value):
+    return datetime.fromtimestamp(int(value), tz=dt_timezone.utc)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from membership.reconcile import fetch_subscriptions, reconcile_subscriptions
+
+
+class Command(BaseCommand):
+    help = "Bring StripeCustomer statuses and patron flags back in line with Stripe's subscriptions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report the differences without saving them")
+
+    def handle(self, *args, **options):
+        fetched_at = timezone.now()  # Before the fetch: anything Stripe creates during it must still apply
+        subscriptions = fetch_subscriptions()
+        self.stdout.write(f"{len(subscriptions)} customers with subscriptions on Stripe")
+
+        changes = reconcile_subscriptions(subscriptions, fetched_at, dry_run=options['dry_run'])
+        for customer, diff in changes:
+            details = ', '.join(f"{field}: {old} -> {new}" for field, (old, new) in diff.items())
+            self.stdout.write(f"  {customer.user.username} ({customer.stripe_customer_id}): {details}")
+
+        verb = 'would be updated' if options['dry_run'] else 'updated'
+        self.stdout.write(self.style.SUCCESS(f'Finished! {len(changes)} customers {verb}.'))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from membership.events import apply_pending_events
+from membership.models import StripeCustomer, StripeEvent
+
+
+class Command(BaseCommand):
+    help = 'Re-apply logged Stripe webhook events (after a bug fix or a failed run)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--event', action='append', default=[], help="Event id (repeatable)")
+        parser.add_argument('--customer', action='append', default=[], help="Stripe customer id (repeatable)")
+        parser.add_argument('--failed', action='store_true', help="Every failed event")
+        parser.add_argument('--since', help="Every handled event created after this ISO date/time")
+        parser.add_argument('--rewind', action='store_true',
+                            help="Forget what was applied to these customers, so older events apply again")
+
+    def handle(self, *args, **options):
+        events = StripeEvent.objects.exclude(status=StripeEvent.IGNORED)
+        if options['event']:
+            events = events.filter(event_id__in=options['event'])
+        if options['customer']:
+            events = events.filter(customer_id__in=options['customer'])
+        if options['failed']:
+            events = events.filter(status=StripeEvent.FAILED)
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError(f"Not a date/time: {options['since']}")
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            events = events.filter(created__gte=since)
+        if not any(options[o] for o in ('event', 'customer', 'failed', 'since')):
+            raise CommandError("Pick the events to replay: --event, --customer, --failed and/or --since")
+
+        customers = set(events.values_list('customer_id', flat=True))
+        reset = events.update(status=StripeEvent.PENDING, error='', processed_at=None)
+        if options['rewind']:
+            StripeCustomer.objects.filter(stripe_customer_id__in=customers).update(last_event_at=None)
+        self.stdout.write(f"{reset} events queued again for {len(customers)} customers")
+
+        outcome = apply_pending_events(customers)
+        for status, count in sorted(outcome.items()):
+            self.stdout.write(f"  {status}: {count}")
+
+        self.stdout.write(self.style.SUCCESS('Finished! Stripe events replayed.'))
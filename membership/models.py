@@ -1,16 +1,21 @@
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.utils import timezone
+from core.models import UserProfile
 
 
 # 1. STRIPE CUSTOMER (Existing)
 class StripeCustomer(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='stripe_customer')
-    stripe_customer_id = models.CharField(max_length=255)
+    stripe_customer_id = models.CharField(max_length=255, db_index=True)
     stripe_subscription_id = models.CharField(max_length=255, blank=True, null=True)
 
     status = models.CharField(max_length=50, default="inactive")
     current_period_end = models.DateTimeField(null=True, blank=True)
+    # Creation time of the newest webhook event applied: older ones arriving late are skipped
+    last_event_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return f"{self.user.username} ({self.status})"
@@ -37,4 +42,50 @@ class AdminGrant(models.Model):
             return False
         if self.expires_at and self.expires_at < timezone.now().date():
             return False
-        return True
\ No newline at end of file
+        return True
+
+
+# 3. WEBHOOK EVENT LOG (see membership/events.py)
+class StripeEvent(models.Model):
+    """
+    Every verified webhook delivery, keyed by Stripe's event id (so
+    retries are no-ops). The processor applies them per customer in the
+    order Stripe created them.
+    """
+    PENDING = 'pending'
+    APPLIED = 'applied'
+    SKIPPED = 'skipped'    # Superseded by a newer event already applied
+    IGNORED = 'ignored'    # Not a type we act on / not one of our customers
+    FAILED = 'failed'
+    STATUS_CHOICES = [(s, s.title()) for s in (PENDING, APPLIED, SKIPPED, IGNORED, FAILED)]
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    customer_id = models.CharField(max_length=255, blank=True, db_index=True)
+    created = models.DateTimeField(help_text="When Stripe created the event")
+    data = models.JSONField(help_text="The event's data.object")
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer_id', 'status', 'created'], name='stripe_event_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.type} ({self.event_id})"
+
+
+# 4. ENTITLEMENT INVALIDATION (see membership/entitlements.py)
+@receiver(post_save, sender=StripeCustomer)
+@receiver(post_delete, sender=StripeCustomer)
+@receiver(post_save, sender=AdminGrant)
+@receiver(post_delete, sender=AdminGrant)
+@receiver(post_save, sender=UserProfile)
+def invalidate_entitlement_on_change(sender, instance, raw=False, **kwargs):
+    if raw: return
+    from .entitlements import invalidate_entitlement
+    invalidate_entitlement(instance.user_id)
@@ -0,0 +1,76 @@
+import stripe
+from django.conf import settings
+from django.db import transaction
+from .entitlements import invalidate_entitlement
+from .events import ACTIVE_STATUSES, period_end, sync_patron_flags
+from .models import StripeCustomer
+
+FIELDS = ('stripe_subscription_id', 'status', 'current_period_end')
+PAGE_SIZE = 100  # Stripe's maximum
+
+
+def fetch_subscriptions(api_key=None):
+    """
+    Every subscription on the Stripe account (canceled ones included),
+    paged through the list API. Returns {customer id: subscription}: a
+    customer with several keeps the live one, else the most recent.
+    """
+    subscriptions = {}
+    pages = stripe.Subscription.list(status='all', limit=PAGE_SIZE, api_key=api_key or settings.STRIPE_SECRET_KEY)
+    for subscription in pages.auto_paging_iter():
+        current = subscriptions.get(subscription['customer'])
+        if current is None or _rank(subscription) > _rank(current):
+            subscriptions[subscription['customer']] = subscription
+    return subscriptions
+
+
+def reconcile_subscriptions(subscriptions, fetched_at, dry_run=False):
+    """
+    Compares the local StripeCustomers against Stripe's subscriptions
+    ({customer id: subscription}, see fetch_subscriptions) and fixes the
+    rows that drifted, e.g. after a missed webhook. A local member with no
+    subscription at all is canceled. `fetched_at` is when the fetch
+    started: the state written is Stripe's as of then, so webhook events
+    created later still apply. Returns [(customer, {field: (old, new)})].
+    """
+    changes = []
+    with transaction.atomic():
+        customers = list(StripeCustomer.objects.select_for_update().select_related('user')
+                         .exclude(stripe_customer_id=''))
+        for customer in customers:
+            if customer.last_event_at and customer.last_event_at > fetched_at:
+                continue  # A webhook newer than the fetch already updated it
+            diff = _diff(customer, subscriptions.get(customer.stripe_customer_id))
+            if diff:
+                for field, (old, new) in diff.items():
+                    setattr(customer, field, new)
+                changes.append((customer, diff))
+        if dry_run:
+            transaction.set_rollback(True)
+            return changes
+
+        for customer, diff in changes:
+            # Events created before the fetch must not undo it (later ones still apply)
+            customer.last_event_at = fetched_at
+        StripeCustomer.objects.bulk_update([c for c, diff in changes], [*FIELDS, 'last_event_at'])
+        user_ids = {c.user_id for c, diff in changes} | set(sync_patron_flags(customers))
+
+    # bulk_update skips the signals that would normally do this
+    invalidate_entitlement(*user_ids)
+    return changes
+
+
+# ---------------------------
+# Internals
+# ---------------------------
+def _diff(customer, subscription):
+    if subscription is None:
+        wanted = {'status': 'canceled'} if customer.status in ACTIVE_STATUSES else {}
+    else:
+        wanted = {'stripe_subscription_id': subscription['id'], 'status': subscription['status'],
+                  'current_period_end': period_end(subscription)}
+    return {f: (getattr(customer, f), v) for f, v in wanted.items() if getattr(customer, f) != v}
+
+
+def _rank(subscription):
+    return subscription['status'] in ACTIVE_STATUSES, subscription.get('created') or 0
@@ -0,0 +1,8 @@
+from tasks.queue import task
+
+
+@task(max_attempts=8, backoff=60)
+def apply_stripe_events(customer_id):
+    # Webhook side effects, run by the worker once the event is in the log
+    from .events import apply_pending_events
+    apply_pending_events([customer_id])
@@ -1,3 +1,336 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+import stripe
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from core.models import UserProfile
+from tasks.models import Task
+from . import entitlements, reconcile
+from .entitlements import get_entitlement, invalidate_entitlement
+from .events import apply_pending_events, record_event, sync_patron_flags
+from .models import AdminGrant, StripeCustomer, StripeEvent
 
-# Create your tests here.
+TESTDATA = os.path.join(os.path.dirname(__file__), 'testdata')
+WEBHOOK_SECRET = 'whsec_test480p'
+
+
+def load_event(name):
+    with open(os.path.join(TESTDATA, name), 'rb') as f:
+        return f.read()
+
+
+def sign(payload, secret=WEBHOOK_SECRET):
+    # Same scheme as Stripe: HMAC-SHA256 of "<timestamp>.<payload>"
+    timestamp = int(time.time())
+    signature = hmac.new(secret.encode(), f'{timestamp}.'.encode() + payload, hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={signature}'
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET, TASKS_EAGER=True)
+class StripeWebhookTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('patron', password='x')
+        self.customer = StripeCustomer.objects.create(user=self.user, stripe_customer_id='cus_test480p')
+
+    def post(self, name, payload=None, signature=None):
+        payload = payload or load_event(name)
+        return self.client.post('/membership/webhook/', payload, content_type='application/json',
+                                HTTP_STRIPE_SIGNATURE=signature or sign(payload))
+
+    def refresh(self):
+        self.customer.refresh_from_db()
+        self.user.profile.refresh_from_db()
+
+    def test_checkout_activates_membership(self):
+        self.assertEqual(self.post('checkout_completed.json').status_code, 200)
+        self.refresh()
+        self.assertEqual(self.customer.status, 'active')
+        self.assertEqual(self.customer.stripe_subscription_id, 'sub_test480p')
+        self.assertTrue(self.user.profile.is_patron)
+        self.assertEqual(StripeEvent.objects.get().status, StripeEvent.APPLIED)
+
+    @override_settings(TASKS_EAGER=False)
+    def test_applied_without_a_worker(self):
+        self.post('checkout_completed.json')
+        self.refresh()
+        self.assertEqual(self.customer.status, 'active')
+        self.assertFalse(Task.objects.exists())
+
+    def test_duplicate_delivery_is_logged_once(self):
+        self.post('checkout_completed.json')
+        self.assertEqual(self.post('checkout_completed.json').status_code, 200)
+        self.assertEqual(StripeEvent.objects.count(), 1)
+
+    def test_bad_signature_is_rejected(self):
+        payload = load_event('checkout_completed.json')
+        response = self.post(None, payload, signature=sign(payload, secret='whsec_wrong'))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(StripeEvent.objects.exists())
+
+    def test_period_end_is_parsed(self):
+        self.post('subscription_updated.json')
+        self.refresh()
+        self.assertEqual(self.customer.current_period_end, datetime(2025, 11, 9, 8, 53, 20, tzinfo=dt_timezone.utc))
+
+    def test_events_arriving_out_of_order(self):
+        # The cancellation lands before the (older) update: the update must not revive it
+        self.post('subscription_deleted.json')
+        self.post('subscription_updated.json')
+        self.refresh()
+        self.assertEqual(self.customer.status, 'canceled')
+        self.assertFalse(self.user.profile.is_patron)
+        self.assertEqual(StripeEvent.objects.get(event_id='evt_subscription_updated_1').status, StripeEvent.SKIPPED)
+
+    def test_unknown_customer_is_ignored(self):
+        event = json.loads(load_event('checkout_completed.json'))
+        event['id'], event['data']['object']['customer'] = 'evt_other', 'cus_someone_else'
+        self.post(None, json.dumps(event).encode())
+        self.assertEqual(StripeEvent.objects.get().status, StripeEvent.IGNORED)
+
+    def test_replay_command(self):
+        self.post('checkout_completed.json')
+        self.post('subscription_deleted.json')
+        # Pretend the checkout was mishandled and has to run again, after the cancellation
+        StripeEvent.objects.filter(event_id='evt_checkout_1').update(status=StripeEvent.FAILED)
+
+        out = StringIO()
+        call_command('replay_stripe_events', '--failed', stdout=out)
+        self.assertIn('skipped: 1', out.getvalue())
+        self.refresh()
+        self.assertEqual(self.customer.status, 'canceled')
+
+        call_command('replay_stripe_events', '--customer', 'cus_test480p', '--rewind', stdout=out)
+        self.refresh()
+        self.assertEqual(self.customer.status, 'canceled')
+        self.assertEqual(StripeEvent.objects.filter(status=StripeEvent.APPLIED).count(), 2)
+
+
+class StripeStub(BaseHTTPRequestHandler):
+    """
+    Local stand-in for the Stripe API (stripe-mock style): GET
+    /v1/subscriptions pages through `subscriptions` honouring limit and
+    starting_after, like the real list endpoint.
+    """
+    subscriptions = []
+    requests = []
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        type(self).requests.append((url.path, query))
+        if url.path != '/v1/subscriptions' or not self.headers.get('Authorization'):
+            return self.reply(404, {'error': {'type': 'invalid_request_error', 'message': 'Unknown'}})
+
+        rows = self.subscriptions
+        if 'starting_after' in query:
+            rows = rows[[s['id'] for s in rows].index(query['starting_after']) + 1:]
+        limit = int(query.get('limit', 10))
+        self.reply(200, {'object': 'list', 'url': url.path, 'data': rows[:limit], 'has_more': len(rows) > limit})
+
+    def reply(self, status, body):
+        body = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def subscription(sub_id, customer, status, created, period_end=1762678400):
+    return {'id': sub_id, 'object': 'subscription', 'customer': customer, 'status': status, 'created': created,
+            'items': {'object': 'list', 'data': [{'id': f'si_{sub_id}', 'object': 'subscription_item',
+                                                  'current_period_end': period_end}]}}
+
+
+@override_settings(STRIPE_SECRET_KEY='sk_test_480p')
+class ReconcileSubscriptionsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StripeStub)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.api_base, stripe.api_base = stripe.api_base, f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        stripe.api_base = cls.api_base
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        StripeStub.requests = []
+        self.customers = {}
+        for name, status in (('lapsed', 'active'), ('renewed', 'past_due'), ('ghost', 'active'), ('steady', 'active')):
+            user = User.objects.create_user(name, password='x')
+            self.customers[name] = StripeCustomer.objects.create(user=user, stripe_customer_id=f'cus_{name}',
+                                                                 status=status)
+            UserProfile.objects.filter(user=user).update(is_patron=status == 'active')
+
+        period_end = datetime(2025, 11, 9, 8, 53, 20, tzinfo=dt_timezone.utc)
+        self.customers['steady'].stripe_subscription_id = 'sub_steady'
+        self.customers['steady'].current_period_end = period_end
+        self.customers['steady'].save()
+        StripeStub.subscriptions = [
+            subscription('sub_lapsed', 'cus_lapsed', 'canceled', 100),
+            subscription('sub_renewed_old', 'cus_renewed', 'canceled', 100),
+            subscription('sub_renewed', 'cus_renewed', 'active', 200),
+            subscription('sub_steady', 'cus_steady', 'active', 100),
+            subscription('sub_stranger', 'cus_stranger', 'active', 100),
+        ]
+
+    def status(self, name):
+        customer = StripeCustomer.objects.select_related('user__profile').get(user__username=name)
+        return customer.status, customer.user.profile.is_patron
+
+    def test_reconcile_fixes_drifted_customers(self):
+        out = StringIO()
+        # The customers, their profiles, one bulk UPDATE each (plus the transaction's savepoint),
+        # then one UPDATE stamping the changed users' entitlement versions
+        with self.assertNumQueries(7):
+            call_command('reconcile_subscriptions', stdout=out)
+
+        self.assertEqual(self.status('lapsed'), ('canceled', False))
+        self.assertEqual(self.status('renewed'), ('active', True))
+        self.assertEqual(self.status('ghost'), ('canceled', False))
+        self.assertEqual(self.status('steady'), ('active', True))
+        renewed = StripeCustomer.objects.get(stripe_customer_id='cus_renewed')
+        self.assertEqual(renewed.stripe_subscription_id, 'sub_renewed')
+        self.assertEqual(renewed.current_period_end, datetime(2025, 11, 9, 8, 53, 20, tzinfo=dt_timezone.utc))
+        self.assertIsNotNone(renewed.last_event_at)
+        self.assertIn('lapsed (cus_lapsed): stripe_subscription_id: None -> sub_lapsed', out.getvalue())
+        self.assertIn('3 customers updated', out.getvalue())
+        self.assertNotIn('steady', out.getvalue())
+
+    def test_pages_through_the_list_api(self):
+        page_size, reconcile.PAGE_SIZE = reconcile.PAGE_SIZE, 2
+        self.addCleanup(setattr, reconcile, 'PAGE_SIZE', page_size)
+        call_command('reconcile_subscriptions', stdout=StringIO())
+        self.assertEqual([q.get('starting_after') for path, q in StripeStub.requests],
+                         [None, 'sub_renewed_old', 'sub_steady'])
+        self.assertEqual(self.status('renewed'), ('active', True))
+
+    def test_dry_run_changes_nothing(self):
+        out = StringIO()
+        call_command('reconcile_subscriptions', '--dry-run', stdout=out)
+        self.assertIn('3 customers would be updated', out.getvalue())
+        self.assertEqual(self.status('lapsed'), ('active', True))
+
+    def test_webhooks_newer_than_the_fetch_still_apply(self):
+        fetched_at = timezone.now().replace(microsecond=0)
+        subscriptions = reconcile.fetch_subscriptions()
+        # Created while the list was being fetched: one event lands before the reconcile, one after
+        for customer, event_id in (('cus_ghost', 'evt_during_1'), ('cus_lapsed', 'evt_during_2')):
+            record_event({'id': event_id, 'type': 'customer.subscription.updated',
+                          'created': int(fetched_at.timestamp()) + 1,
+                          'data': {'object': subscription(f'sub_{customer}', customer, 'active', 300)}})
+        apply_pending_events(['cus_ghost'])
+
+        changes = reconcile.reconcile_subscriptions(subscriptions, fetched_at)
+        self.assertNotIn('ghost', [c.user.username for c, diff in changes])
+        self.assertEqual(self.status('ghost'), ('active', True))
+        self.assertEqual(self.status('lapsed'), ('canceled', False))
+
+        apply_pending_events(['cus_lapsed'])
+        self.assertEqual(self.status('lapsed'), ('active', True))
+        self.assertEqual(StripeEvent.objects.get(event_id='evt_during_2').status, StripeEvent.APPLIED)
+
+
+class EntitlementTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('member', password='x')
+        self.customer = StripeCustomer.objects.create(user=self.user, stripe_customer_id='cus_member',
+                                                      status='canceled')
+        self.session = {}
+
+    def request(self):
+        # A new request from the same browser: fresh user (and profile, as base.html loads it), same session
+        request = RequestFactory().get('/')
+        request.user = User.objects.select_related('profile').get(pk=self.user.pk)
+        request.session = self.session
+        return request
+
+    def entitlement(self):
+        return get_entitlement(self.request())
+
+    def test_resolved_once_per_session(self):
+        self.assertFalse(self.entitlement().is_member)
+        request = self.request()
+        with self.assertNumQueries(0):
+            self.assertFalse(get_entitlement(request).is_member)
+
+    def test_subscription_change_invalidates(self):
+        self.assertFalse(self.entitlement().is_member)
+        self.customer.status = 'active'
+        self.customer.save()
+        self.assertTrue(self.entitlement().is_member)
+
+        self.customer.delete()
+        self.assertFalse(self.entitlement().is_member)
+
+    def test_profile_change_invalidates(self):
+        self.assertFalse(self.entitlement().is_member)
+        UserProfile.objects.filter(user=self.user).update(is_patron=True)
+        self.assertFalse(self.entitlement().is_member)  # No signal, still the session copy
+
+        profile = UserProfile.objects.get(user=self.user)
+        profile.save()
+        self.assertTrue(self.entitlement().is_member)
+
+    def test_grant_change_invalidates(self):
+        self.assertFalse(self.entitlement().is_member)
+        grant = AdminGrant.objects.create(user=self.user)
+        self.assertTrue(self.entitlement().is_member)
+
+        grant.active = False
+        grant.save()
+        self.assertFalse(self.entitlement().is_member)
+
+    def test_bulk_paths_invalidate(self):
+        # bulk_update skips the signals: the callers invalidate explicitly
+        self.assertFalse(self.entitlement().is_member)
+        StripeCustomer.objects.filter(pk=self.customer.pk).update(status='active')
+        self.customer.refresh_from_db()
+        invalidate_entitlement(*sync_patron_flags([self.customer]))
+        self.assertTrue(self.entitlement().is_member)
+
+    def test_stale_profile_save_still_invalidates(self):
+        stale = UserProfile.objects.get(user=self.user)
+        invalidate_entitlement(self.user.pk)
+        self.assertFalse(self.entitlement().is_member)
+
+        # Writes back the old token, then the signal stamps a new one
+        AdminGrant.objects.filter(user=self.user).delete()
+        AdminGrant.objects.bulk_create([AdminGrant(user=self.user)])
+        stale.save()
+        self.assertTrue(self.entitlement().is_member)
+
+    @override_settings(ENTITLEMENT_SESSION_MAX_AGE=0)
+    def test_session_copy_expires(self):
+        with mock.patch.object(entitlements, 'resolve_entitlement',
+                               wraps=entitlements.resolve_entitlement) as resolve:
+            self.entitlement()
+            self.entitlement()
+        self.assertEqual(resolve.call_count, 2)
+
+    def test_patron_pages_render(self):
+        # base.html links the JP-TRACK dashboard for patrons only when that app is installed
+        UserProfile.objects.filter(user=self.user).update(is_patron=True)
+        self.client.force_login(self.user)
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'JP-TRACK')
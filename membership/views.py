@@ -6,7 +6,12 @@ from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse
 from django.contrib.auth.models import User
 from .models import StripeCustomer
+from .events import apply_pending_events, record_event
+from .tasks import apply_stripe_events
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
@@ -100,7 +105,7 @@ def success(request):
 @csrf_exempt
 def stripe_webhook(request):
     payload = request.body
-    sig_header = request.META['HTTP_STRIPE_SIGNATURE']
+    sig_header = request.META.get('HTTP_STRIPE_SIGNATURE', '')
     endpoint_secret = settings.STRIPE_WEBHOOK_SECRET
 
     try:
@@ -110,54 +115,16 @@ def stripe_webhook(request):
     except stripe.error.SignatureVerificationError:
         return HttpResponse(status=400)
 
-    if event['type'] == 'checkout.session.completed':
-        session = event['data']['object']
-        # Only activate membership if it was a SUBSCRIPTION mode
-        if session.get('mode') == 'subscription':
-            handle_checkout_session(session)
-
-    elif event['type'] == 'customer.subscription.updated':
-        handle_subscription_update(event['data']['object'])
-
-    elif event['type'] == 'customer.subscription.deleted':
-        handle_subscription_deleted(event['data']['object'])
+    # Verified: log it, then apply it. The log is keyed on the event id, so
+    # Stripe's retries are stored (and applied) only once. Applying is a few
+    # queries, so it runs inline: membership must not wait on a worker. The
+    # queue is only the retry path when that fails.
+    stripe_event, created = record_event(json.loads(payload))
+    if created and stripe_event.status == stripe_event.PENDING:
+        try:
+            apply_pending_events([stripe_event.customer_id])
+        except Exception:
+            logger.exception("Stripe event %s queued for retry", stripe_event.event_id)
+            apply_stripe_events.enqueue(stripe_event.customer_id, key=f"stripe:{stripe_event.event_id}")
 
     return HttpResponse(status=200)
-
-
-# Helpers
-def handle_checkout_session(session):
-    stripe_id = session['customer']
-    try:
-        customer = StripeCustomer.objects.get(stripe_customer_id=stripe_id)
-        customer.stripe_subscription_id = session.get('subscription')
-        customer.status = 'active'
-        customer.save()
-        customer.user.profile.is_patron = True
-        customer.user.profile.save()
-    except StripeCustomer.DoesNotExist:
-        pass
-
-
-def handle_subscription_update(sub):
-    try:
-        customer = StripeCustomer.objects.get(stripe_customer_id=sub['customer'])
-        customer.status = sub['status']
-        # Note: We could sync 'current_period_end' here if we parsed the timestamp
-        customer.save()
-        is_active = (sub['status'] == 'active' or sub['status'] == 'trialing')
-        customer.user.profile.is_patron = is_active
-        customer.user.profile.save()
-    except:
-        pass
-
-
-def handle_subscription_deleted(sub):
-    try:
-        customer = StripeCustomer.objects.get(stripe_customer_id=sub['customer'])
-        customer.status = 'canceled'
-        customer.save()
-        customer.user.profile.is_patron = False
-        customer.user.profile.save()
-    except:
-        pass
\ No newline at end of file
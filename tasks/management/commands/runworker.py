@@ -0,0 +1,90 @@
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from tasks.queue import HEARTBEAT, claim_tasks, heartbeat, run_task, prune_finished, worker_name
+
+# How often finished tasks are cleaned up
+PRUNE_EVERY = 60 * 60
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks (DB-backed queue, no broker needed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=getattr(settings, 'TASKS_CONCURRENCY', 2),
+                            help='Tasks run in parallel (threads)')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Run everything that is due, then exit (for scheduled jobs)')
+        parser.add_argument('--keep-days', type=int, default=getattr(settings, 'TASKS_KEEP_DAYS', 7),
+                            help='Delete finished tasks older than this')
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        worker = worker_name()
+        stopping = threading.Event()
+
+        def stop(signum, frame):
+            self.stdout.write("Stopping after the running tasks finish...")
+            stopping.set()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(f"Worker {worker} started ({concurrency} threads)")
+        done = failed = 0
+        last_prune = last_heartbeat = 0
+        running = {}  # future: task pk
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while not stopping.is_set():
+                close_old_connections()
+                if time.monotonic() - last_prune > PRUNE_EVERY:
+                    prune_finished(options['keep_days'])
+                    last_prune = time.monotonic()
+
+                if running and time.monotonic() - last_heartbeat > HEARTBEAT.total_seconds():
+                    heartbeat(worker, list(running.values()))
+                    last_heartbeat = time.monotonic()
+
+                for pk in claim_tasks(worker, concurrency - len(running)):
+                    running[pool.submit(self.run_one, pk)] = pk
+
+                if not running:
+                    if options['once']:
+                        break
+                    stopping.wait(options['poll_interval'])
+                    continue
+
+                finished, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in finished:
+                    del running[future]
+                    if future.result():
+                        done += 1
+                    else:
+                        failed += 1
+
+            while running:  # Stopping: keep the locks fresh until the running tasks finish
+                finished, _ = wait(running, timeout=HEARTBEAT.total_seconds())
+                for future in finished:
+                    del running[future]
+                    if future.result():
+                        done += 1
+                    else:
+                        failed += 1
+                if running:
+                    heartbeat(worker, list(running.values()))
+
+        self.stdout.write(self.style.SUCCESS(f'Finished! {done} tasks done, {failed} failed or retrying.'))
+
+    @staticmethod
+    def run_one(pk):
+        try:
+            return run_task(pk)
+        finally:
+            connection.close()  # Each thread has its own connection
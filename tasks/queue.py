@@ -0,0 +1,165 @@
+import logging
+import os
+import random
+import socket
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# Defaults (override in settings.py)
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BACKOFF = 30            # seconds before the first retry; doubles each time
+MAX_BACKOFF = 60 * 60
+LOCK_TIMEOUT = timedelta(minutes=15)  # A "running" task not heartbeaten for this long belonged to a dead worker
+HEARTBEAT = timedelta(minutes=1)      # How often a worker refreshes the locks of the tasks it is running
+
+
+def task(func=None, *, max_attempts=DEFAULT_MAX_ATTEMPTS, backoff=DEFAULT_BACKOFF):
+    """
+    Marks a module-level function as a background task:
+
+        @task(max_attempts=3)
+        def send_mail(user_id): ...
+
+        send_mail.enqueue(user.pk, key=f'welcome:{user.pk}')
+
+    Arguments must be JSON-serializable (pass ids, not model instances).
+    """
+    def register(f):
+        f.task_name = f'{f.__module__}.{f.__qualname__}'
+        f.max_attempts = max_attempts
+        f.backoff = backoff
+        f.enqueue = lambda *args, key=None, delay=None, **kwargs: enqueue(f, *args, key=key, delay=delay, **kwargs)
+        return f
+
+    return register(func) if func is not None else register
+
+
+def is_eager():
+    # Eager mode (dev/tests): tasks run inline at enqueue time, no worker needed
+    return getattr(settings, 'TASKS_EAGER', False)
+
+
+def enqueue(func, *args, key=None, delay=None, **kwargs):
+    """
+    Queues func(*args, **kwargs). With an idempotency `key`, a job that was
+    already queued (or has run) under that key is returned instead of adding
+    a second one. Returns the Task (None in eager mode).
+    """
+    if is_eager():
+        func(*args, **kwargs)
+        return None
+
+    fields = {
+        'name': func.task_name,
+        'args': list(args),
+        'kwargs': kwargs,
+        'max_attempts': func.max_attempts,
+        'run_at': timezone.now() + (delay or timedelta()),
+    }
+    if key is None:
+        return Task.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Task.objects.create(idempotency_key=key, **fields)
+    except IntegrityError:
+        return Task.objects.get(idempotency_key=key)
+
+
+# ---------------------------
+# Worker side
+# ---------------------------
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim_tasks(worker, limit):
+    """
+    Marks up to `limit` due tasks as running for this worker and returns their ids.
+    The claim is a conditional UPDATE, so two workers never get the same task.
+    """
+    now = timezone.now()
+    release_stale_tasks(now)
+
+    due = (Task.objects.filter(status=Task.QUEUED, run_at__lte=now)
+           .order_by('run_at', 'pk').values_list('pk', flat=True)[:limit * 2])
+    claimed = []
+    for pk in due:
+        won = Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+            status=Task.RUNNING, locked_by=worker, locked_at=now, attempts=F('attempts') + 1)
+        if won:
+            claimed.append(pk)
+            if len(claimed) >= limit:
+                break
+    return claimed
+
+
+def release_stale_tasks(now):
+    # Workers that died mid-task: give the job back (or fail it when out of attempts)
+    stale = Task.objects.filter(status=Task.RUNNING, locked_at__lt=now - LOCK_TIMEOUT)
+    for task_row in stale:
+        if task_row.attempts >= task_row.max_attempts:
+            _finish(task_row, Task.FAILED, error="Worker stopped while running the task")
+        else:
+            Task.objects.filter(pk=task_row.pk, status=Task.RUNNING).update(status=Task.QUEUED, locked_by='')
+
+
+def heartbeat(worker, pks):
+    """
+    Refreshes locked_at on the tasks this worker is still running, so a
+    long task (a big box-art batch) isn't taken for a dead worker's and
+    run a second time. Returns how many locks were refreshed.
+    """
+    return Task.objects.filter(pk__in=pks, status=Task.RUNNING, locked_by=worker).update(locked_at=timezone.now())
+
+
+def run_task(pk):
+    """
+    Runs one claimed task and records the outcome (done / retry later / failed).
+    """
+    task_row = Task.objects.get(pk=pk)
+    try:
+        func = import_string(task_row.name)
+    except ImportError:
+        func = None
+    if getattr(func, 'task_name', None) != task_row.name:
+        # Only @task functions run, and retrying won't make one appear
+        _finish(task_row, Task.FAILED, error=f"{task_row.name} is not a @task function")
+        return False
+
+    try:
+        func(*task_row.args, **task_row.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Task %s failed (attempt %d/%d)", task_row, task_row.attempts, task_row.max_attempts)
+        if task_row.attempts < task_row.max_attempts:
+            wait = min(func.backoff * 2 ** (task_row.attempts - 1), MAX_BACKOFF) * random.uniform(0.8, 1.2)
+            Task.objects.filter(pk=pk).update(status=Task.QUEUED, locked_by='', last_error=error,
+                                              run_at=timezone.now() + timedelta(seconds=wait))
+        else:
+            _finish(task_row, Task.FAILED, error=error)
+        return False
+
+    _finish(task_row, Task.DONE)
+    return True
+
+
+def _finish(task_row, status, error=''):
+    Task.objects.filter(pk=task_row.pk).update(status=status, locked_by='', last_error=error,
+                                               finished_at=timezone.now())
+
+
+def prune_finished(days):
+    """
+    Deletes finished tasks older than `days` (their idempotency keys become reusable).
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Task.objects.filter(status__in=[Task.DONE, Task.FAILED], finished_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,149 @@
+import signal
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from .models import Task
+from .queue import LOCK_TIMEOUT, MAX_BACKOFF, claim_tasks, heartbeat, prune_finished, run_task, task
+
+calls = []
+
+
+@task(max_attempts=3, backoff=10)
+def record(value):
+    calls.append(value)
+
+
+@task(max_attempts=2, backoff=10)
+def explode():
+    calls.append('boom')
+    raise RuntimeError("boom")
+
+
+def not_a_task():
+    pass
+
+
+@override_settings(TASKS_EAGER=False)
+class QueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_with_key_is_idempotent(self):
+        first = record.enqueue(1, key='record:1')
+        second = record.enqueue(2, key='record:1')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Task.objects.get().args, [1])
+        record.enqueue(3)
+        record.enqueue(3)
+        self.assertEqual(Task.objects.count(), 3)
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_runs_inline(self):
+        self.assertIsNone(record.enqueue(7))
+        self.assertEqual(calls, [7])
+        self.assertFalse(Task.objects.exists())
+
+    def test_run_and_finish(self):
+        row = record.enqueue('x')
+        self.assertEqual(claim_tasks('w1', 5), [row.pk])
+        self.assertTrue(run_task(row.pk))
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts, row.locked_by), (Task.DONE, 1, ''))
+        self.assertEqual(calls, ['x'])
+
+    def test_claims_are_exclusive_and_respect_run_at(self):
+        due = record.enqueue(1)
+        record.enqueue(2, delay=timedelta(hours=1))
+        self.assertEqual(claim_tasks('w1', 5), [due.pk])
+        self.assertEqual(claim_tasks('w2', 5), [])
+
+    def test_failures_retry_with_backoff_then_fail(self):
+        row = explode.enqueue()
+        claim_tasks('w1', 1)
+        before = timezone.now()
+        self.assertFalse(run_task(row.pk))
+        row.refresh_from_db()
+        self.assertEqual(row.status, Task.QUEUED)
+        self.assertIn('RuntimeError: boom', row.last_error)
+        # First retry: backoff (10s) with +/-20% jitter
+        self.assertGreaterEqual(row.run_at, before + timedelta(seconds=8))
+        self.assertLessEqual(row.run_at, timezone.now() + timedelta(seconds=12))
+        self.assertEqual(claim_tasks('w1', 1), [])  # Not due yet
+
+        Task.objects.filter(pk=row.pk).update(run_at=timezone.now())
+        claim_tasks('w1', 1)
+        self.assertFalse(run_task(row.pk))
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), (Task.FAILED, 2))
+        self.assertIsNotNone(row.finished_at)
+        self.assertEqual(calls, ['boom', 'boom'])
+
+    def test_backoff_is_capped(self):
+        row = explode.enqueue()
+        Task.objects.filter(pk=row.pk).update(max_attempts=50, attempts=29)
+        claim_tasks('w1', 1)
+        run_task(row.pk)
+        row.refresh_from_db()
+        self.assertLessEqual(row.run_at, timezone.now() + timedelta(seconds=MAX_BACKOFF * 1.2))
+
+    def test_only_task_functions_run(self):
+        row = Task.objects.create(name='tasks.tests.not_a_task')
+        claim_tasks('w1', 1)
+        self.assertFalse(run_task(row.pk))
+        row.refresh_from_db()
+        self.assertEqual(row.status, Task.FAILED)
+
+    def test_stale_lock_is_released_to_another_worker(self):
+        row = record.enqueue(1)
+        claim_tasks('dead', 1)
+        Task.objects.filter(pk=row.pk).update(locked_at=timezone.now() - LOCK_TIMEOUT - timedelta(seconds=1))
+        self.assertEqual(claim_tasks('w2', 1), [row.pk])
+        row.refresh_from_db()
+        self.assertEqual((row.locked_by, row.attempts), ('w2', 2))
+
+    def test_stale_lock_out_of_attempts_fails(self):
+        row = explode.enqueue()
+        Task.objects.filter(pk=row.pk).update(status=Task.RUNNING, attempts=2, locked_by='dead',
+                                              locked_at=timezone.now() - LOCK_TIMEOUT * 2)
+        self.assertEqual(claim_tasks('w2', 1), [])
+        row.refresh_from_db()
+        self.assertEqual(row.status, Task.FAILED)
+
+    def test_heartbeat_keeps_a_long_task_locked(self):
+        row = record.enqueue(1)
+        claim_tasks('w1', 1)
+        # Running for longer than LOCK_TIMEOUT, but its worker is alive and heartbeating
+        Task.objects.filter(pk=row.pk).update(locked_at=timezone.now() - LOCK_TIMEOUT * 2)
+        self.assertEqual(heartbeat('w2', [row.pk]), 0)  # Only the owner refreshes
+        self.assertEqual(heartbeat('w1', [row.pk]), 1)
+        self.assertEqual(claim_tasks('w2', 1), [])
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.locked_by, row.attempts), (Task.RUNNING, 'w1', 1))
+
+    def test_prune_finished(self):
+        done = record.enqueue(1, key='prune')
+        Task.objects.filter(pk=done.pk).update(status=Task.DONE, finished_at=timezone.now() - timedelta(days=8))
+        record.enqueue(2)
+        self.assertEqual(prune_finished(7), 1)
+        # The key is free again
+        self.assertNotEqual(record.enqueue(3, key='prune').pk, done.pk)
+
+
+@override_settings(TASKS_EAGER=False)
+class RunWorkerTests(TransactionTestCase):
+    # The worker runs tasks on threads with their own connections: the rows must be committed
+    def setUp(self):
+        calls.clear()
+        # runworker installs its own SIGINT/SIGTERM handlers
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            self.addCleanup(signal.signal, signum, signal.getsignal(signum))
+
+    def test_runworker_once(self):
+        record.enqueue('a')
+        explode.enqueue()
+        out = StringIO()
+        call_command('runworker', '--once', '--concurrency', '1', stdout=out)
+        self.assertEqual(sorted(calls), ['a', 'boom'])
+        self.assertIn('1 tasks done, 1 failed or retrying', out.getvalue())